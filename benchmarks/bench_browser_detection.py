@@ -0,0 +1,95 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from utils.browser_registry import REGISTRY, clear_detection_cache, detect_browsers
+
+## Browser detection benchmark
+# Builds a fake home directory with a share of the registered profile roots (--installed)
+# and --noise unrelated directories in each probed parent (.config, snap, .var/app, ...), as
+# a long-used home has, then finds the profile roots three ways: one Path.exists() per
+# candidate root and browser, the one-pass probe of detect_browsers with a cold cache, and
+# detect_browsers again with the cache warm. Each is repeated --repeat times per home, as the
+# export, the plan and every get_browser_profile_path call detect again.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_browser_detection --homes 20 --noise 200 --repeat 50
+
+
+def write_home(home: Path, installed: float, noise: int, index: int) -> None:
+    rng = Random(index)
+    roots = [
+        root
+        for spec in REGISTRY.values()
+        for root in spec.profile_roots.get("Linux", ())
+    ]
+    for root in roots:
+        if rng.random() < installed:
+            (home / root).mkdir(parents=True, exist_ok=True)
+            (home / root / "Local State").write_text("{}")
+    parents = {Path(root).parent for root in roots}
+    for parent in parents:
+        for number in range(noise):
+            (home / parent / f"noise-{number}").mkdir(parents=True, exist_ok=True)
+
+
+def naive_detect(home: Path) -> dict[str, Path]:
+    detected = {}
+    for name, spec in REGISTRY.items():
+        existing = [
+            home / root
+            for root in spec.profile_roots.get("Linux", ())
+            if (home / root).exists()
+        ]
+        if existing:
+            detected[name] = existing[0]
+    return detected
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark browser profile root detection.")
+    parser.add_argument("--homes", type=int, default=10)
+    parser.add_argument("--installed", type=float, default=0.3)
+    parser.add_argument("--noise", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp:
+        homes = [Path(temp) / f"home-{index}" for index in range(args.homes)]
+        for index, home in enumerate(homes):
+            write_home(home, args.installed, args.noise, index)
+
+        start = perf_counter()
+        for _ in range(args.repeat):
+            for home in homes:
+                naive_detect(home)
+        naive = perf_counter() - start
+
+        start = perf_counter()
+        for _ in range(args.repeat):
+            clear_detection_cache()
+            for home in homes:
+                detect_browsers(home, "Linux")
+        cold = perf_counter() - start
+
+        start = perf_counter()
+        for _ in range(args.repeat):
+            for home in homes:
+                detect_browsers(home, "Linux")
+        cached = perf_counter() - start
+
+        found = sum(len(detect_browsers(home, "Linux")) for home in homes)
+        calls = args.repeat * args.homes
+        print(f"{args.homes} homes, {found} browsers found, {calls} detections each")
+        print(f"{'method':<14}{'total s':>9}{'per call ms':>13}")
+        for method, seconds in (
+            ("exists()", naive),
+            ("one pass", cold),
+            ("cached", cached),
+        ):
+            print(f"{method:<14}{seconds:>9.3f}{seconds / calls * 1000:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.session_generators import write_jsonlz4_file, write_snss_file
+from session_parsers.chromium_parser import parse_snss_file
+from session_parsers.firefox_parser import parse_jsonlz4_file
+
+## Current-only vs full parsing
+# Usage (from the repository root):
+#   python -m benchmarks.bench_current_only --tabs 2000 --depth 30
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def current_urls(windows: list) -> list[str]:
+    return [
+        tab.current_entry().url if tab.current_entry() else ""
+        for window in windows
+        for tab in window.tabs
+    ]
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="Compare current-only and full session parsing."
+    )
+    parser.add_argument("--tabs", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--title-length", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        snss = write_snss_file(
+            Path(tmp) / "Session_1", args.tabs, args.depth, args.title_length
+        )
+        jsonlz4 = write_jsonlz4_file(
+            Path(tmp) / "recovery.jsonlz4",
+            tabs=args.tabs,
+            history_depth=args.depth,
+            title_length=args.title_length,
+        )
+
+        # both modes must agree on the entry that gets exported
+        assert current_urls(parse_snss_file(snss)) == current_urls(
+            parse_snss_file(snss, current_only=True)
+        )
+        assert current_urls(parse_jsonlz4_file(jsonlz4, selective=True)) == (
+            current_urls(parse_jsonlz4_file(jsonlz4, selective=True, current_only=True))
+        )
+
+        cases: list[tuple[str, Path, Callable[[], object]]] = [
+            ("SNSS full", snss, lambda: parse_snss_file(snss)),
+            (
+                "SNSS current-only",
+                snss,
+                lambda: parse_snss_file(snss, current_only=True),
+            ),
+            ("jsonlz4 full", jsonlz4, lambda: parse_jsonlz4_file(jsonlz4)),
+            (
+                "jsonlz4 current-only",
+                jsonlz4,
+                lambda: parse_jsonlz4_file(jsonlz4, current_only=True),
+            ),
+            (
+                "jsonlz4 selective",
+                jsonlz4,
+                lambda: parse_jsonlz4_file(jsonlz4, selective=True),
+            ),
+            (
+                "jsonlz4 selective current-only",
+                jsonlz4,
+                lambda: parse_jsonlz4_file(jsonlz4, selective=True, current_only=True),
+            ),
+        ]
+
+        print(f"{'case':<32}{'size, MB':>10}{'best, s':>10}")
+        for name, path, func in cases:
+            size = path.stat().st_size / 1_000_000
+            print(f"{name:<32}{size:>10.2f}{best_of(args.repeat, func):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
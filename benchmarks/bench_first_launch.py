@@ -0,0 +1,155 @@
+import os
+import sqlite3
+from argparse import ArgumentParser
+from pathlib import Path
+from shutil import copytree
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.profile_generators import write_history_database
+from migrations.importer import restore_profile_files
+from migrations.profile_maintenance import find_profile_files, maintain_profile
+
+## First launch benchmark
+# Exports a profile whose history database has been churned (a share of its visits deleted
+# and as many added) with the changes still in its WAL, as a browser killed during the export
+# leaves it. The profile is restored twice, once plainly and once followed by the maintenance
+# stage, and the page cache is dropped for the restored files after the copy (as after a
+# reboot, or a restore large enough to push them out). "First launch" then opens the
+# databases and runs the queries a browser starts with. The page cache can only be dropped
+# on a real disk: on tmpfs, use --dir to place the files elsewhere.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_first_launch --browser Firefox --visits 400000 --dir /var/tmp
+
+STARTUP_QUERIES = {
+    "Firefox": [
+        "SELECT url, title FROM moz_places ORDER BY visit_count DESC LIMIT 100",
+        "SELECT place_id FROM moz_historyvisits ORDER BY visit_date DESC LIMIT 500",
+        "SELECT count(*) FROM moz_historyvisits",
+    ],
+    "Chrome": [
+        "SELECT url, title FROM urls ORDER BY visit_count DESC LIMIT 100",
+        "SELECT url FROM visits ORDER BY visit_time DESC LIMIT 500",
+        "SELECT count(*) FROM visits",
+    ],
+}
+
+
+def write_churned_export(
+    source: Path, export: Path, browser: str, visits: int, churn: float
+) -> None:
+    """Writes a profile, churns its history in WAL mode and exports it with the WAL."""
+
+    profile = source / ("abcd1234.default" if browser == "Firefox" else "Default")
+    name = "places.sqlite" if browser == "Firefox" else "History"
+    database = write_history_database(
+        profile / name, browser, urls=visits // 10, visits=visits
+    )
+    table, column = (
+        ("moz_historyvisits", "visit_date")
+        if browser == "Firefox"
+        else ("visits", "visit_time")
+    )
+    connection = sqlite3.connect(database, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA wal_autocheckpoint = 0")
+        connection.execute("BEGIN")
+        connection.execute(
+            f"DELETE FROM {table} WHERE abs(random()) % 1000 < ?", (int(churn * 1000),)
+        )
+        copy_columns = (
+            "place_id, visit_date, visit_type"
+            if browser == "Firefox"
+            else "url, visit_time, transition"
+        )
+        connection.execute(
+            f"INSERT INTO {table} ({copy_columns}) SELECT {copy_columns} FROM {table}"
+            f" ORDER BY {column} DESC LIMIT ?",
+            (int(visits * churn),),
+        )
+        connection.execute("COMMIT")
+        # copied while the connection is open, so the WAL is not checkpointed yet
+        copytree(source, export)
+    finally:
+        connection.close()
+
+
+def drop_page_cache(root: Path) -> None:
+    os.sync()
+    for directory, _, names in os.walk(root):
+        for name in names:
+            fd = os.open(os.path.join(directory, name), os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def first_launch(browser: str, profile: Path) -> float:
+    databases = find_profile_files(
+        browser,
+        profile,
+        ("places.sqlite",) if browser == "Firefox" else ("History",),
+    )
+    start = perf_counter()
+    for database in databases:
+        connection = sqlite3.connect(database)
+        try:
+            for query in STARTUP_QUERIES[browser]:
+                connection.execute(query).fetchall()
+        finally:
+            connection.close()
+    return perf_counter() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the first launch after a restore.")
+    parser.add_argument("--browser", choices=tuple(STARTUP_QUERIES), default="Firefox")
+    parser.add_argument("--visits", type=int, default=200_000)
+    parser.add_argument("--churn", type=float, default=0.3)
+    parser.add_argument("--dir", type=Path, help="directory for the temporary files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with TemporaryDirectory(dir=args.dir) as temp:
+        temp = Path(temp)
+        export = temp / "export"
+        write_churned_export(
+            temp / "source", export, args.browser, args.visits, args.churn
+        )
+        sizes = {
+            path.name: path.stat().st_size
+            for path in export.rglob("*")
+            if path.is_file()
+        }
+        print(", ".join(f"{name} {size / 1e6:.1f} MB" for name, size in sizes.items()))
+
+        print(
+            f"{'mode':<12}{'restore s':>10}{'maintain s':>12}{'launch s':>10}{'total s':>9}"
+        )
+        for mode in ("plain", "maintained"):
+            best = None
+            for run in range(args.repeat):
+                target = temp / f"{mode}-{run}"
+                start = perf_counter()
+                restore_profile_files(export, target, args.browser)
+                restore = perf_counter() - start
+                drop_page_cache(target)
+                maintain = 0.0
+                if mode == "maintained":
+                    start = perf_counter()
+                    maintain_profile(args.browser, target)
+                    maintain = perf_counter() - start
+                launch = first_launch(args.browser, target)
+                if best is None or launch < best[2]:
+                    best = (restore, maintain, launch)
+            restore, maintain, launch = best
+            print(
+                f"{mode:<12}{restore:>10.3f}{maintain:>12.3f}{launch:>10.3f}"
+                f"{restore + maintain + launch:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
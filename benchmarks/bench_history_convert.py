@@ -0,0 +1,76 @@
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.profile_generators import write_bookmarks_file, write_history_database
+from migrations.profile_convert import convert_profile
+
+## Cross-browser conversion benchmark
+# Converts synthetic Chromium and Firefox histories of growing size into a fresh profile of
+# the other browser, and reports the time and the peak Python heap of each conversion.
+# The heap should stay flat as the history grows, since rows are streamed.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_history_convert --visits 100000 500000
+
+DIRECTIONS = [("Chrome", "Firefox"), ("Firefox", "Chrome")]
+PROFILE_DIRECTORY = {"Chrome": "Default", "Firefox": "abcd1234.default"}
+DATABASE = {"Chrome": "History", "Firefox": "places.sqlite"}
+
+
+def write_profile(root: Path, browser: str, visits: int, urls: int) -> Path:
+    profile = root / PROFILE_DIRECTORY[browser]
+    write_history_database(
+        profile / DATABASE[browser], browser, urls, visits, bookmarks=500 if urls else 0
+    )
+    if browser == "Chrome" and urls:
+        write_bookmarks_file(profile / "Bookmarks")
+    return root
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="Benchmark the history and bookmark converters."
+    )
+    parser.add_argument("--visits", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument(
+        "--visits-per-url", type=int, default=10, help="average visits of a URL"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'direction':<20}{'visits':>9}{'urls':>8}{'seconds':>9}{'visits/s':>11}"
+        f"{'peak heap, MB':>15}"
+    )
+    with TemporaryDirectory() as temp:
+        temp = Path(temp)
+        for visits in args.visits:
+            urls = max(1, visits // args.visits_per_url)
+            for source, target in DIRECTIONS:
+                case = temp / f"{source}-{visits}"
+                source_root = write_profile(case / "source", source, visits, urls)
+                # one fresh target for the timed run, one for the traced run
+                targets = [
+                    write_profile(case / f"target{run}", target, 0, 0)
+                    for run in range(2)
+                ]
+
+                start = perf_counter()
+                stats = convert_profile(source, source_root, target, targets[0])
+                elapsed = perf_counter() - start
+
+                tracemalloc.start()
+                convert_profile(source, source_root, target, targets[1])
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                print(
+                    f"{source + ' -> ' + target:<20}{stats['visits']:>9}"
+                    f"{stats['urls']:>8}{elapsed:>9.2f}{stats['visits'] / elapsed:>11.0f}"
+                    f"{peak / 1e6:>15.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
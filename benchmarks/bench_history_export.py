@@ -0,0 +1,64 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from shutil import copy2
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import migrations.history_export as history_export
+from benchmarks.profile_generators import write_history_database
+from migrations.history_export import HistoryWindow, export_history_database
+
+## History export benchmark
+# Compares copying Chromium's History and Firefox's places.sqlite whole with the compact,
+# time-windowed export, for several windows and executemany() batch sizes.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_history_export --urls 50000 --visits 500000 --days 30 90 365
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the compact history export.")
+    parser.add_argument("--urls", type=int, default=20_000)
+    parser.add_argument("--visits", type=int, default=200_000)
+    parser.add_argument("--years", type=float, default=5.0)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90, 365])
+    parser.add_argument("--batch-rows", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp:
+        temp = Path(temp)
+        print(
+            f"{'browser':<9}{'method':<22}{'batch':>7}{'visits':>9}{'MB':>8}"
+            f"{'ratio':>7}{'seconds':>9}"
+        )
+        for browser, name in (("Chrome", "History"), ("Firefox", "places.sqlite")):
+            source = write_history_database(
+                temp / browser / name, browser, args.urls, args.visits, args.years
+            )
+            size = source.stat().st_size
+
+            start = perf_counter()
+            copy2(source, temp / f"{browser}-copy")
+            elapsed = perf_counter() - start
+            print(
+                f"{browser:<9}{'copy2':<22}{'':>7}{args.visits:>9}"
+                f"{size / 1e6:>8.1f}{1:>7.2f}{elapsed:>9.3f}"
+            )
+
+            for days in args.days:
+                for batch_rows in args.batch_rows:
+                    history_export.BATCH_ROWS = batch_rows
+                    target = temp / f"{browser}-{days}-{batch_rows}"
+                    start = perf_counter()
+                    stats = export_history_database(
+                        source, target, browser, HistoryWindow(days=days)
+                    )
+                    elapsed = perf_counter() - start
+                    print(
+                        f"{browser:<9}{f'compact, {days} days':<22}{batch_rows:>7}"
+                        f"{stats['visits']:>9}{stats['bytes'] / 1e6:>8.1f}"
+                        f"{stats['bytes'] / size:>7.2f}{elapsed:>9.3f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.profile_generators import (
+    MB,
+    write_chromium_profile,
+    write_firefox_profile,
+)
+from migrations.importer import RESTORE_SUFFIX, browser_data_import
+from utils.json_handler import BrowserDataWriter
+from utils.metrics import metrics
+
+## Import orchestrator benchmark
+# Exports three synthetic profiles of different sizes, then imports them with one worker
+# (profiles restored one after another) and with several, and prints the total time and
+# the copy time of every browser. With --timeout, one more import is cut off after that many
+# seconds and the benchmark checks that the profiles it did not finish are left as they were.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_import --workers 1 4 --timeout 0.5
+
+# browser -> (generator, sqlite MB), the largest first
+PROFILES = {
+    "Chrome": (write_chromium_profile, 48),
+    "Edge": (write_chromium_profile, 16),
+    "Firefox": (write_firefox_profile, 4),
+}
+
+
+def write_session(path: Path, exported: Path, target: Path) -> None:
+    with BrowserDataWriter(path, {"ui_language": "ru"}) as writer:
+        for browser in PROFILES:
+            # the URL makes the orchestrator launch the browser (or report it missing)
+            writer.write_browser(
+                browser,
+                {
+                    "export_path": str(exported / browser),
+                    "profile_path": str(target / browser),
+                },
+                [{"url": "https://example.com/", "title": "", "window": 0}],
+            )
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the concurrent import.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--extensions", type=int, default=40)
+    parser.add_argument("--timeout", type=float)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp:
+        temp = Path(temp)
+        exported = temp / "exported_profiles"
+        for browser, (write_profile, sqlite_mb) in PROFILES.items():
+            write_profile(
+                exported / browser,
+                extensions=args.extensions,
+                sqlite_size=sqlite_mb * MB,
+            )
+        session_file = temp / "browser_data.json"
+
+        print(f"{'workers':<10}{'total s':>9}" + "".join(f"{b:>10}" for b in PROFILES))
+        for workers in args.workers:
+            target = temp / f"target-{workers}"
+            write_session(session_file, exported, target)
+            start = perf_counter()
+            browser_data_import(None, str(session_file), workers=workers)
+            elapsed = perf_counter() - start
+            copies = "".join(
+                f"{metrics.phase_seconds('copy', browser):>10.3f}"
+                for browser in PROFILES
+            )
+            print(f"{workers:<10}{elapsed:>9.3f}{copies}")
+
+        if args.timeout:
+            target = temp / "target-timeout"
+            for browser in PROFILES:
+                (target / browser).mkdir(parents=True)
+                (target / browser / "old_profile").write_text("old")
+            write_session(session_file, exported, target)
+            try:
+                browser_data_import(None, str(session_file), timeout=args.timeout)
+            except Exception as e:
+                print(f"timed out: {type(e).__name__}")
+            for browser in PROFILES:
+                old = (target / browser / "old_profile").exists()
+                staging = (target / f"{browser}{RESTORE_SUFFIX}").exists()
+                print(
+                    f"{browser:<10}{'old profile kept' if old else 'restored':<18}"
+                    f"{'staging left behind' if staging else ''}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import gc
+import platform
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime
+from json import dump, load
+from pathlib import Path
+from struct import unpack
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, NamedTuple
+
+from benchmarks.session_generators import write_jsonlz4_file, write_snss_file
+from session_parsers.chromium_parser import parse_snss_file
+from session_parsers.firefox_parser import parse_jsonlz4_file
+
+## Session parser benchmark suite
+# Generates synthetic SNSS and mozLz40 files, runs every registered parser engine on them
+# and reports throughput, peak memory and allocation counts. Results can be saved as JSON
+# and compared against a previous run.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_parsers --tabs 2000 --depth 20 --output base.json
+#   python -m benchmarks.bench_parsers --tabs 2000 --depth 20 --compare base.json
+
+
+class Engine(NamedTuple):
+    name: str
+    format: str  # "snss" or "jsonlz4"
+    parse: Callable[[Path], object]
+
+
+# Alternative engines are added here; each one is run on the file of its format.
+ENGINES = [
+    Engine("snss", "snss", lambda path: parse_snss_file(path)),
+    Engine(
+        "snss current-only",
+        "snss",
+        lambda path: parse_snss_file(path, current_only=True),
+    ),
+    Engine("jsonlz4", "jsonlz4", lambda path: parse_jsonlz4_file(path)),
+    Engine(
+        "jsonlz4 selective",
+        "jsonlz4",
+        lambda path: parse_jsonlz4_file(path, selective=True),
+    ),
+    Engine(
+        "jsonlz4 selective current-only",
+        "jsonlz4",
+        lambda path: parse_jsonlz4_file(path, selective=True, current_only=True),
+    ),
+]
+
+
+def count_snss_commands(path: Path) -> int:
+    data = path.read_bytes()
+    count, pos = 0, 8
+    while pos + 2 <= len(data):
+        size = unpack("<H", data[pos : pos + 2])[0]
+        if size == 0:
+            break
+        pos += 2 + size
+        count += 1
+    return count
+
+
+def count_tabs(result: object) -> int:
+    windows = result if isinstance(result, list) else [result]
+    return sum(len(window.tabs) for window in windows)
+
+
+def measure(engine: Engine, path: Path, repeat: int) -> dict:
+    """
+    Runs one engine on one file.
+
+    Timing runs come first, without tracing. A separate traced run then records peak
+    memory, the number of memory blocks the result keeps alive, and how many garbage
+    collector generation-0 passes the parse triggered (one per ~700 container allocations).
+
+    Args:
+        engine (Engine): The parser engine.
+        path (Path): The session file.
+        repeat (int): Number of timing runs; the best one is reported.
+
+    Returns:
+        dict: The measurements.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = engine.parse(path)
+        timings.append(perf_counter() - start)
+        del result
+    best = min(timings)
+
+    gc.collect()
+    collections = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    result = engine.parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.take_snapshot().statistics("filename")
+    tracemalloc.stop()
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    size = path.stat().st_size
+    tabs = count_tabs(result)
+    measurement = {
+        "engine": engine.name,
+        "file_bytes": size,
+        "tabs": tabs,
+        "best_s": best,
+        "mean_s": sum(timings) / len(timings),
+        "mb_per_s": size / best / 1_000_000,
+        "tabs_per_s": tabs / best,
+        "peak_memory_bytes": peak,
+        "retained_blocks": sum(stat.count for stat in retained),
+        "gc_gen0_collections": collections,
+    }
+    if engine.format == "snss":
+        measurement["commands_per_s"] = count_snss_commands(path) / best
+    return measurement
+
+
+def compare(results: list[dict], baseline_path: Path, threshold: float) -> bool:
+    """
+    Prints the time ratio of every engine against a saved run.
+
+    Args:
+        results (list[dict]): Measurements of this run.
+        baseline_path (Path): A JSON file written with --output.
+        threshold (float): Relative slowdown above which an engine counts as regressed.
+
+    Returns:
+        bool: True if no engine regressed.
+    """
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["engine"]: r for r in load(f)["results"]}
+
+    ok = True
+    print(f"\n{'engine':<34}{'base, s':>10}{'now, s':>10}{'ratio':>8}")
+    for result in results:
+        base = baseline.get(result["engine"])
+        if base is None:
+            continue
+        ratio = result["best_s"] / base["best_s"]
+        regressed = ratio > 1 + threshold
+        ok = ok and not regressed
+        mark = "  REGRESSION" if regressed else ""
+        print(
+            f"{result['engine']:<34}{base['best_s']:>10.4f}{result['best_s']:>10.4f}"
+            f"{ratio:>8.2f}{mark}"
+        )
+    return ok
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the session parsers.")
+    parser.add_argument("--tabs", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--windows", type=int, default=1)
+    parser.add_argument("--title-length", type=int, default=60)
+    parser.add_argument("--non-ascii", type=float, default=0.1)
+    parser.add_argument(
+        "--noise", type=float, default=1.0, help="other SNSS commands per navigation"
+    )
+    parser.add_argument(
+        "--closed", type=float, default=0.0, help="share of SNSS tabs closed again"
+    )
+    parser.add_argument(
+        "--closed-tabs", type=int, default=25, help="closed tabs per Firefox window"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--engine", action="append", help="run only these engines")
+    parser.add_argument("--output", type=Path, help="save results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON results of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    engines = [e for e in ENGINES if not args.engine or e.name in args.engine]
+
+    with TemporaryDirectory() as tmp:
+        files = {
+            "snss": write_snss_file(
+                Path(tmp) / "Session_1",
+                tabs=args.tabs * args.windows,
+                history_depth=args.depth,
+                title_length=args.title_length,
+                non_ascii_share=args.non_ascii,
+                command_noise=args.noise,
+                windows=args.windows,
+                closed_tabs=args.closed,
+            ),
+            "jsonlz4": write_jsonlz4_file(
+                Path(tmp) / "recovery.jsonlz4",
+                windows=args.windows,
+                tabs=args.tabs,
+                history_depth=args.depth,
+                title_length=args.title_length,
+                non_ascii_share=args.non_ascii,
+                closed_tabs=args.closed_tabs,
+            ),
+        }
+
+        results = []
+        print(
+            f"{'engine':<34}{'MB':>8}{'best, s':>10}{'MB/s':>8}"
+            f"{'peak, MB':>10}{'blocks':>10}{'gc0':>6}"
+        )
+        for engine in engines:
+            r = measure(engine, files[engine.format], args.repeat)
+            results.append(r)
+            print(
+                f"{r['engine']:<34}{r['file_bytes'] / 1_000_000:>8.2f}{r['best_s']:>10.4f}"
+                f"{r['mb_per_s']:>8.1f}{r['peak_memory_bytes'] / 1_000_000:>10.2f}"
+                f"{r['retained_blocks']:>10}{r['gc_gen0_collections']:>6}"
+            )
+
+    if args.output:
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "parameters": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "compare")
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            dump(report, f, indent=4)
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
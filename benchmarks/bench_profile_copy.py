@@ -0,0 +1,256 @@
+import os
+import sys
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from filecmp import clear_cache, cmp
+from pathlib import Path
+from shutil import copy2, copyfile, copytree, rmtree
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Optional
+
+from psutil import Process
+
+from benchmarks.profile_generators import write_chromium_profile, write_firefox_profile
+from migrations.exporter import export_profile_files
+from migrations.importer import restore_profile_files
+from utils.get_browser_profile_paths import ignore_files
+
+## Profile copy benchmark suite
+# Builds synthetic Chromium and Firefox profile trees and times export, restore and
+# verification with several copy strategies and worker counts.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_profile_copy --extensions 40 --workers 1 4 8
+
+# Operations counted through the audit hook; os.stat and plain reads are not audited and are
+# covered by the read/write syscall counters of psutil instead.
+AUDITED_EVENTS = {
+    "open",
+    "os.listdir",
+    "os.scandir",
+    "os.mkdir",
+    "os.chmod",
+    "os.utime",
+    "os.remove",
+    "os.rmdir",
+    "shutil.copyfile",
+    "shutil.copystat",
+    "shutil.copytree",
+}
+
+_events: Counter = Counter()
+_counting = False
+
+
+def _audit(event: str, args: tuple) -> None:
+    if _counting and event in AUDITED_EVENTS:
+        _events[event] += 1
+
+
+sys.addaudithook(_audit)
+
+
+def tree_size(root: Path) -> tuple[int, int]:
+    files = size = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            size += os.lstat(os.path.join(directory, name)).st_size
+    return files, size
+
+
+def plan_copy(
+    src: Path, dst: Path, ignore: Optional[Callable[[str, list[str]], list[str]]]
+) -> list[tuple[str, str]]:
+    """
+    Walks a tree like copytree does, creates the destination directories and returns the
+    file pairs to copy.
+    """
+
+    pairs = []
+    for directory, dirs, names in os.walk(src):
+        ignored = set(ignore(directory, dirs + names)) if ignore else set()
+        dirs[:] = [d for d in dirs if d not in ignored]
+        target = dst / Path(directory).relative_to(src)
+        target.mkdir(parents=True, exist_ok=True)
+        pairs.extend(
+            (os.path.join(directory, name), str(target / name))
+            for name in names
+            if name not in ignored
+        )
+    return pairs
+
+
+def copy_with_pool(
+    src: Path,
+    dst: Path,
+    ignore: Optional[Callable[[str, list[str]], list[str]]],
+    copy_function: Callable[[str, str], object],
+    workers: int,
+) -> None:
+    pairs = plan_copy(src, dst, ignore)
+    with ThreadPoolExecutor(workers) as pool:
+        for _ in pool.map(lambda pair: copy_function(*pair), pairs):
+            pass
+
+
+def export_with(
+    strategy: str, workers: int, browser: str, src: Path, out: Path
+) -> Path:
+    ignore = lambda directory, names: ignore_files(Path(directory), names, browser)
+    destination = out / browser
+    match strategy:
+        case "copytree":  # the exporter's own code path
+            export_profile_files(browser, src, out)
+        case "copytree-copyfile":
+            copytree(src, destination, ignore=ignore, copy_function=copyfile)
+        case "pool-copy2":
+            copy_with_pool(src, destination, ignore, copy2, workers)
+        case "pool-copyfile":
+            copy_with_pool(src, destination, ignore, copyfile, workers)
+    return destination
+
+
+def restore_with(strategy: str, workers: int, src: Path, dst: Path) -> None:
+    match strategy:
+        case "copytree":  # the importer's own code path
+            restore_profile_files(src, dst)
+        case "copytree-copyfile":
+            copytree(src, dst, copy_function=copyfile)
+        case "pool-copy2":
+            copy_with_pool(src, dst, None, copy2, workers)
+        case "pool-copyfile":
+            copy_with_pool(src, dst, None, copyfile, workers)
+
+
+def verify(expected: Path, actual: Path) -> int:
+    """
+    Compares every file of the copy with its source byte by byte.
+
+    Returns:
+        int: The number of files compared.
+    """
+
+    clear_cache()  # filecmp caches results by path and stat signature
+    count = 0
+    for directory, _, names in os.walk(actual):
+        relative = Path(directory).relative_to(actual)
+        for name in names:
+            if not cmp(
+                expected / relative / name, Path(directory) / name, shallow=False
+            ):
+                raise AssertionError(f"Copy differs: {relative / name}")
+            count += 1
+    return count
+
+
+def measure(phase: str, func: Callable[[], object]) -> dict:
+    global _counting
+
+    io = Process().io_counters() if hasattr(Process, "io_counters") else None
+    _events.clear()
+    _counting = True
+    start = perf_counter()
+    try:
+        func()
+    finally:
+        elapsed = perf_counter() - start
+        _counting = False
+    after = Process().io_counters() if io else None
+
+    return {
+        "phase": phase,
+        "seconds": elapsed,
+        "read_syscalls": after.read_count - io.read_count if io else None,
+        "write_syscalls": after.write_count - io.write_count if io else None,
+        "audited_ops": sum(_events.values()),
+        "top_ops": dict(_events.most_common(3)),
+    }
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark profile export and restore.")
+    parser.add_argument("--extensions", type=int, default=20)
+    parser.add_argument("--files-per-extension", type=int, default=50)
+    parser.add_argument("--sqlite-mb", type=int, default=8)
+    parser.add_argument("--cache-depth", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument(
+        "--strategy",
+        nargs="+",
+        default=["copytree", "copytree-copyfile", "pool-copy2", "pool-copyfile"],
+    )
+    parser.add_argument("--browser", nargs="+", default=["Chrome", "Firefox"])
+    parser.add_argument(
+        "--dir", type=Path, help="where to build the trees (default: a temporary dir)"
+    )
+    args = parser.parse_args()
+
+    with TemporaryDirectory(dir=args.dir) as tmp:
+        root = Path(tmp)
+        sources = {}
+        if "Chrome" in args.browser:
+            sources["Chrome"] = write_chromium_profile(
+                root / "src" / "Chrome",
+                extensions=args.extensions,
+                files_per_extension=args.files_per_extension,
+                sqlite_size=args.sqlite_mb * 1024 * 1024,
+                cache_depth=args.cache_depth,
+            )
+        if "Firefox" in args.browser:
+            sources["Firefox"] = write_firefox_profile(
+                root / "src" / "Firefox",
+                extensions=args.extensions,
+                sqlite_size=args.sqlite_mb * 1024 * 1024,
+                cache_depth=args.cache_depth,
+            )
+
+        print(
+            f"{'browser':<9}{'strategy':<19}{'wrk':>4} {'phase':<8}{'files':>7}{'MB':>8}"
+            f"{'s':>8}{'files/s':>9}{'MB/s':>8}{'rd':>8}{'wr':>8}{'ops':>8}"
+        )
+        for browser, source in sources.items():
+            total_files, total_size = tree_size(source)
+            print(
+                f"{browser}: source tree {total_files} files, {total_size / 1e6:.1f} MB"
+            )
+            for strategy in args.strategy:
+                pooled = strategy.startswith("pool")
+                for workers in args.workers if pooled else [1]:
+                    out = root / "out"
+                    restored = root / "restored"
+                    rmtree(out, ignore_errors=True)
+                    rmtree(restored, ignore_errors=True)
+
+                    exported = out / browser
+                    results = [
+                        measure(
+                            "export",
+                            lambda: export_with(
+                                strategy, workers, browser, source, out
+                            ),
+                        )
+                    ]
+                    files, size = tree_size(exported)
+                    results.append(
+                        measure(
+                            "restore",
+                            lambda: restore_with(strategy, workers, exported, restored),
+                        )
+                    )
+                    results.append(measure("verify", lambda: verify(source, restored)))
+
+                    for r in results:
+                        seconds = r["seconds"]
+                        print(
+                            f"{browser:<9}{strategy:<19}{workers:>4} {r['phase']:<8}"
+                            f"{files:>7}{size / 1e6:>8.1f}{seconds:>8.3f}"
+                            f"{files / seconds:>9.0f}{size / 1e6 / seconds:>8.1f}"
+                            f"{r['read_syscalls'] or 0:>8}{r['write_syscalls'] or 0:>8}"
+                            f"{r['audited_ops']:>8}"
+                        )
+
+
+if __name__ == "__main__":
+    main()
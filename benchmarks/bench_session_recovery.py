@@ -0,0 +1,105 @@
+import os
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.session_generators import write_jsonlz4_file, write_snss_file
+from migrations.session_recovery import recover_session
+from session_parsers.parse_stats import ParseStats
+from utils.get_browser_profile_paths import find_session_snapshots
+
+## Session recovery benchmark
+# Writes several session snapshots into a synthetic profile, each newer one with more tabs
+# than the one before, and cuts the newest one off at --truncate of its size, as a browser
+# killed while writing it would. The snapshots are then recovered with one worker (parsed one
+# after another) and with several, and the benchmark prints the time, the recovered tabs and
+# the snapshot each of them came from.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_session_recovery --browser Chrome --tabs 5000 --truncate 0.6
+
+FIREFOX_SNAPSHOTS = [
+    "sessionstore-backups/upgrade.jsonlz4-20240101000000",
+    "sessionstore-backups/previous.jsonlz4",
+    "sessionstore-backups/recovery.baklz4",
+    "sessionstore-backups/recovery.jsonlz4",
+]
+
+
+def write_snapshots(
+    profile: Path, browser: str, count: int, tabs: int, depth: int
+) -> list[Path]:
+    """Writes `count` snapshots, oldest first; snapshot i holds tabs * (i + 1) / count tabs."""
+
+    paths = []
+    for index in range(count):
+        open_tabs = max(1, tabs * (index + 1) // count)
+        if browser == "Firefox":
+            path = profile / "abcd.default" / FIREFOX_SNAPSHOTS[index % 4]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_jsonlz4_file(
+                path, tabs=open_tabs, history_depth=depth, non_ascii_share=0.1
+            )
+        else:
+            path = profile / "Default" / "Sessions" / f"Session_{13_300_000 + index}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_snss_file(
+                path,
+                tabs=open_tabs,
+                history_depth=depth,
+                non_ascii_share=0.1,
+                command_noise=1.0,
+            )
+        os.utime(path, (1_700_000_000 + index, 1_700_000_000 + index))
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark multi-snapshot session recovery.")
+    parser.add_argument("--browser", default="Chrome")
+    parser.add_argument("--snapshots", type=int, default=4)
+    parser.add_argument("--tabs", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--truncate", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        profile = Path(tmp)
+        paths = write_snapshots(
+            profile, args.browser, min(args.snapshots, 4), args.tabs, args.depth
+        )
+        newest = paths[-1]
+        size = newest.stat().st_size
+        os.truncate(newest, int(size * args.truncate))
+        os.utime(newest, (1_700_000_100, 1_700_000_100))
+
+        snapshots = find_session_snapshots(profile, args.browser)
+        total = sum(path.stat().st_size for path in snapshots)
+        print(
+            f"{len(snapshots)} snapshots, {total / 1e6:.1f} MB, {os.cpu_count()} CPUs"
+        )
+        print(f"{'workers':<10}{'time, s':>10}{'tabs':>8}{'recovered':>11}")
+        for workers in args.workers:
+            stats = ParseStats()
+            start = perf_counter()
+            recovered, report = recover_session(
+                profile, snapshots, args.browser, stats=stats, workers=workers
+            )
+            elapsed = perf_counter() - start
+            print(
+                f"{workers:<10}{elapsed:>10.3f}{len(recovered):>8}"
+                f"{stats.tabs_recovered:>11}"
+            )
+
+        for source in report:
+            print(
+                f"  {source['source']:<60}{source['tabs']:>7} read"
+                f"{source['tabs_used']:>7} used"
+                f"{source['truncated_bytes']:>10} bytes truncated"
+            )
+
+
+if __name__ == "__main__":
+    main()
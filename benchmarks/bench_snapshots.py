@@ -0,0 +1,116 @@
+import os
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.profile_generators import MB, write_chromium_profile
+from migrations.exporter import export_profile_files
+from migrations.snapshots import (
+    RetentionPolicy,
+    finish_snapshot,
+    list_snapshots,
+    new_snapshot,
+    prune_snapshots,
+)
+from utils.metrics import metrics
+
+## Snapshot export benchmark
+# Exports a synthetic Chromium profile once a simulated day, each day after rewriting a share
+# of its files (--churn), as full copies and as snapshots hardlinked to the previous one.
+# Prints the time of every export and the disk space used by all exports so far, then prunes
+# the snapshots with the retention options and prints the time and the space left.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_snapshots --days 14 --churn 0.05 --keep-daily 7 --keep-weekly 2
+
+
+def disk_usage(root: Path) -> int:
+    """Bytes of the distinct files under root, hardlinks counted once."""
+
+    seen = set()
+    size = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            info = os.lstat(os.path.join(directory, name))
+            if (info.st_dev, info.st_ino) not in seen:
+                seen.add((info.st_dev, info.st_ino))
+                size += info.st_size
+    return size
+
+
+def touch_files(profile: Path, share: float, rng: Random) -> None:
+    """Rewrites `share` of the files of the profile, as a day of browsing does."""
+
+    for directory, _, names in os.walk(profile):
+        for name in names:
+            if rng.random() < share:
+                path = Path(directory) / name
+                data = path.read_bytes()
+                path.write_bytes(
+                    data[:-1] + bytes([rng.randrange(256)]) if data else b""
+                )
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark hardlinked export snapshots.")
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0.05)
+    parser.add_argument("--extensions", type=int, default=40)
+    parser.add_argument("--sqlite-mb", type=int, default=16)
+    parser.add_argument("--keep-last", type=int, default=0)
+    parser.add_argument("--keep-daily", type=int, default=7)
+    parser.add_argument("--keep-weekly", type=int, default=0)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp:
+        temp = Path(temp)
+        profile = write_chromium_profile(
+            temp / "User Data",
+            extensions=args.extensions,
+            sqlite_size=args.sqlite_mb * MB,
+        )
+        session_file = temp / "browser_data.json"
+        session_file.write_text("{}")
+        full_root = temp / "full"
+        snapshot_root = temp / "snapshots"
+        rng = Random(0)
+        start_day = datetime(2024, 1, 1, 3)
+
+        print(f"{'day':<5}{'full, s':>9}{'full MB':>10}{'snap, s':>9}{'snap MB':>10}")
+        for day in range(args.days):
+            if day:
+                touch_files(profile, args.churn, rng)
+
+            start = perf_counter()
+            export_profile_files("Chrome", profile, full_root / str(day))
+            full_seconds = perf_counter() - start
+
+            metrics.reset("export")
+            previous = list_snapshots(snapshot_root)
+            base = previous[0] if previous else None
+            start = perf_counter()
+            snapshot = new_snapshot(snapshot_root, start_day + timedelta(days=day))
+            export_profile_files("Chrome", profile, snapshot, link_dest=base)
+            finish_snapshot(snapshot, session_file, ["Chrome"], base)
+            snapshot_seconds = perf_counter() - start
+
+            print(
+                f"{day:<5}{full_seconds:>9.3f}{disk_usage(full_root) / 1e6:>10.1f}"
+                f"{snapshot_seconds:>9.3f}{disk_usage(snapshot_root) / 1e6:>10.1f}"
+            )
+
+        policy = RetentionPolicy(args.keep_last, args.keep_daily, args.keep_weekly)
+        start = perf_counter()
+        removed = prune_snapshots(policy, snapshot_root)
+        elapsed = perf_counter() - start
+        print(
+            f"pruned {len(removed)} snapshots in {elapsed:.3f} s, "
+            f"{len(list_snapshots(snapshot_root))} kept, "
+            f"{disk_usage(snapshot_root) / 1e6:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.session_generators import write_snss_file
+from session_parsers.chromium_parser import parse_snss_file
+
+## Parallel SNSS decoding benchmark
+# Writes one large SNSS file and parses it with full history using a growing number of
+# decoding processes. Every result is compared with the sequential one.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_snss_parallel --tabs 20000 --depth 20 --workers 1 2 4 8
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark parallel SNSS payload decoding.")
+    parser.add_argument("--tabs", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--windows", type=int, default=4)
+    parser.add_argument("--closed", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        snss = write_snss_file(
+            Path(tmp) / "Session_1",
+            tabs=args.tabs,
+            history_depth=args.depth,
+            title_length=60,
+            non_ascii_share=0.1,
+            command_noise=1.0,
+            windows=args.windows,
+            closed_tabs=args.closed,
+        )
+        size = snss.stat().st_size
+        print(f"{size / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+        expected = parse_snss_file(snss)
+        baseline = None
+        print(f"{'workers':<10}{'best, s':>10}{'MB/s':>8}{'speedup':>9}  same result")
+        for workers in args.workers:
+            timings = []
+            for _ in range(args.repeat):
+                start = perf_counter()
+                windows = parse_snss_file(snss, workers=workers)
+                timings.append(perf_counter() - start)
+            best = min(timings)
+            baseline = baseline or best
+            print(
+                f"{workers:<10}{best:>10.3f}{size / best / 1e6:>8.1f}"
+                f"{baseline / best:>9.2f}  {windows == expected}"
+            )
+
+
+if __name__ == "__main__":
+    main()
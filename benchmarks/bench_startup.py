@@ -0,0 +1,88 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from subprocess import run
+from time import perf_counter
+from typing import NamedTuple
+
+## Startup time
+# Measures how long the entry points take to start, and which imports that time goes to,
+# using the interpreter's own `-X importtime` report.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_startup --repeat 10 --top 15
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CASES = {
+    "cli --help": [str(ROOT / "main.py"), "--help"],
+    "cli plan --help": [str(ROOT / "main.py"), "plan", "--help"],
+    "import ui.cli": ["-c", "import ui.cli"],
+    "import ui.menu": ["-c", "import ui.menu"],
+}
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for imports not nested under another module
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """
+    Parses the `-X importtime` report.
+
+    Args:
+        stderr (str): Standard error of the measured process.
+
+    Returns:
+        list[ImportRecord]: One record per imported module, in report order.
+    """
+
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append(
+            ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth)
+        )
+    return records
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Measure entry point startup time.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'case':<20}{'best wall, ms':>15}{'imports, ms':>13}{'modules':>9}")
+    reports = {}
+    for name, command in CASES.items():
+        wall = []
+        for _ in range(args.repeat):
+            start = perf_counter()
+            result = run(
+                [sys.executable, "-X", "importtime", *command],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+            )
+            wall.append(perf_counter() - start)
+        records = parse_importtime(result.stderr)
+        total = sum(r.cumulative_us for r in records if r.depth == 0)
+        reports[name] = records
+        print(
+            f"{name:<20}{min(wall) * 1000:>15.1f}{total / 1000:>13.1f}{len(records):>9}"
+        )
+
+    for name, records in reports.items():
+        print(f"\n{name}: slowest imports (cumulative, ms)")
+        slowest = sorted(records, key=lambda r: r.cumulative_us, reverse=True)
+        for record in slowest[: args.top]:
+            print(f"  {record.module:<50}{record.cumulative_us / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.session_generators import (
+    make_title,
+    make_url,
+    write_jsonlz4_file,
+    write_snss_file,
+)
+from migrations.tab_index import index_tabs, search_tabs
+from utils.json_handler import BrowserDataWriter
+
+## Tab inventory benchmark
+# Writes a fleet of browser_data.json exports (one per user) plus a few session files,
+# indexes them, indexes them again (every file unchanged) and times typical searches.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_tab_index --users 500 --tabs 2000
+
+
+def write_fleet(root: Path, users: int, tabs: int, seed: int = 0) -> None:
+    rng = Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    for user in range(users):
+        profile = f"C:/Users/user{user:04d}/AppData/Local/Google/Chrome/User Data"
+        header = {"ui_language": "en", "timestamp": "2026-01-01T00:00:00"}
+        with BrowserDataWriter(
+            root / f"browser_data_user{user:04d}.json.lz4", header
+        ) as writer:
+            for browser in ("Chrome", "Firefox"):
+                browser_tabs = [
+                    {
+                        "url": (
+                            f"https://crm.corp.example.net/deal/{index}"
+                            if rng.random() < 0.001
+                            else make_url(rng, index, 0)
+                        ),
+                        "title": make_title(rng, 40, 0.1),
+                        "window": index % 3,
+                    }
+                    for index in range(tabs // 2)
+                ]
+                writer.write_browser(browser, {"profile_path": profile}, browser_tabs)
+    home = root / "sessions" / "home" / "anna"
+    snss = home / ".config/google-chrome/Default/Sessions/Session_1"
+    jsonlz4 = home / "firefox/abcd.default/sessionstore-backups/recovery.jsonlz4"
+    for path in (snss, jsonlz4):
+        path.parent.mkdir(parents=True)
+    write_snss_file(snss, tabs=tabs)
+    write_jsonlz4_file(jsonlz4, tabs=tabs)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the tab inventory.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tabs", type=int, default=2000, help="tabs per export")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp:
+        temp = Path(temp)
+        fleet = temp / "fleet"
+        write_fleet(fleet, args.users, args.tabs)
+        database = temp / "tab_index.sqlite"
+
+        for run in ("first index", "second index"):
+            start = perf_counter()
+            totals = index_tabs(database, [fleet])
+            elapsed = perf_counter() - start
+            print(
+                f"{run:<14} {totals['indexed']:>6} files {totals['tabs']:>10} tabs "
+                f"{totals['skipped']:>6} skipped {elapsed:>8.2f} s"
+            )
+        print(f"database: {database.stat().st_size / 1e6:.1f} MB")
+
+        queries = [
+            {"text": "crm.corp"},
+            {"text": "crm.corp", "group_by": "user"},
+            {"host": "crm.corp.example.net", "group_by": "user"},
+            {"text": "dashboard"},
+            {"text": "dash*", "browser": "Firefox"},
+            {"text": "профиль отчёт"},
+            {"text": "wiki", "user": "user0001"},
+        ]
+        for query in queries:
+            start = perf_counter()
+            for _ in range(args.repeat):
+                rows = search_tabs(database, **query)
+            elapsed = (perf_counter() - start) / args.repeat
+            print(f"{str(query):<58}{len(rows):>5} rows {elapsed * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
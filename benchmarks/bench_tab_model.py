@@ -0,0 +1,125 @@
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from gc import collect
+from random import Random
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Callable, Optional
+
+from structrues.firefox_structures import (
+    FirefoxNavigationEntry,
+    FirefoxTab,
+    FirefoxWindow,
+)
+from structrues.tab_table import TabTable
+
+## Memory of the tab model
+# Builds the same synthetic session three ways and reports the memory retained by the
+# result: dataclasses with a per-instance __dict__ (the previous layout), slotted
+# dataclasses and the columnar TabTable.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_tab_model --tabs 5000 --depth 50
+
+
+@dataclass
+class DictEntry:
+    url: str
+    title: str
+    last_accessed: Optional[int] = None
+    referrer: Optional[str] = None
+
+
+@dataclass
+class DictTab:
+    entries: list
+    index: int = 0
+    pinned: bool = False
+    is_hidden: bool = False
+
+
+@dataclass
+class DictWindow:
+    tabs: list
+
+
+def session_rows(tabs: int, depth: int, seed: int = 0):
+    """
+    Yields (tab, entry, url, title) rows. Strings are built per row, as a parser would,
+    and a share of URLs repeats across tabs.
+    """
+
+    rng = Random(seed)
+    for tab in range(tabs):
+        for entry in range(depth):
+            page = rng.randrange(tabs * depth // 4 + 1)
+            yield tab, entry, f"https://host{page % 97}.example.com/p/{page}", (
+                f"Page {page} title"
+            )
+
+
+def build_objects(tabs: int, depth: int, entry_cls, tab_cls, window_cls) -> object:
+    window_tabs: list = []
+    for tab, entry, url, title in session_rows(tabs, depth):
+        if entry == 0:
+            window_tabs.append(tab_cls(entries=[]))
+        window_tabs[-1].entries.append(entry_cls(url=url, title=title))
+    return [window_cls(tabs=window_tabs)]
+
+
+def build_table(tabs: int, depth: int) -> object:
+    table = TabTable(FirefoxNavigationEntry, FirefoxTab, FirefoxWindow)
+    table.add_window()
+    for tab, entry, url, title in session_rows(tabs, depth):
+        if entry == 0:
+            table.add_tab()
+        table.add_entry(url=url, title=title)
+    return table
+
+
+def measure(build: Callable[[], object]) -> tuple[float, float]:
+    collect()
+    start()
+    started = perf_counter()
+    result = build()
+    elapsed = perf_counter() - started
+    retained = get_traced_memory()[0]
+    stop()
+    del result
+    return retained / 1_000_000, elapsed
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare the memory use of tab models.")
+    parser.add_argument("--tabs", type=int, default=5000)
+    parser.add_argument("--depth", type=int, default=50)
+    args = parser.parse_args()
+
+    cases: list[tuple[str, Callable[[], object]]] = [
+        (
+            "dataclasses with __dict__",
+            lambda: build_objects(
+                args.tabs, args.depth, DictEntry, DictTab, DictWindow
+            ),
+        ),
+        (
+            "slotted dataclasses",
+            lambda: build_objects(
+                args.tabs,
+                args.depth,
+                FirefoxNavigationEntry,
+                FirefoxTab,
+                FirefoxWindow,
+            ),
+        ),
+        ("TabTable", lambda: build_table(args.tabs, args.depth)),
+    ]
+
+    print(f"{args.tabs} tabs x {args.depth} entries")
+    print(f"{'model':<28}{'retained, MB':>14}{'build, s':>10}")
+    for name, build in cases:
+        retained, elapsed = measure(build)
+        print(f"{name:<28}{retained:>14.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
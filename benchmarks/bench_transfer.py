@@ -0,0 +1,185 @@
+import os
+from argparse import ArgumentParser
+from filecmp import cmp
+from multiprocessing import Event, Process
+from pathlib import Path
+from shutil import rmtree
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import migrations.transfer as transfer
+from benchmarks.profile_generators import write_chromium_profile, write_firefox_profile
+from migrations.exporter import export_profile_files
+from migrations.importer import restore_profile_files
+from migrations.transfer import receive_browser_data, send_browser_data
+from utils.get_browser_profile_paths import COMPONENTS, get_browser_profile_path
+
+## Direct transfer benchmark
+# Sends synthetic Chromium and Firefox profiles over loopback with several numbers of
+# parallel connections and compares that with an export to disk followed by a restore.
+# With --interrupt, the first send is cut off after that many data frames and a second
+# send resumes it; the received profiles are compared with the sources byte for byte.
+# Usage (from the repository root):
+#   python -m benchmarks.bench_transfer --connections 1 4 8 --interrupt 200
+
+BROWSERS = ["Chrome", "Firefox"]
+# the synthetic session files are random bytes, so tabs are not sent
+PROFILE_ONLY = {browser: list(COMPONENTS[1:]) for browser in BROWSERS}
+TOKEN = "benchmark"
+
+
+def serve(port: int, home: Path, session_file: Path, ready) -> None:
+    try:
+        receive_browser_data(
+            port,
+            home,
+            "127.0.0.1",
+            str(session_file),
+            TOKEN,
+            launch=False,
+            ready=ready,
+        )
+    except Exception:
+        pass  # the interrupted run fails on purpose
+
+
+def receive_in_background(port: int, home: Path, session_file: Path) -> Process:
+    ready = Event()
+    process = Process(target=serve, args=(port, home, session_file, ready), daemon=True)
+    process.start()
+    ready.wait(10)
+    return process
+
+
+def compare_trees(source_home: Path, target_home: Path) -> int:
+    mismatches = 0
+    for browser in BROWSERS:
+        source = get_browser_profile_path(source_home, browser)
+        target = get_browser_profile_path(target_home, browser)
+        for directory, _, names in os.walk(target):
+            for name in names:
+                relative = Path(directory, name).relative_to(target)
+                if not cmp(source / relative, target / relative, shallow=False):
+                    mismatches += 1
+    return mismatches
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the direct transfer mode.")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--extensions", type=int, default=40)
+    parser.add_argument("--sqlite-mb", type=int, default=16)
+    parser.add_argument("--port", type=int, default=50515)
+    parser.add_argument("--interrupt", type=int, metavar="FRAMES")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp:
+        temp = Path(temp)
+        os.chdir(temp)  # send_metrics.json is written to the current directory
+        source_home = temp / "source"
+        write_chromium_profile(
+            get_browser_profile_path(source_home, "Chrome"),
+            extensions=args.extensions,
+            sqlite_size=args.sqlite_mb * 1024 * 1024,
+        )
+        write_firefox_profile(
+            get_browser_profile_path(source_home, "Firefox"),
+            extensions=args.extensions,
+            sqlite_size=args.sqlite_mb * 1024 * 1024,
+        )
+
+        start = perf_counter()
+        exported = {
+            browser: export_profile_files(
+                browser,
+                get_browser_profile_path(source_home, browser),
+                temp / "exported_profiles",
+            )
+            for browser in BROWSERS
+        }
+        for browser, export_path in exported.items():
+            restore_profile_files(
+                export_path,
+                get_browser_profile_path(temp / "restored", browser),
+                browser,
+            )
+        elapsed = perf_counter() - start
+        print(f"{'method':<28}{'files':>8}{'MB':>9}{'seconds':>9}")
+        print(f"{'export + restore':<28}{'':>8}{'':>9}{elapsed:>9.3f}")
+
+        for connections in args.connections:
+            target_home = temp / f"target-{connections}"
+            receiver = receive_in_background(
+                args.port, target_home, temp / f"received-{connections}.json"
+            )
+            start = perf_counter()
+            summary = send_browser_data(
+                "127.0.0.1",
+                args.port,
+                source_home,
+                connections,
+                browsers=BROWSERS,
+                components=PROFILE_ONLY,
+                token=TOKEN,
+            )
+            elapsed = perf_counter() - start
+            receiver.join()
+            files = sum(totals["files"] for totals in summary.values())
+            size = sum(totals["bytes"] for totals in summary.values())
+            print(
+                f"{f'send, {connections} connections':<28}{files:>8}"
+                f"{size / 1e6:>9.1f}{elapsed:>9.3f}"
+            )
+            rmtree(target_home)
+
+        if args.interrupt:
+            target_home = temp / "target-resumed"
+            send_frame = transfer.send_frame
+            frames = 0
+
+            def failing_send_frame(sock, kind, payload=b""):
+                nonlocal frames
+                if kind in (transfer.DATA, transfer.DATA_LZ4):
+                    frames += 1
+                    if frames > args.interrupt:
+                        sock.close()
+                        raise ConnectionError("interrupted by the benchmark")
+                send_frame(sock, kind, payload)
+
+            receiver = receive_in_background(args.port, target_home, temp / "x.json")
+            transfer.send_frame = failing_send_frame
+            try:
+                send_browser_data(
+                    "127.0.0.1",
+                    args.port,
+                    source_home,
+                    browsers=BROWSERS,
+                    components=PROFILE_ONLY,
+                    token=TOKEN,
+                )
+            except Exception as e:
+                print(f"{'interrupted send':<28}{'':>8}{'':>9}{'':>9}  {e}")
+            finally:
+                transfer.send_frame = send_frame
+            receiver.join()
+
+            receiver = receive_in_background(args.port, target_home, temp / "y.json")
+            start = perf_counter()
+            summary = send_browser_data(
+                "127.0.0.1",
+                args.port,
+                source_home,
+                browsers=BROWSERS,
+                components=PROFILE_ONLY,
+                token=TOKEN,
+            )
+            elapsed = perf_counter() - start
+            receiver.join()
+            files = sum(totals["files"] for totals in summary.values())
+            size = sum(totals["bytes"] for totals in summary.values())
+            print(f"{'resumed send':<28}{files:>8}{size / 1e6:>9.1f}{elapsed:>9.3f}")
+            print(f"mismatching files: {compare_trees(source_home, target_home)}")
+
+
+if __name__ == "__main__":
+    main()
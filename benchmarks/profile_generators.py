@@ -0,0 +1,452 @@
+import sqlite3
+from json import dumps
+from pathlib import Path
+from random import Random
+from time import time
+
+## Synthetic profile trees
+# Writers for Chromium and Firefox profile directories shaped like the ones
+# export_profile_files copies: many tiny extension files, a few large SQLite databases
+# and deep cache directories that ignore_files is expected to skip.
+
+KB = 1024
+MB = 1024 * KB
+
+
+def file_size(rng: Random, median: int, sigma: float = 1.0) -> int:
+    """
+    Draws a file size from a log-normal distribution, which matches real profile trees well.
+
+    Args:
+        rng (Random): Random source.
+        median (int): Median size in bytes.
+        sigma (float): Spread of the distribution. Default is 1.0.
+
+    Returns:
+        int: Size in bytes, at least 1.
+    """
+
+    return max(1, int(rng.lognormvariate(0, sigma) * median))
+
+
+def write_file(path: Path, size: int, rng: Random) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(rng.randbytes(size))
+
+
+def write_sqlite_file(path: Path, size: int) -> None:
+    """
+    Writes a valid SQLite database of roughly the given size.
+
+    Args:
+        path (Path): Destination file.
+        size (int): Approximate size in bytes.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("CREATE TABLE data (id INTEGER PRIMARY KEY, value BLOB)")
+        rows = max(1, size // (4 * KB))
+        connection.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)"
+            " INSERT INTO data (value) SELECT randomblob(4000) FROM n",
+            (rows,),
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+# Abridged schemas of Chromium's History and Firefox's places.sqlite: the tables and indexes
+# the history export reads, plus tables that reference visits and URLs.
+CHROMIUM_HISTORY_SCHEMA = """
+CREATE TABLE meta(key LONGVARCHAR NOT NULL UNIQUE PRIMARY KEY, value LONGVARCHAR);
+CREATE TABLE urls(id INTEGER PRIMARY KEY AUTOINCREMENT, url LONGVARCHAR, title LONGVARCHAR,
+    visit_count INTEGER DEFAULT 0 NOT NULL, typed_count INTEGER DEFAULT 0 NOT NULL,
+    last_visit_time INTEGER NOT NULL, hidden INTEGER DEFAULT 0 NOT NULL);
+CREATE TABLE visits(id INTEGER PRIMARY KEY AUTOINCREMENT, url INTEGER NOT NULL,
+    visit_time INTEGER NOT NULL, from_visit INTEGER, transition INTEGER DEFAULT 0 NOT NULL,
+    segment_id INTEGER, visit_duration INTEGER DEFAULT 0 NOT NULL);
+CREATE TABLE visit_source(id INTEGER PRIMARY KEY, source INTEGER NOT NULL);
+CREATE TABLE keyword_search_terms(keyword_id INTEGER NOT NULL, url_id INTEGER NOT NULL,
+    term LONGVARCHAR NOT NULL, normalized_term LONGVARCHAR NOT NULL);
+CREATE INDEX visits_url_index ON visits (url);
+CREATE INDEX visits_from_index ON visits (from_visit);
+CREATE INDEX visits_time_index ON visits (visit_time);
+CREATE INDEX urls_url_index ON urls (url);
+CREATE INDEX keyword_search_terms_index2 ON keyword_search_terms (url_id);
+INSERT INTO meta VALUES ('version', '66'), ('last_compatible_version', '16');
+"""
+FIREFOX_PLACES_SCHEMA = """
+CREATE TABLE moz_places(id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+    rev_host LONGVARCHAR, visit_count INTEGER DEFAULT 0, hidden INTEGER DEFAULT 0 NOT NULL,
+    typed INTEGER DEFAULT 0 NOT NULL, frecency INTEGER DEFAULT -1 NOT NULL,
+    last_visit_date INTEGER, guid TEXT, foreign_count INTEGER DEFAULT 0 NOT NULL,
+    url_hash INTEGER DEFAULT 0 NOT NULL, origin_id INTEGER REFERENCES moz_origins(id));
+CREATE TABLE moz_origins(id INTEGER PRIMARY KEY, prefix TEXT NOT NULL, host TEXT NOT NULL,
+    frecency INTEGER NOT NULL, UNIQUE (prefix, host));
+CREATE TABLE moz_historyvisits(id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+    visit_date INTEGER, visit_type INTEGER, session INTEGER,
+    source INTEGER DEFAULT 0 NOT NULL, triggeringPlaceId INTEGER);
+CREATE TABLE moz_bookmarks(id INTEGER PRIMARY KEY, type INTEGER, fk INTEGER DEFAULT NULL,
+    parent INTEGER, position INTEGER, title LONGVARCHAR, keyword_id INTEGER,
+    folder_type TEXT, dateAdded INTEGER, lastModified INTEGER, guid TEXT);
+CREATE TABLE moz_inputhistory(place_id INTEGER NOT NULL, input LONGVARCHAR NOT NULL,
+    use_count INTEGER, PRIMARY KEY (place_id, input));
+CREATE INDEX moz_places_url_hashindex ON moz_places (url_hash);
+CREATE INDEX moz_places_hostindex ON moz_places (rev_host);
+CREATE INDEX moz_places_lastvisitdateindex ON moz_places (last_visit_date);
+CREATE UNIQUE INDEX moz_places_guid_uniqueindex ON moz_places (guid);
+CREATE INDEX moz_historyvisits_placedateindex ON moz_historyvisits (place_id, visit_date);
+CREATE INDEX moz_historyvisits_dateindex ON moz_historyvisits (visit_date);
+CREATE INDEX moz_bookmarks_itemindex ON moz_bookmarks (fk, type);
+CREATE UNIQUE INDEX moz_bookmarks_guid_uniqueindex ON moz_bookmarks (guid);
+INSERT INTO moz_bookmarks (id, type, parent, position, title, guid) VALUES
+    (1, 2, 0, 0, '', 'root________'), (2, 2, 1, 0, 'menu', 'menu________'),
+    (3, 2, 1, 1, 'toolbar', 'toolbar_____'), (4, 2, 1, 2, 'tags', 'tags________'),
+    (5, 2, 1, 3, 'unfiled', 'unfiled_____'), (6, 2, 1, 4, 'mobile', 'mobile______');
+PRAGMA user_version = 77;
+"""
+
+
+def write_history_database(
+    path: Path,
+    browser: str,
+    urls: int = 20_000,
+    visits: int = 200_000,
+    years: float = 5.0,
+    bookmarks: int = 500,
+    seed: int = 0,
+) -> Path:
+    """
+    Writes a History (Chromium) or places.sqlite (Firefox) database with visits spread
+    evenly over the last `years` years and a few popular URLs that get most of them.
+
+    Args:
+        path (Path): Destination file.
+        browser (str): "Firefox" for places.sqlite, any other name for Chromium's History.
+        urls (int): Number of URLs. Default is 20 000.
+        visits (int): Number of visits. Default is 200 000.
+        years (float): Age of the oldest visit in years. Default is 5.0.
+        bookmarks (int): Bookmarked URLs (Firefox only). Default is 500.
+        seed (int): Random seed. Default is 0.
+
+    Returns:
+        Path: The database.
+    """
+
+    rng = Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    firefox = browser == "Firefox"
+    # microseconds since 1970 (Firefox) or 1601 (Chromium)
+    now = int(time() * 1_000_000) + (0 if firefox else 11_644_473_600_000_000)
+    span = int(years * 365 * 24 * 3600 * 1_000_000)
+
+    times = sorted(now - rng.randrange(span) for _ in range(visits))
+    visit_rows = [
+        (index + 1, int(urls * rng.random() ** 3) + 1, visit_time)
+        for index, visit_time in enumerate(times)
+    ]
+    last_visit: dict[int, int] = {}
+    counts: dict[int, int] = {}
+    for _, url_id, visit_time in visit_rows:
+        last_visit[url_id] = visit_time
+        counts[url_id] = counts.get(url_id, 0) + 1
+
+    def url_row(url_id: int) -> tuple:
+        host = f"site{url_id % 997}.example.com"
+        url = f"https://{host}/{rng.randbytes(12).hex()}/{url_id}"
+        title = " ".join(rng.randbytes(4).hex() for _ in range(rng.randint(3, 12)))
+        return (
+            url_id,
+            url,
+            title,
+            host,
+            counts.get(url_id, 0),
+            last_visit.get(url_id, 0),
+        )
+
+    connection = sqlite3.connect(path)
+    try:
+        if firefox:
+            connection.executescript(FIREFOX_PLACES_SCHEMA)
+            connection.executemany(
+                "INSERT INTO moz_places (id, url, title, rev_host, visit_count,"
+                " last_visit_date, guid, url_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (*row[:3], row[3][::-1] + ".", *row[4:], f"{row[0]:012x}", row[0])
+                    for row in map(url_row, range(1, urls + 1))
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO moz_historyvisits (id, place_id, visit_date, visit_type)"
+                " VALUES (?, ?, ?, 1)",
+                visit_rows,
+            )
+            connection.executemany(
+                "INSERT INTO moz_bookmarks (type, fk, parent, position, title, guid)"
+                " VALUES (1, ?, 3, ?, 'bookmark', ?)",
+                (
+                    (rng.randint(1, urls), index, f"bookmark{index:04x}")
+                    for index in range(bookmarks)
+                ),
+            )
+            connection.execute(
+                "UPDATE moz_places SET foreign_count ="
+                " (SELECT count(*) FROM moz_bookmarks WHERE fk = moz_places.id)"
+            )
+        else:
+            connection.executescript(CHROMIUM_HISTORY_SCHEMA)
+            connection.executemany(
+                "INSERT INTO urls (id, url, title, visit_count, last_visit_time)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (row[:3] + row[4:] for row in map(url_row, range(1, urls + 1))),
+            )
+            connection.executemany(
+                "INSERT INTO visits (id, url, visit_time, transition)"
+                " VALUES (?, ?, ?, 805306376)",
+                visit_rows,
+            )
+            connection.executemany(
+                "INSERT INTO visit_source (id, source) VALUES (?, 0)",
+                ((row[0],) for row in visit_rows[::10]),
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    return path
+
+
+def write_bookmarks_file(path: Path, bookmarks: int = 500, seed: int = 0) -> Path:
+    """
+    Writes a Chromium Bookmarks file with bookmarks spread over the bookmarks bar and a few
+    nested folders of "Other bookmarks".
+
+    Args:
+        path (Path): Destination file.
+        bookmarks (int): Number of bookmarks. Default is 500.
+        seed (int): Random seed. Default is 0.
+
+    Returns:
+        Path: The file.
+    """
+
+    rng = Random(seed)
+    next_id = 4
+
+    def node(**fields) -> dict:
+        nonlocal next_id
+        next_id += 1
+        return {
+            "date_added": "13300000000000000",
+            "guid": f"00000000-0000-4000-8000-{next_id:012x}",
+            "id": str(next_id),
+            **fields,
+        }
+
+    bar = {"children": [], "id": "1", "name": "Bookmarks bar", "type": "folder"}
+    other = {"children": [], "id": "2", "name": "Other bookmarks", "type": "folder"}
+    folders = [bar, other]
+    for index in range(bookmarks):
+        if index % 50 == 0:
+            folder = node(children=[], name=f"Folder {index // 50}", type="folder")
+            rng.choice(folders)["children"].append(folder)
+            folders.append(folder)
+        rng.choice(folders)["children"].append(
+            node(
+                name=f"Bookmark {index}",
+                type="url",
+                url=f"https://site{index % 997}.example.com/{index}",
+            )
+        )
+    synced = {"children": [], "id": "3", "name": "Mobile bookmarks", "type": "folder"}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        dumps(
+            {"roots": {"bookmark_bar": bar, "other": other, "synced": synced}},
+            indent=3,
+        )
+    )
+    return path
+
+
+def write_cache_tree(
+    root: Path, rng: Random, depth: int, fanout: int, files_per_dir: int
+) -> int:
+    """
+    Writes a cache-like directory tree with small files at every level.
+
+    Returns:
+        int: The number of files written.
+    """
+
+    count = 0
+    for index in range(files_per_dir):
+        write_file(root / f"f_{index:06x}", file_size(rng, 8 * KB), rng)
+        count += 1
+    if depth > 1:
+        for index in range(fanout):
+            count += write_cache_tree(
+                root / f"{index:02x}", rng, depth - 1, fanout, files_per_dir
+            )
+    return count
+
+
+def write_chromium_profile(
+    root: Path | str,
+    profiles: int = 1,
+    extensions: int = 20,
+    files_per_extension: int = 50,
+    sqlite_files: int = 3,
+    sqlite_size: int = 8 * MB,
+    cache_depth: int = 3,
+    cache_fanout: int = 4,
+    cache_files: int = 10,
+    stale_versions: int = 0,
+    disabled_extensions: int = 0,
+    seed: int = 0,
+) -> Path:
+    """
+    Writes a synthetic Chromium "User Data" directory.
+
+    Every profile ("Default", "Profile 1", ...) gets the files ignore_files keeps (Preferences,
+    Bookmarks, SQLite History/Login Data/Shortcuts, Extensions/<id>/<version>/...) and the
+    cache directories it skips (Cache, Code Cache, Service Worker). Preferences lists the
+    extensions with their current version; older versions are left next to it.
+
+    Args:
+        root (Path | str): The "User Data" directory to create.
+        profiles (int): Number of profiles. Default is 1.
+        extensions (int): Extensions per profile. Default is 20.
+        files_per_extension (int): Tiny files per extension. Default is 50.
+        sqlite_files (int): Large SQLite databases per profile (at most 3). Default is 3.
+        sqlite_size (int): Approximate size of each database in bytes. Default is 8 MB.
+        cache_depth (int): Depth of each cache tree. Default is 3.
+        cache_fanout (int): Subdirectories per cache directory. Default is 4.
+        cache_files (int): Files per cache directory. Default is 10.
+        stale_versions (int): Old versions left next to each extension. Default is 0.
+        disabled_extensions (int): Extensions marked as disabled in Preferences. Default is 0.
+        seed (int): Random seed. Default is 0.
+
+    Returns:
+        Path: The root directory.
+    """
+
+    rng = Random(seed)
+    root = Path(root)
+    write_file(root / "Local State", 4 * KB, rng)
+
+    for number in range(profiles):
+        profile = root / ("Default" if number == 0 else f"Profile {number}")
+        write_file(profile / "Bookmarks", file_size(rng, 32 * KB), rng)
+        (profile / "Secure Preferences").write_text(
+            dumps({"protection": {"macs": {}}}), "utf-8"
+        )
+        for name in ("History", "Login Data", "Shortcuts")[:sqlite_files]:
+            write_sqlite_file(profile / name, sqlite_size)
+
+        settings = {}
+        for index in range(extensions):
+            extension_id = f"{index:032x}"[:32]
+            version = f"{stale_versions + 1}.0.0_0"
+            settings[extension_id] = {
+                "path": f"{extension_id}/{version}",
+                "location": 1,
+                "disable_reasons": 1 if index < disabled_extensions else 0,
+            }
+            for old in range(stale_versions + 1):
+                extension = profile / "Extensions" / extension_id / f"{old + 1}.0.0_0"
+                for file in range(files_per_extension):
+                    write_file(
+                        extension / f"js/module_{file}.js", file_size(rng, 2 * KB), rng
+                    )
+        (profile / "Preferences").write_text(
+            dumps({"extensions": {"settings": settings}}), "utf-8"
+        )
+
+        for cache in (
+            "Cache/Cache_Data",
+            "Code Cache/js",
+            "Service Worker/CacheStorage",
+        ):
+            write_cache_tree(
+                profile / cache, rng, cache_depth, cache_fanout, cache_files
+            )
+        write_file(profile / "Sessions" / "Session_13300000000000000", 64 * KB, rng)
+
+    return root
+
+
+def write_firefox_profile(
+    root: Path | str,
+    extensions: int = 20,
+    extension_size: int = 256 * KB,
+    sqlite_files: int = 3,
+    sqlite_size: int = 8 * MB,
+    cache_depth: int = 3,
+    cache_fanout: int = 4,
+    cache_files: int = 10,
+    disabled_extensions: int = 0,
+    seed: int = 0,
+) -> Path:
+    """
+    Writes a synthetic Firefox profiles directory with one "xxxxxxxx.default" profile.
+
+    The profile holds the files ignore_files keeps (places.sqlite, key4.db, prefs.js,
+    extensions/*.xpi listed in extensions.json, ...) and deep storage/ and cache2/ trees
+    it skips.
+
+    Args:
+        root (Path | str): The profiles directory to create.
+        extensions (int): Number of .xpi files. Default is 20.
+        extension_size (int): Median .xpi size in bytes. Default is 256 KB.
+        sqlite_files (int): Large SQLite databases (at most 3). Default is 3.
+        sqlite_size (int): Approximate size of each database in bytes. Default is 8 MB.
+        cache_depth (int): Depth of each cache tree. Default is 3.
+        cache_fanout (int): Subdirectories per cache directory. Default is 4.
+        cache_files (int): Files per cache directory. Default is 10.
+        disabled_extensions (int): Add-ons marked as inactive in extensions.json. Default is 0.
+        seed (int): Random seed. Default is 0.
+
+    Returns:
+        Path: The root directory.
+    """
+
+    rng = Random(seed)
+    root = Path(root)
+    profile = root / "abcd1234.default"
+    (root / "profiles.ini").parent.mkdir(parents=True, exist_ok=True)
+    (root / "profiles.ini").write_text(
+        "[Profile0]\nName=default\nIsRelative=1\nPath=abcd1234.default\n"
+    )
+
+    for name in ("prefs.js", "logins.json", "xulstore.json"):
+        write_file(profile / name, file_size(rng, 16 * KB), rng)
+    for name in ("places.sqlite", "key4.db", "favicons.sqlite")[:sqlite_files]:
+        write_sqlite_file(profile / name, sqlite_size)
+
+    addons = []
+    for index in range(extensions):
+        path = profile / "extensions" / f"ext{index}@example.com.xpi"
+        write_file(path, file_size(rng, extension_size), rng)
+        addons.append(
+            {
+                "id": f"ext{index}@example.com",
+                "location": "app-profile",
+                "path": str(path),
+                "active": index >= disabled_extensions,
+            }
+        )
+    (profile / "extensions.json").write_text(
+        dumps({"schemaVersion": 36, "addons": addons}), "utf-8"
+    )
+
+    for cache in ("storage/default", "cache2/entries"):
+        write_cache_tree(profile / cache, rng, cache_depth, cache_fanout, cache_files)
+    write_file(profile / "sessionstore-backups" / "recovery.jsonlz4", 64 * KB, rng)
+
+    return root
@@ -0,0 +1,269 @@
+from json import dumps
+from pathlib import Path
+from random import Random
+from struct import pack
+
+from lz4.block import compress  # type: ignore
+
+## Synthetic session files
+# Writers for Chromium SNSS v3 and Firefox mozLz40 session files with a configurable
+# number of tabs and history depth. The layouts follow the ones documented in
+# session_parsers/chromium_parser.py and session_parsers/firefox_parser.py, so the
+# files can be fed to parse_snss_file and parse_jsonlz4_file directly.
+
+WORDS = ["session", "browser", "migration", "profile", "report", "dashboard", "wiki"]
+NON_ASCII_WORDS = ["сессия", "профиль", "отчёт", "панель", "ブラウザ", "データ", "🙂"]
+
+
+def make_title(rng: Random, length: int, non_ascii_share: float) -> str:
+    words: list[str] = []
+    while sum(len(word) + 1 for word in words) < length:
+        pool = NON_ASCII_WORDS if rng.random() < non_ascii_share else WORDS
+        words.append(rng.choice(pool))
+    return " ".join(words)[:length]
+
+
+def make_url(rng: Random, tab: int, entry: int) -> str:
+    host = f"host{tab % 97}.example.com"
+    return f"https://{host}/{rng.choice(WORDS)}/{tab}/{entry}?q={rng.getrandbits(32):x}"
+
+
+def _pickle_string(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return pack("<I", len(raw)) + raw + b"\0" * ((4 - len(raw) % 4) % 4)
+
+
+def _pickle_string16(value: str) -> bytes:
+    raw = value.encode("utf-16-le")
+    return pack("<I", len(raw) // 2) + raw + b"\0" * ((4 - len(raw) % 4) % 4)
+
+
+def snss_command(command_type: int, payload: bytes) -> bytes:
+    return pack("<HB", len(payload) + 1, command_type) + payload
+
+
+def navigation_command(
+    tab_id: int, index: int, url: str, title: str, page_state_size: int = 256
+) -> bytes:
+    """
+    Builds a kCommandUpdateTabNavigation command laid out like SerializedNavigationEntry::WriteToPickle().
+
+    Args:
+        tab_id (int): Tab identifier.
+        index (int): Navigation index within the tab.
+        url (str): Virtual URL of the entry.
+        title (str): Page title.
+        page_state_size (int): Size of the opaque encoded page state. Default is 256.
+
+    Returns:
+        bytes: The framed command.
+    """
+
+    body = (
+        pack("<ii", tab_id, index)
+        + _pickle_string(url)
+        + _pickle_string16(title)
+        + _pickle_string("\x01" * page_state_size)  # encoded_page_state_
+        + pack("<II", 0, 0)  # transition_type_, type_mask
+        + _pickle_string("https://referrer.example.com/")
+        + pack("<i", 0)  # referrer_policy_ (broken)
+        + _pickle_string(url)  # original_request_url_
+        + pack("<I", 0)  # is_overriding_user_agent_
+        + pack("<q", 13_300_000_000_000_000)  # timestamp_
+        + _pickle_string16("")  # search_terms_
+        + pack("<i", 200)  # http_status_code_
+    )
+    return snss_command(6, pack("<I", len(body)) + body)
+
+
+def noise_command(rng: Random, tab_id: int, window_id: int = 1) -> bytes:
+    """
+    Builds a random non-navigation command of the kind Chromium interleaves with navigations.
+
+    Args:
+        rng (Random): Random source.
+        tab_id (int): Tab the command refers to.
+        window_id (int): Window of the tab. Default is 1.
+
+    Returns:
+        bytes: The framed command.
+    """
+
+    match rng.randrange(5):
+        case 0:  # kCommandSetTabWindow
+            return snss_command(0, pack("<ii", window_id, tab_id))
+        case 1:  # kCommandSetTabIndexInWindow
+            return snss_command(2, pack("<ii", tab_id, rng.randrange(100)))
+        case 2:  # kCommandSetPinnedState
+            return snss_command(12, pack("<ii", tab_id, 0))
+        case 3:  # kCommandLastActiveTime
+            return snss_command(
+                21, pack("<iiq", tab_id, 0, 13_300_000_000_000_000 + tab_id)
+            )
+        case _:  # an extension command with an opaque payload
+            return snss_command(250, bytes(rng.randrange(8, 64)))
+
+
+def write_snss_file(
+    path: Path | str,
+    tabs: int = 100,
+    history_depth: int = 10,
+    title_length: int = 40,
+    non_ascii_share: float = 0.0,
+    seed: int = 0,
+    command_noise: float = 0.0,
+    windows: int = 1,
+    closed_tabs: float = 0.0,
+) -> Path:
+    """
+    Writes a synthetic Chromium SNSS v3 session file.
+
+    Every tab is assigned to one of `windows` windows (kCommandSetTabWindow and
+    kCommandSetTabIndexInWindow) and gets `history_depth` navigation entries followed by a
+    kCommandSetSelectedNavigationIndex command that selects a random entry.
+    With `command_noise`, window, pinned-state, last-active-time and unknown commands are
+    interleaved with the navigations, as in files written by a running browser. With
+    `closed_tabs`, that share of the tabs is closed again (kCommandTabClosed) after being
+    written, as tabs closed since the file was last rewritten.
+
+    Args:
+        path (Path | str): Destination file.
+        tabs (int): Number of tabs, including the closed ones. Default is 100.
+        history_depth (int): Navigation entries per tab. Default is 10.
+        title_length (int): Approximate title length in characters. Default is 40.
+        non_ascii_share (float): Share of title words taken from non-ASCII scripts. Default is 0.0.
+        seed (int): Random seed. Default is 0.
+        command_noise (float): Average number of other commands per navigation command. Default is 0.0.
+        windows (int): Number of windows. Default is 1.
+        closed_tabs (float): Share of the tabs that are closed. Default is 0.0.
+
+    Returns:
+        Path: The written file.
+    """
+
+    rng = Random(seed)
+    path = Path(path)
+    with open(path, "wb") as f:
+        f.write(b"SNSS" + pack("<I", 3))
+        for tab_id in range(1, tabs + 1):
+            window_id = 1 + (tab_id - 1) % windows
+            f.write(snss_command(0, pack("<ii", window_id, tab_id)))
+            f.write(snss_command(2, pack("<ii", tab_id, (tab_id - 1) // windows)))
+            for index in range(history_depth):
+                title = make_title(rng, title_length, non_ascii_share)
+                url = make_url(rng, tab_id, index)
+                f.write(navigation_command(tab_id, index, url, title))
+                noise = command_noise
+                while noise > 0 and rng.random() < noise:
+                    f.write(noise_command(rng, tab_id, window_id))
+                    noise -= 1
+            selected = rng.randrange(history_depth)
+            f.write(snss_command(7, pack("<ii", tab_id, selected)))
+        for tab_id in range(1, tabs + 1):
+            if rng.random() < closed_tabs:
+                # kCommandTabClosed: tab ID, padding, close time
+                f.write(snss_command(16, pack("<i4xq", tab_id, 13_300_000_000_000_000)))
+    return path
+
+
+def make_firefox_tab(
+    rng: Random,
+    tab: int,
+    history_depth: int,
+    title_length: int,
+    non_ascii_share: float,
+) -> dict:
+    entries = [
+        {
+            "url": make_url(rng, tab, index),
+            "title": make_title(rng, title_length, non_ascii_share),
+            "cacheKey": 0,
+            "ID": tab * 1000 + index,
+            "docshellUUID": "{%032x}" % rng.getrandbits(128),
+            "referrerInfo": "BBoSnxDOS9qmDeAnom1e0AAAAAAAAAAAwAAAAAAAAEYA",
+            "triggeringPrincipal_base64": '{"3":{}}',
+            "docIdentifier": tab * 1000 + index,
+            "persist": True,
+        }
+        for index in range(history_depth)
+    ]
+    return {
+        "entries": entries,
+        "lastAccessed": 1_700_000_000_000 + tab,
+        "pinned": False,
+        "hidden": False,
+        "attributes": {},
+        "index": rng.randrange(history_depth) + 1,
+        "userContextId": 0,
+        "image": "data:image/png;base64," + "A" * 512,
+        "storage": {"https://example.com": {"key": "v" * 256}},
+    }
+
+
+def write_jsonlz4_file(
+    path: Path | str,
+    windows: int = 1,
+    tabs: int = 100,
+    history_depth: int = 10,
+    title_length: int = 40,
+    non_ascii_share: float = 0.0,
+    closed_tabs: int = 25,
+    seed: int = 0,
+) -> Path:
+    """
+    Writes a synthetic Firefox mozLz40 session file.
+
+    Besides the open tabs, every window carries `closed_tabs` entries in "_closedTabs", and
+    one closed window with the same shape is stored in "_closedWindows".
+
+    Args:
+        path (Path | str): Destination file.
+        windows (int): Number of open windows. Default is 1.
+        tabs (int): Open tabs per window. Default is 100.
+        history_depth (int): Navigation entries per tab. Default is 10.
+        title_length (int): Approximate title length in characters. Default is 40.
+        non_ascii_share (float): Share of title words taken from non-ASCII scripts. Default is 0.0.
+        closed_tabs (int): Closed tabs per window. Default is 25.
+        seed (int): Random seed. Default is 0.
+
+    Returns:
+        Path: The written file.
+    """
+
+    rng = Random(seed)
+
+    def make_window(offset: int) -> dict:
+        return {
+            "tabs": [
+                make_firefox_tab(
+                    rng, offset + tab, history_depth, title_length, non_ascii_share
+                )
+                for tab in range(tabs)
+            ],
+            "selected": 1,
+            "_closedTabs": [
+                {
+                    "state": make_firefox_tab(
+                        rng, tab, history_depth, title_length, non_ascii_share
+                    ),
+                    "title": "closed",
+                    "closedAt": 1_700_000_000_000,
+                }
+                for tab in range(closed_tabs)
+            ],
+        }
+
+    session = {
+        "version": ["sessionrestore", 1],
+        "windows": [make_window(window * tabs) for window in range(windows)],
+        "selectedWindow": 1,
+        "_closedWindows": [make_window(windows * tabs)],
+        "session": {"lastUpdate": 1_700_000_000_000, "startTime": 1_700_000_000_000},
+        "global": {},
+    }
+    payload = dumps(session, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    path = Path(path)
+    with open(path, "wb") as f:
+        f.write(b"mozLz40\0" + compress(payload))
+    return path
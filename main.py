@@ -1,4 +1,15 @@
-from ui.menu import main_menu
+import sys
+from multiprocessing import freeze_support
 
 if __name__ == "__main__":
+    # session snapshots are parsed in worker processes; in the frozen .exe they re-run
+    # this script, which must hand them over before the CLI parses their arguments
+    freeze_support()
+    if len(sys.argv) > 1:
+        from ui.cli import main
+
+        sys.exit(main())
+
+    from ui.menu import main_menu
+
     main_menu()
@@ -1,28 +1,56 @@
 from pathlib import Path
-from shutil import copytree
+from shutil import Error, rmtree
 from typing import Optional
 
-from session_parsers.chromium_parser import parse_snss_file
-from session_parsers.firefox_parser import parse_jsonlz4_file
+from migrations.extension_prune import ExtensionPruner
+from migrations.history_export import (
+    HistoryWindow,
+    export_history_databases,
+    history_schema,
+)
+from migrations.session_recovery import recover_session
+from migrations.snapshots import (
+    RetentionPolicy,
+    finish_snapshot,
+    link_dest_copy,
+    list_snapshots,
+    new_snapshot,
+    prune_snapshots,
+)
+from migrations.tab_dedup import DedupOptions, TabDeduplicator
+from session_parsers.parse_stats import ParseStats
+from session_parsers.tab_filter import CompiledTabFilter, TabFilter
 from structrues.chormium_structures import ChromiumTab
 from structrues.firefox_structures import FirefoxTab
+from utils.browser_registry import detect_browsers, is_gecko
 from utils.check_browser_status import is_browser_running, kill_browser_process
 from utils.get_browser_profile_paths import (
-    find_latest_snss_file,
-    find_latest_recovery_file,
+    CHROMIUM_PROFILE_PATTERN,
+    COMPONENTS,
+    FIREFOX_PROFILE_PATTERN,
+    component_files,
+    find_session_snapshots,
     get_browser_profile_path,
     ignore_files,
+    iter_tree,
+    profile_relative_parts,
 )
-from utils.json_handler import create_default_json, save_to_json
+from utils.json_handler import BrowserDataWriter, create_default_json
 from utils.logger import logger
+from utils.metrics import metrics
 from ui.console import (
     print_success,
     print_warning,
     print_error,
 )
 
+# A profile is exported next to its destination under this suffix and only replaces the
+# previous export once complete, so no file of an earlier export (a component that is no
+# longer selected, an old extension version) is left in it
+EXPORT_SUFFIX = ".exporting"
+
 
-def tab_to_dict(tab: ChromiumTab | FirefoxTab) -> Optional[dict]:
+def tab_to_dict(tab: ChromiumTab | FirefoxTab, window: int = 0) -> Optional[dict]:
     """
     Converts a browser tab object to a dictionary representation.
 
@@ -31,6 +59,7 @@ def tab_to_dict(tab: ChromiumTab | FirefoxTab) -> Optional[dict]:
 
     Args:
         tab (Union[ChromiumTab, FirefoxTab]): The tab object to convert.
+        window (int): Index of the window the tab belongs to. Default is 0.
 
     Returns:
         Optional[dict]: A dictionary representation of the tab or None if not convertible.
@@ -41,21 +70,47 @@ def tab_to_dict(tab: ChromiumTab | FirefoxTab) -> Optional[dict]:
         return {
             "url": getattr(entry, "url", ""),
             "title": getattr(entry, "title", ""),
+            "window": window,
         }
     return None
 
 
-def export_profile_files(browser: str, profile_path: Path, output_root: Path) -> str:
+def export_profile_files(
+    browser: str,
+    profile_path: Path,
+    output_root: Path,
+    components: Optional[list[str]] = None,
+    history: Optional[HistoryWindow] = None,
+    link_dest: Optional[Path] = None,
+) -> str:
     """
-    Copies the full browser profile directory to a destination folder.
+    Copies the selected components of a browser profile directory to a destination folder.
 
     This function checks if the profile path exists, and if it does,
     it copies the profile directory to a specified output root directory.
+    The profile is walked once; the files found are the planned totals and are then copied
+    component by component into "<browser>.exporting", which replaces the previous export
+    only once complete. The time and the files/bytes of each component are recorded
+    separately in the metrics (phase "copy_<component>", counters "<component>_files" and
+    "<component>_bytes"). An entry shared by two components (places.sqlite) is copied with
+    the first one, as are the files outside the components (profiles.ini).
+    With a history window, the history database of each profile is not copied: a compact
+    database holding only the visits of the window is written in its place (see
+    migrations.history_export).
+    Extension folders that no installed, enabled extension uses (old versions, uninstalled
+    or disabled extensions) are skipped; their files and bytes are counted as
+    "extensions_pruned_files" and "extensions_pruned_bytes".
+    With `link_dest` (the output root of the previous snapshot, see migrations.snapshots),
+    files unchanged since that snapshot are hardlinked to it instead of copied.
 
     Args:
         browser (str): Browser name (used to name the export folder).
         profile_path (Path): Path to the profile directory to copy.
         output_root (Path): Root output directory for all exports.
+        components (Optional[list[str]]): Components to copy. Default is None (all).
+        history (Optional[HistoryWindow]): Visits to keep in the exported history.
+                                           Default is None (copy the whole database).
+        link_dest (Optional[Path]): Output root to hardlink unchanged files from. Default is None.
 
     Raises:
         RuntimeError: If the profile path does not exist or if an error occurs during copying.
@@ -69,28 +124,155 @@ def export_profile_files(browser: str, profile_path: Path, output_root: Path) ->
         print_warning(f"Профиль {browser} не найден по пути: {profile_path}")
         return ""
 
+    selected = [c for c in components or COMPONENTS if c != "tabs"]
+    if not selected:
+        return ""
+
     destination = output_root / browser
+    staging = output_root / f"{browser}{EXPORT_SUFFIX}"
+    compact_history = history is not None and "history" in selected
+    # the compact history database replaces the file and its journal or WAL
+    database = history_schema(browser).database
+    skipped = (
+        [database, f"{database}-journal", f"{database}-wal"] if compact_history else []
+    )
+    pattern = FIREFOX_PROFILE_PATTERN if is_gecko(browser) else CHROMIUM_PROFILE_PATTERN
+    pruner = ExtensionPruner(browser)
     try:
-
-        copytree(
+        owners: dict[str, str] = {}
+        for component in selected:
+            for name in component_files(browser, [component]):
+                owners.setdefault(name, component)
+        allowed = [n for n in owners if n not in skipped]
+
+        files: dict[str, list[tuple[str, int]]] = {c: [] for c in selected}
+        for relative, stat in iter_tree(
             profile_path,
-            destination,
-            ignore=lambda src, names: ignore_files(Path(src), names, browser),
-            ignore_dangling_symlinks=True,
-            dirs_exist_ok=True,
+            lambda src, names: ignore_files(Path(src), names, browser, allowed)
+            + pruner.ignore(src, names),
+        ):
+            parts = profile_relative_parts(Path(relative), pattern)
+            owner = owners.get(parts[0]) if parts else None
+            files[owner or selected[0]].append((relative, stat.st_size))
+        metrics.plan(
+            browser,
+            files=sum(len(entries) for entries in files.values()),
+            bytes=sum(size for entries in files.values() for _, size in entries),
         )
+
+        if staging.exists():
+            rmtree(staging)
+        staging.mkdir(parents=True)
+        directories = {staging}
+        errors = []
+        for component, entries in files.items():
+            if not entries:
+                continue
+            copy = metrics.copy_function(browser, component)
+            if link_dest is not None:
+                copy = link_dest_copy(
+                    copy, browser, component, staging, link_dest / browser
+                )
+            with metrics.phase(f"copy_{component}", browser):
+                for relative, _ in entries:
+                    target = staging / relative
+                    if target.parent not in directories:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        directories.add(target.parent)
+                    try:
+                        copy(str(profile_path / relative), str(target))
+                    except OSError as e:
+                        errors.append((relative, str(e)))
+        if errors:
+            raise Error(errors)
+
+        if pruner.pruned_files:
+            metrics.count(
+                browser,
+                extensions_pruned_files=pruner.pruned_files,
+                extensions_pruned_bytes=pruner.pruned_bytes,
+            )
+            logger.info(
+                f"Skipped {pruner.pruned_files} files ({pruner.pruned_bytes} bytes) of "
+                f"unused {browser} extensions"
+            )
+            print_success(
+                f"{browser}: пропущены неиспользуемые расширения — "
+                f"{pruner.pruned_files} файлов, {pruner.pruned_bytes / 1_000_000:.1f} МБ"
+            )
+        if compact_history:
+            results = export_history_databases(browser, profile_path, staging, history)
+            for result in results:
+                print_success(
+                    f"{browser}: история {result['path']} — посещений {result['visits']} "
+                    f"из {result['visits_total']}, {result['bytes'] / 1_000_000:.1f} МБ "
+                    f"вместо {result['source_bytes'] / 1_000_000:.1f} МБ"
+                )
+        if destination.exists():
+            rmtree(destination)
+        staging.rename(destination)
         return destination.as_posix()
     except Exception as e:
+        rmtree(staging, ignore_errors=True)
         logger.error(f"Error exporting profile files for {browser}: {e}")
         raise RuntimeError(f"Ошибка при экспорте профиля {browser}: {e}")
 
 
-def get_browser_data(user_profile_path: Path, json: dict, browser: str) -> None:
+def component_costs(browser: str, components: Optional[list[str]] = None) -> dict:
+    """
+    Collects the per-component cost of a browser's export from the metrics.
+
+    For "tabs" the cost is the session file that was parsed and the parse time.
+
+    Args:
+        browser (str): The browser name.
+        components (Optional[list[str]]): The exported components. Default is None (all).
+
+    Returns:
+        dict: {component: {"files", "bytes", "seconds"}}.
+    """
+
+    counters = metrics.counters(browser)
+    costs = {}
+    for component in components or COMPONENTS:
+        if component == "tabs":
+            session_bytes = counters.get("session_bytes", 0)
+            costs[component] = {
+                "files": 1 if session_bytes else 0,
+                "bytes": session_bytes,
+                "seconds": metrics.phase_seconds("parse", browser),
+            }
+        else:
+            costs[component] = {
+                "files": counters.get(f"{component}_files", 0),
+                "bytes": counters.get(f"{component}_bytes", 0),
+                "seconds": metrics.phase_seconds(f"copy_{component}", browser),
+            }
+    return costs
+
+
+def get_browser_data(
+    user_profile_path: Path,
+    json: dict,
+    browser: str,
+    tab_filter: Optional[CompiledTabFilter] = None,
+    deduplicator: Optional[TabDeduplicator] = None,
+    components: Optional[list[str]] = None,
+    history: Optional[HistoryWindow] = None,
+    copy_profile: bool = True,
+    export_root: Path = Path("exported_profiles"),
+    link_dest: Optional[Path] = None,
+    decode_workers: int = 1,
+) -> None:
     """
     Retrieves browser session data for the specified browser and updates the JSON structure.
 
     This function checks the browser's profile path, retrieves the latest session files,
     parses the session data, and updates the provided JSON structure with the browser's.
+    Tab and filter counts of the parse are stored under the browser's "stats" key.
+    When a deduplicator is given, duplicate tabs are removed before they are stored.
+    Only the selected components are exported; the files, bytes and seconds spent on each
+    are stored under the browser's "components" key.
 
     Raises:
         Exception: Throwing the exception above.
@@ -98,42 +280,107 @@ def get_browser_data(user_profile_path: Path, json: dict, browser: str) -> None:
     Args:
         json (dict): The JSON structure to update with browser data.
         browser (str): The name of the browser to retrieve data for.
+        tab_filter (Optional[CompiledTabFilter]): Filter applied while parsing the session. Default is None.
+        deduplicator (Optional[TabDeduplicator]): Dedup stage shared by all browsers of the export. Default is None.
+        components (Optional[list[str]]): Components to export (see COMPONENTS). Default is None (all).
+        history (Optional[HistoryWindow]): Visits to keep in the exported history. Default is None (all).
+        copy_profile (bool): Whether to copy the profile to exported_profiles. Default is True;
+                             migrations.transfer streams the files instead.
+        export_root (Path): Directory the profile is copied to. Default is "exported_profiles".
+        link_dest (Optional[Path]): Export root of the previous snapshot, whose unchanged
+                                    files are hardlinked. Default is None.
+        decode_workers (int): Processes decoding a Chromium session snapshot, see
+                              migrations.session_recovery.parse_snapshots. Default is 1.
     """
 
     try:
-        profile_path = get_browser_profile_path(user_profile_path, browser)
+        with metrics.phase("discovery", browser):
+            profile_path = get_browser_profile_path(user_profile_path, browser)
         if not profile_path:
             logger.warning(f"Profile path for {browser} not found.")
             print_warning(f"Путь профиля для {browser} не найден.")
             return
 
         json["browsers"][browser]["profile_path"] = profile_path.as_posix()
+        stats = ParseStats()
+        export_tabs = components is None or "tabs" in components
 
-        if browser == "Firefox":
-            recovery_file = find_latest_recovery_file(profile_path)
-            if recovery_file:
-                firefox_windows = parse_jsonlz4_file(recovery_file)
-                tabs = [
-                    tab_to_dict(tab)
-                    for window in firefox_windows
-                    for tab in window.tabs
-                ]
-                # Filter out None values from tabs
-                json["browsers"][browser]["tabs"] = [t for t in tabs if t]
-                logger.info(f"Retrieved {len(tabs)} tabs for {browser}.")
+        if not export_tabs:
+            logger.info(f"Tabs of {browser} are not selected for export.")
         else:
-            snss_file = find_latest_snss_file(profile_path)
-            if snss_file:
-                browser_windows = parse_snss_file(snss_file)
-                tabs = [tab_to_dict(tab) for tab in browser_windows.tabs]
-                json["browsers"][browser]["tabs"] = [t for t in tabs if t]
-                logger.info(f"Retrieved {len(tabs)} tabs for {browser}.")
-
-        export_dir = "exported_profiles"
-        export_result = export_profile_files(
-            browser, Path(profile_path), Path(export_dir)
-        )
+            with metrics.phase("discovery", browser):
+                snapshots = find_session_snapshots(profile_path, browser)
+            if snapshots:
+                with metrics.phase("parse", browser):
+                    recovered, sources = recover_session(
+                        profile_path,
+                        snapshots,
+                        browser,
+                        tab_filter,
+                        stats,
+                        decode_workers=decode_workers,
+                    )
+                    tabs = []
+                    for entry in recovered:
+                        tab = tab_to_dict(entry.tab, entry.window)
+                        if tab:
+                            tab["source"] = entry.source.relative_to(
+                                profile_path
+                            ).as_posix()
+                            tabs.append(tab)
+                json["browsers"][browser]["tabs"] = tabs
+                json["browsers"][browser]["sources"] = sources
+                metrics.count(
+                    browser, session_bytes=sum(source["bytes"] for source in sources)
+                )
+                if not is_gecko(browser):
+                    logger.info(
+                        f"Session replay for {browser}: {stats.dead_tabs} dead tabs and "
+                        f"{stats.commands_dropped} of {stats.commands_read} commands dropped."
+                    )
+                logger.info(
+                    f"Retrieved {len(tabs)} tabs for {browser} "
+                    f"from {len(snapshots)} session snapshots."
+                )
+                if stats.tabs_recovered:
+                    print_warning(
+                        f"{browser}: последний снимок сессии неполный, "
+                        f"{stats.tabs_recovered} вкладок восстановлено из более старых снимков."
+                    )
+
+        json["browsers"][browser]["stats"] = stats.as_dict()
+        if deduplicator is not None:
+            with metrics.phase("dedup", browser):
+                kept, removed = deduplicator.process(
+                    browser, json["browsers"][browser]["tabs"]
+                )
+            json["browsers"][browser]["tabs"] = kept
+            json["browsers"][browser]["stats"]["duplicates_removed"] = removed
+            if removed:
+                logger.info(f"Removed {removed} duplicate tabs for {browser}.")
+                print_success(f"{browser}: удалено дубликатов вкладок {removed}")
+        if tab_filter is not None:
+            filtered = stats.tabs_seen - stats.tabs_kept
+            logger.info(f"Tab filter for {browser}: {stats.as_dict()}")
+            print_success(
+                f"{browser}: сохранено вкладок {stats.tabs_kept} из {stats.tabs_seen}, отфильтровано {filtered}"
+            )
+
+        if not copy_profile:
+            return
+        with metrics.phase("copy", browser):
+            export_result = export_profile_files(
+                browser,
+                Path(profile_path),
+                export_root,
+                components,
+                history,
+                link_dest,
+            )
         json["browsers"][browser]["export_path"] = export_result
+        costs = component_costs(browser, components)
+        json["browsers"][browser]["components"] = costs
+        logger.info(f"Component costs for {browser}: {costs}")
         logger.info(f"Profile exported from {profile_path} to {export_result}.")
     except Exception as e:
         logger.error(f"Error retrieving data for {browser}: {e}")
@@ -142,38 +389,123 @@ def get_browser_data(user_profile_path: Path, json: dict, browser: str) -> None:
 
 
 def browser_data_export(
-    user_profile_path: Path, session_file: str = "browser_data.json"
+    user_profile_path: Path,
+    session_file: str = "browser_data.json",
+    tab_filter: Optional[TabFilter] = None,
+    dedup: Optional[DedupOptions] = None,
+    profile: bool = False,
+    browsers: Optional[list[str]] = None,
+    components: Optional[dict[str, list[str]]] = None,
+    history: Optional[HistoryWindow] = None,
+    snapshot: bool = False,
+    retention: Optional[RetentionPolicy] = None,
+    decode_workers: int = 1,
 ) -> None:
     """
     Exports browser session data from user profile for all supported browsers into a JSON file.
 
     This function checks if each browser is running, kills the process if it is,
     retrieves the session data, and saves it to a JSON file named 'browser_data.json'.
+    Each browser is written to the file as soon as it has been exported; a session file
+    ending with `.json.lz4` is LZ4-frame compressed. With dedup options, URLs are interned
+    across all browsers, duplicate tabs are dropped or merged and the URLs open in several
+    windows or browsers are listed under the top-level "shared_urls" key.
+    Per-phase timings and counters are written to export_metrics.json next to the session file.
+    In snapshot mode the profiles are exported to a new timestamped snapshot instead of
+    exported_profiles/<browser>, hardlinking the files unchanged since the previous snapshot,
+    and the session file is copied into it (see migrations.snapshots).
 
     Raises:
         Exception: Throwing the exception above.
 
     Args:
         user_profile_path (Path): The path to the user's profile directory.
-        session_file (str): The name of the JSON file to save the exported data. Default is "browser_data.json".
+        session_file (str): The name of the JSON (or .json.lz4) file to save the exported data. Default is "browser_data.json".
+        tab_filter (Optional[TabFilter]): Which tabs to keep. Applied inside the session parsers. Default is None.
+        dedup (Optional[DedupOptions]): How duplicate tabs are handled. Default is None (no dedup).
+        profile (bool): Whether to run the export under cProfile and save export.prof. Default is False.
+        browsers (Optional[list[str]]): Browsers to export. Default is None (the browsers
+            whose profile root exists, see utils.browser_registry.detect_browsers).
+        components (Optional[dict[str, list[str]]]): Components to export per browser. Browsers
+            missing from the mapping export everything. Default is None (everything).
+        history (Optional[HistoryWindow]): Export only recent visits of the history as a
+            compact database. Default is None (copy the whole history).
+        snapshot (bool): Whether to export to a new point-in-time snapshot. Default is False.
+        retention (Optional[RetentionPolicy]): Snapshots to keep after a snapshot export;
+            the others are pruned. Default is None (keep all).
+        decode_workers (int): Processes decoding a large Chromium session snapshot. Default
+            is 1 (decode in the export process).
     """
 
     logger.info("Starting browser data export...")
 
-    json = create_default_json()
+    if browsers is None:
+        browsers = list(detect_browsers(user_profile_path))
+        logger.info(f"Detected browsers: {browsers}")
+    json = create_default_json(browsers)
+    compiled_filter = tab_filter.compile() if tab_filter else None
+    deduplicator = TabDeduplicator(dedup) if dedup else None
+    header = {key: value for key, value in json.items() if key != "browsers"}
 
     try:
-        for browser in json["browsers"]:
-            running = is_browser_running(browser)
-            if running:
-                logger.info(f"{browser} is running, killing the process.")
-                print_warning(f"{browser} запущен, процесс будет завершен.")
-                kill_browser_process(browser)
-            get_browser_data(user_profile_path, json, browser)
-
-        save_to_json(json, session_file)
+        export_root = Path("exported_profiles")
+        link_dest = None
+        if snapshot:
+            previous = list_snapshots()
+            link_dest = previous[0] if previous else None
+            export_root = new_snapshot()
+            logger.info(f"Exporting to snapshot {export_root}, linked to {link_dest}")
+
+        with (
+            metrics.run("export", Path(session_file).parent, profile),
+            BrowserDataWriter(session_file, header) as writer,
+        ):
+            for browser, browser_data in json["browsers"].items():
+                with metrics.phase("process_scan", browser):
+                    running = is_browser_running(browser)
+                if running:
+                    logger.info(f"{browser} is running, killing the process.")
+                    print_warning(f"{browser} запущен, процесс будет завершен.")
+                    with metrics.phase("kill", browser):
+                        kill_browser_process(browser)
+                get_browser_data(
+                    user_profile_path,
+                    json,
+                    browser,
+                    compiled_filter,
+                    deduplicator,
+                    (components or {}).get(browser),
+                    history,
+                    export_root=export_root,
+                    link_dest=link_dest,
+                    decode_workers=decode_workers,
+                )
+
+                with metrics.phase("json_write", browser):
+                    written = writer.write_browser(browser, browser_data)
+                metrics.count(browser, tabs=written)
+                browser_data["tabs"] = []  # already on disk
+
+            if deduplicator is not None:
+                writer.footer["shared_urls"] = deduplicator.shared_urls()
+
         logger.info(f"Browser data exported to {session_file}")
         print_success(f"Данные браузеров успешно экспортированы в {session_file}")
+
+        if snapshot:
+            manifest = finish_snapshot(
+                export_root, Path(session_file), list(json["browsers"]), link_dest
+            )
+            new_bytes = manifest["bytes"] - manifest["linked_bytes"]
+            print_success(
+                f"Снимок {manifest['name']}: файлов {manifest['files']}, "
+                f"без изменений {manifest['linked_files']}, "
+                f"новых данных {new_bytes / 1_000_000:.1f} МБ"
+            )
+            if retention:
+                removed = prune_snapshots(retention)
+                if removed:
+                    print_success(f"Удалено старых снимков: {len(removed)}")
     except Exception as e:
         logger.error(f"Error exporting data: {e}")
         raise  # throw exception to be caught in status_bar
@@ -0,0 +1,195 @@
+from json import loads
+from os import stat
+from pathlib import Path
+from typing import Optional
+
+from regex import split
+
+from utils.browser_registry import is_gecko
+from utils.get_browser_profile_paths import (
+    CHROMIUM_PROFILE_PATTERN,
+    FIREFOX_PROFILE_PATTERN,
+    iter_tree,
+)
+from utils.logger import logger
+
+
+def _chromium_enabled(settings: dict) -> bool:
+    # Chromium < 126 keeps "state" (0 disabled, 1 enabled) next to "disable_reasons", newer
+    # versions only "disable_reasons" (a bit mask, or a list of reasons)
+    return not settings.get("disable_reasons") and settings.get("state", 1) != 0
+
+
+def chromium_extension_paths(profile_dir: Path) -> Optional[set[str]]:
+    """
+    Reads the extension versions a Chromium profile actually uses.
+
+    Extension settings are kept under "extensions.settings" in Preferences, and (on Windows
+    and macOS) in Secure Preferences; both are merged. Extensions loaded from outside the
+    Extensions directory (component and unpacked ones) have an absolute path and are skipped.
+
+    Args:
+        profile_dir (Path): The profile, e.g. "User Data/Default".
+
+    Returns:
+        Optional[set[str]]: "<id>/<version>" of every installed, enabled extension, relative
+                            to the profile's Extensions directory. None if the settings
+                            cannot be read, in which case nothing should be pruned.
+    """
+
+    settings: dict[str, dict] = {}
+    for name in ("Preferences", "Secure Preferences"):
+        try:
+            preferences = loads((profile_dir / name).read_bytes())
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError) as e:
+            logger.warning(
+                f"Cannot read extension settings from {profile_dir / name}: {e}"
+            )
+            return None
+        for extension_id, values in (
+            preferences.get("extensions", {}).get("settings", {}).items()
+        ):
+            settings.setdefault(extension_id, {}).update(values)
+    if not settings:
+        return None
+
+    paths = set()
+    for values in settings.values():
+        path = values.get("path")
+        if not isinstance(path, str) or not path or Path(path).is_absolute():
+            continue
+        if _chromium_enabled(values):
+            paths.add(path.replace("\\", "/").strip("/"))
+    return paths
+
+
+def firefox_extension_files(profile_dir: Path) -> Optional[set[str]]:
+    """
+    Reads the extension files a Firefox profile actually uses.
+
+    Args:
+        profile_dir (Path): The profile, e.g. "abcd1234.default".
+
+    Returns:
+        Optional[set[str]]: Names, in the profile's extensions directory, of the active
+                            add-ons installed into the profile ("<id>.xpi", or a directory
+                            for unpacked ones). None if extensions.json cannot be read or
+                            lists no such add-on, in which case nothing should be pruned.
+    """
+
+    try:
+        addons = loads((profile_dir / "extensions.json").read_bytes()).get("addons", [])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Cannot read {profile_dir / 'extensions.json'}: {e}")
+        return None
+
+    names = {
+        split(r"[\\/]", addon["path"])[-1]
+        for addon in addons
+        if addon.get("location") == "app-profile"
+        and addon.get("active")
+        and addon.get("path")
+    }
+    return names or None
+
+
+class ExtensionPruner:
+    """
+    Skips extension folders no installed, enabled extension uses.
+
+    Chromium keeps every extension in Extensions/<id>/<version>/ and often leaves old
+    versions, uninstalled extensions and a Temp folder next to the active ones; Firefox
+    leaves disabled add-ons and staged/trash folders in extensions/. The pruner is a
+    copytree ignore callback that only lets through what the profile's own extension
+    settings (Preferences for Chromium, extensions.json for Firefox) reference. When they
+    cannot be read, nothing is pruned.
+
+    Everything it skips is remembered with its file count and size, so the same pruner can
+    be used for planning and copying without counting twice.
+
+    Attributes:
+        browser (str): The browser name.
+    """
+
+    def __init__(self, browser: str) -> None:
+        self.browser = browser
+        self._pattern = (
+            FIREFOX_PROFILE_PATTERN if is_gecko(browser) else CHROMIUM_PROFILE_PATTERN
+        )
+        self._referenced: dict[Path, Optional[set[str]]] = {}
+        self._pruned: dict[Path, tuple[int, int]] = {}
+
+    def _profile_references(self, profile_dir: Path) -> Optional[set[str]]:
+        if profile_dir not in self._referenced:
+            if is_gecko(self.browser):
+                referenced = firefox_extension_files(profile_dir)
+            else:
+                referenced = chromium_extension_paths(profile_dir)
+            self._referenced[profile_dir] = referenced
+        return self._referenced[profile_dir]
+
+    def _keep(self, src: Path, name: str) -> bool:
+        # returns True for everything outside an extensions directory
+        if is_gecko(self.browser):
+            if src.name != "extensions" or not self._pattern.fullmatch(src.parent.name):
+                return True
+            referenced = self._profile_references(src.parent)
+            return referenced is None or name in referenced
+
+        if src.name == "Extensions" and self._pattern.fullmatch(src.parent.name):
+            referenced = self._profile_references(src.parent)
+            return referenced is None or any(
+                path.split("/", 1)[0] == name for path in referenced
+            )
+        if src.parent.name == "Extensions" and self._pattern.fullmatch(
+            src.parent.parent.name
+        ):
+            referenced = self._profile_references(src.parent.parent)
+            return referenced is None or f"{src.name}/{name}" in referenced
+        return True
+
+    def _record(self, path: Path) -> None:
+        if path in self._pruned:
+            return
+        try:
+            if path.is_dir():
+                sizes = [entry.st_size for _, entry in iter_tree(path)]
+                self._pruned[path] = (len(sizes), sum(sizes))
+            else:
+                self._pruned[path] = (1, stat(path).st_size)
+        except OSError:
+            self._pruned[path] = (0, 0)
+
+    def ignore(self, src: Path | str, names: list[str]) -> list[str]:
+        """
+        copytree ignore callback: returns the entries of `src` no extension uses.
+
+        Args:
+            src (Path | str): The directory being copied.
+            names (list[str]): Its entries.
+
+        Returns:
+            list[str]: The entries to skip.
+        """
+
+        src = Path(src)
+        ignored = [name for name in names if not self._keep(src, name)]
+        for name in ignored:
+            self._record(src / name)
+        if ignored:
+            logger.debug(
+                f"{self.browser}: unused extension entries in {src}: {ignored}"
+            )
+        return ignored
+
+    @property
+    def pruned_files(self) -> int:
+        return sum(files for files, _ in self._pruned.values())
+
+    @property
+    def pruned_bytes(self) -> int:
+        return sum(size for _, size in self._pruned.values())
@@ -0,0 +1,332 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from utils.browser_registry import is_gecko
+from utils.get_browser_profile_paths import (
+    CHROMIUM_PROFILE_PATTERN,
+    FIREFOX_PROFILE_PATTERN,
+)
+from utils.logger import logger
+from utils.metrics import metrics
+
+# Rows moved per executemany() call. The whole database is loaded in one transaction.
+BATCH_ROWS = 10_000
+
+
+@dataclass
+class HistoryWindow:
+    """
+    Which part of the browsing history is exported.
+
+    Attributes:
+        days (Optional[int]): Keep visits of the last N days.
+        max_visits (Optional[int]): Keep at most the N newest visits.
+    """
+
+    days: Optional[int] = None
+    max_visits: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.days is None and self.max_visits is None:
+            raise ValueError("History window needs days or max_visits")
+        if self.days is not None and self.days < 0:
+            raise ValueError(f"Invalid history days: {self.days}")
+        if self.max_visits is not None and self.max_visits < 0:
+            raise ValueError(f"Invalid history visit limit: {self.max_visits}")
+
+
+@dataclass(frozen=True)
+class HistorySchema:
+    """
+    Where a browser keeps visits and URLs in its history database.
+
+    Attributes:
+        database (str): File name of the database in the profile directory.
+        visits (str): Table of visits.
+        visit_time (str): Visit timestamp column, microseconds since `epoch`.
+        visit_url (str): Column of the visits table that references the URLs table.
+        urls (str): Table of URLs.
+        epoch (datetime): Zero of the timestamps.
+        visit_tables (tuple[str, ...]): Tables whose "id" is a visit id.
+        visit_columns (tuple[str, ...]): Columns that reference a visit in other tables.
+        url_columns (tuple[str, ...]): Columns that reference a URL in other tables.
+        pinned_urls (tuple[str, ...]): Queries returning URL ids kept whatever their visits.
+    """
+
+    database: str
+    visits: str
+    visit_time: str
+    visit_url: str
+    urls: str
+    epoch: datetime
+    visit_tables: tuple[str, ...] = ()
+    visit_columns: tuple[str, ...] = ()
+    url_columns: tuple[str, ...] = ()
+    pinned_urls: tuple[str, ...] = ()
+
+
+CHROMIUM_HISTORY = HistorySchema(
+    database="History",
+    visits="visits",
+    visit_time="visit_time",
+    visit_url="url",
+    urls="urls",
+    epoch=datetime(1601, 1, 1, tzinfo=timezone.utc),
+    visit_tables=("visit_source",),
+    visit_columns=("visit_id",),
+    url_columns=("url_id",),
+)
+# places.sqlite also holds the bookmarks, so bookmarked places are always kept.
+FIREFOX_HISTORY = HistorySchema(
+    database="places.sqlite",
+    visits="moz_historyvisits",
+    visit_time="visit_date",
+    visit_url="place_id",
+    urls="moz_places",
+    epoch=datetime(1970, 1, 1, tzinfo=timezone.utc),
+    url_columns=("place_id",),
+    pinned_urls=("SELECT fk FROM moz_bookmarks WHERE fk IS NOT NULL",),
+)
+
+
+def history_schema(browser: str) -> HistorySchema:
+    return FIREFOX_HISTORY if is_gecko(browser) else CHROMIUM_HISTORY
+
+
+def find_history_databases(browser: str, profile_path: Path) -> list[Path]:
+    """
+    Finds the history database of every profile below a browser's profile directory.
+
+    Args:
+        browser (str): The browser name.
+        profile_path (Path): The browser's profile directory.
+
+    Returns:
+        list[Path]: The databases, e.g. "Default/History" or "abcd1234.default/places.sqlite".
+    """
+
+    schema = history_schema(browser)
+    pattern = FIREFOX_PROFILE_PATTERN if is_gecko(browser) else CHROMIUM_PROFILE_PATTERN
+    candidates = [*profile_path.glob(f"*/{schema.database}")]
+    if is_gecko(browser):
+        candidates += profile_path.glob(f"Profiles/*/{schema.database}")
+    return sorted(
+        path
+        for path in candidates
+        if path.is_file() and pattern.fullmatch(path.parent.name)
+    )
+
+
+def _copy_rows(
+    source: sqlite3.Connection,
+    target: sqlite3.Connection,
+    table: str,
+    where: str = "",
+) -> int:
+    columns = [row[1] for row in source.execute(f'PRAGMA table_info("{table}")')]
+    names = ", ".join(f'"{column}"' for column in columns)
+    insert = f'INSERT INTO "{table}" ({names}) VALUES ({", ".join("?" * len(columns))})'
+    cursor = source.execute(f'SELECT {names} FROM "{table}" {where}')
+    copied = 0
+    while rows := cursor.fetchmany(BATCH_ROWS):
+        target.executemany(insert, rows)
+        copied += len(rows)
+    return copied
+
+
+def _row_filter(schema: HistorySchema, table: str, columns: list[str]) -> str:
+    if table == schema.visits or table in schema.visit_tables:
+        return "WHERE id IN (SELECT id FROM temp.kept_visits)"
+    if table == schema.urls:
+        return "WHERE id IN (SELECT id FROM temp.kept_urls)"
+    for column in columns:
+        if column in schema.visit_columns:
+            return f'WHERE "{column}" IN (SELECT id FROM temp.kept_visits)'
+        if column in schema.url_columns:
+            return f'WHERE "{column}" IN (SELECT id FROM temp.kept_urls)'
+    return ""
+
+
+def export_history_database(
+    source_path: Path,
+    target_path: Path,
+    browser: str,
+    window: HistoryWindow,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Writes a compact copy of a history database that only holds the visits of a window.
+
+    The source is opened read-only and read inside one transaction, so the copy is a
+    consistent snapshot. The target gets the same schema, page size, auto_vacuum mode and
+    user_version (the schema version Firefox migrates from). Rows are moved in batches of
+    BATCH_ROWS with executemany() in a single transaction; indexes and triggers are created
+    after the load, and the AUTOINCREMENT counters are carried over so new ids never reuse
+    old ones. Visits are kept when they are newer than the window's cutoff and among its
+    newest `max_visits`; URLs when one of their visits is kept (or, in Firefox, when they are
+    bookmarked); rows of other tables that reference visits or URLs follow them, and every
+    other table is copied whole.
+
+    The copy is written next to the target and renamed into place when it is complete.
+
+    Args:
+        source_path (Path): The browser's History or places.sqlite.
+        target_path (Path): The compact database to write.
+        browser (str): The browser name.
+        window (HistoryWindow): Which visits to keep.
+        now (Optional[datetime]): Reference time of the window. Default is the current time.
+
+    Raises:
+        sqlite3.Error: If a database cannot be read or written.
+        ValueError: If the database has tables the compact copy cannot reproduce.
+
+    Returns:
+        dict: Visits and URLs kept and in total, and the source and target sizes in bytes.
+    """
+
+    schema = history_schema(browser)
+    cutoff = -1
+    if window.days is not None:
+        start = (now or datetime.now(timezone.utc)) - timedelta(days=window.days)
+        cutoff = (start - schema.epoch) // timedelta(microseconds=1)
+    limit = window.max_visits if window.max_visits is not None else -1
+
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = target_path.with_name(target_path.name + ".part")
+    part_path.unlink(missing_ok=True)
+
+    source = sqlite3.connect(
+        f"{source_path.resolve().as_uri()}?mode=ro", uri=True, isolation_level=None
+    )
+    target = sqlite3.connect(part_path, isolation_level=None)
+    try:
+        source.execute("BEGIN")
+        objects = source.execute(
+            "SELECT type, name, sql FROM sqlite_master"
+            " WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+        ).fetchall()
+        if any(sql.upper().startswith("CREATE VIRTUAL") for _, _, sql in objects):
+            raise ValueError(f"{source_path} has virtual tables")
+        tables = [name for kind, name, _ in objects if kind == "table"]
+        if schema.visits not in tables or schema.urls not in tables:
+            raise ValueError(f"{source_path} is not a {browser} history database")
+
+        source.execute(
+            f"CREATE TEMP TABLE kept_visits AS SELECT id FROM {schema.visits}"
+            f" WHERE {schema.visit_time} >= ? ORDER BY {schema.visit_time} DESC LIMIT ?",
+            (cutoff, limit),
+        )
+        source.execute("CREATE TEMP TABLE kept_urls (id INTEGER PRIMARY KEY)")
+        source.execute(
+            f"INSERT OR IGNORE INTO temp.kept_urls SELECT {schema.visit_url}"
+            f" FROM {schema.visits} WHERE id IN (SELECT id FROM temp.kept_visits)"
+        )
+        for query in schema.pinned_urls:
+            source.execute(f"INSERT OR IGNORE INTO temp.kept_urls {query}")
+
+        for pragma in ("page_size", "auto_vacuum"):
+            value = source.execute(f"PRAGMA main.{pragma}").fetchone()[0]
+            target.execute(f"PRAGMA {pragma} = {int(value)}")
+        target.execute("PRAGMA journal_mode = OFF")
+        target.execute("PRAGMA synchronous = OFF")
+
+        target.execute("BEGIN")
+        for kind, _, sql in objects:
+            if kind == "table":
+                target.execute(sql)
+        for table in tables:
+            columns = [
+                row[1] for row in source.execute(f'PRAGMA table_info("{table}")')
+            ]
+            _copy_rows(source, target, table, _row_filter(schema, table, columns))
+        if source.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'"
+        ).fetchone():
+            target.execute("DELETE FROM sqlite_sequence")
+            _copy_rows(source, target, "sqlite_sequence")
+        for kind, _, sql in objects:
+            if kind != "table":
+                target.execute(sql)
+        for pragma in ("user_version", "application_id"):
+            value = source.execute(f"PRAGMA main.{pragma}").fetchone()[0]
+            target.execute(f"PRAGMA {pragma} = {int(value)}")
+        target.execute("COMMIT")
+
+        stats = {
+            "visits": source.execute(
+                "SELECT count(*) FROM temp.kept_visits"
+            ).fetchone()[0],
+            "visits_total": source.execute(
+                f"SELECT count(*) FROM {schema.visits}"
+            ).fetchone()[0],
+            "urls": source.execute("SELECT count(*) FROM temp.kept_urls").fetchone()[0],
+            "urls_total": source.execute(
+                f"SELECT count(*) FROM {schema.urls}"
+            ).fetchone()[0],
+        }
+        source.execute("ROLLBACK")
+    except BaseException:
+        target.close()
+        part_path.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+    target.execute("PRAGMA journal_mode = DELETE")
+    target.close()
+    part_path.replace(target_path)
+
+    stats["source_bytes"] = source_path.stat().st_size
+    stats["bytes"] = target_path.stat().st_size
+    return stats
+
+
+def export_history_databases(
+    browser: str, profile_path: Path, destination: Path, window: HistoryWindow
+) -> list[dict]:
+    """
+    Writes the compact history database of every profile of a browser into an export.
+
+    Each database lands at the same relative path as in the profile, so restoring the
+    export puts it in place as the profile's history. Files, bytes and seconds are counted
+    as the "history" component. A database that cannot be compacted is copied whole.
+
+    Args:
+        browser (str): The browser name.
+        profile_path (Path): The browser's profile directory.
+        destination (Path): The export directory of the browser.
+        window (HistoryWindow): Which visits to keep.
+
+    Returns:
+        list[dict]: Per database, its relative path and the stats of export_history_database.
+    """
+
+    copy = metrics.copy_function(browser, "history")
+    results = []
+    for source_path in find_history_databases(browser, profile_path):
+        relative = source_path.relative_to(profile_path)
+        target_path = destination / relative
+        with metrics.phase("copy_history", browser):
+            try:
+                stats = export_history_database(
+                    source_path, target_path, browser, window
+                )
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(
+                    f"Compact history export of {source_path} failed, copying it whole: {e}"
+                )
+                target_path.parent.mkdir(parents=True, exist_ok=True)
+                copy(str(source_path), str(target_path))
+                continue
+        metrics.count(
+            browser,
+            files=1,
+            bytes=stats["bytes"],
+            history_files=1,
+            history_bytes=stats["bytes"],
+        )
+        logger.info(f"Compact history of {browser} written to {target_path}: {stats}")
+        results.append({"path": relative.as_posix(), **stats})
+    return results
@@ -1,55 +1,109 @@
+import asyncio
 import platform
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from psutil import Popen
 from shutil import copytree, rmtree, which
-from typing import Optional
+from logging import DEBUG
+from threading import Event
+from typing import Any, Callable, Optional
 
 from ui.console import (
     print_success,
     print_warning,
     print_error,
 )
+from utils.browser_registry import REGISTRY
 from utils.check_browser_status import (
-    BROWSERS,
     is_browser_running,
     kill_browser_process,
 )
-from utils.json_handler import load_from_json
-from utils.logger import logger
-
-
-def restore_profile_files(export_path: Path | str, profile_path: Path | str) -> None:
+from migrations.profile_convert import convert_profile
+from migrations.profile_maintenance import maintain_profile
+from utils.get_browser_profile_paths import get_browser_profile_path, tree_totals
+from utils.json_handler import iter_browser_data
+from utils.logger import get_logger, logger
+from utils.metrics import metrics
+
+launch_logger = get_logger("launch")
+
+# Profiles restored at the same time by browser_data_import
+DEFAULT_IMPORT_WORKERS = 4
+# A profile is copied next to its destination under this suffix and only replaces the old
+# profile once the copy is complete
+RESTORE_SUFFIX = ".restoring"
+
+
+def restore_profile_files(
+    export_path: Path | str,
+    profile_path: Path | str,
+    browser: str = "",
+    cancel: Optional[Event] = None,
+) -> None:
     """
     Restores a browser profile from an exported path to a specified profile path.
 
     This function checks if the export path exists, and if so, it copies the contents
-    to the profile path, removing any existing profile directory first.
+    next to the profile path ("<profile>.restoring") and then replaces the existing profile
+    directory with the copy. A failed or cancelled copy leaves the existing profile as it was.
 
     Raises:
+        asyncio.CancelledError: If `cancel` is set before the copy is complete.
         Exception: Throwing the exception above.
 
     Args:
         export_path (Path | str): The path to the exported profile directory.
         profile_path (Path | str): The path where the profile should be restored.
+        browser (str): Browser name under which copied files and bytes are counted. Default is "".
+        cancel (Optional[Event]): Stops the copy before the next file once set. Default is None.
     """
 
     export_path = Path(export_path)
     profile_path = Path(profile_path)
+    staging_path = profile_path.with_name(profile_path.name + RESTORE_SUFFIX)
 
     if not export_path.exists():
         logger.warning(f"Exported profile not found: {export_path}")
         print_warning(f"Экспортированный профиль не найден: {export_path}")
         return
 
+    copy = metrics.copy_function(browser)
+    if cancel is not None:
+        counted_copy = copy
+
+        def copy(src: str, dst: str) -> str:
+            # copytree collects OSErrors and goes on, CancelledError stops it
+            if cancel.is_set():
+                raise asyncio.CancelledError(f"Restore of {browser} cancelled")
+            return counted_copy(src, dst)
+
     try:
-        if profile_path.exists():
-            rmtree(profile_path)
+        files, size = tree_totals(export_path)
+        metrics.plan(browser, files=files, bytes=size)
+
+        if staging_path.exists():
+            rmtree(staging_path)
         copytree(
-            export_path, profile_path, ignore_dangling_symlinks=True, dirs_exist_ok=True
+            export_path,
+            staging_path,
+            copy_function=copy,
+            ignore_dangling_symlinks=True,
         )
+        if cancel is not None and cancel.is_set():
+            raise asyncio.CancelledError(f"Restore of {browser} cancelled")
+        if profile_path.exists():
+            rmtree(profile_path)
+        staging_path.rename(profile_path)
         logger.info(f"Profile restored from {export_path} to {profile_path}")
         print_success(f"Профиль восстановлен из {export_path} в {profile_path}")
+    except asyncio.CancelledError:
+        rmtree(staging_path, ignore_errors=True)
+        logger.warning(f"Restore of {profile_path} cancelled, the profile is unchanged")
+        print_warning(f"Восстановление {profile_path} отменено, профиль не изменен")
+        raise
     except Exception as e:
+        rmtree(staging_path, ignore_errors=True)
         logger.error(f"Error restoring profile: {e}")
         print_error(f"Ошибка при восстановлении профиля: {e}")
         raise
@@ -61,6 +115,9 @@ def launch_browser_tabs(browser: str, urls: list[str], browser_data: dict) -> No
 
     This function checks if the browser is available, constructs the command to open
     the URLs in new tabs, and executes it. If the browser is not found, it prints an error message.
+    The executables in browser_data are tried before the registry's, so it must come from a
+    trusted session file. URLs starting with "-" are skipped: the browser would take them
+    for options.
 
     Raises:
         Exception: Throwing the exception above.
@@ -71,13 +128,26 @@ def launch_browser_tabs(browser: str, urls: list[str], browser_data: dict) -> No
         browser_data (dict): A dictionary containing browser-specific data.
     """
 
+    # a URL starting with "-" would be taken as a command line option of the browser
+    options = [url for url in urls if url.startswith("-")]
+    if options:
+        logger.warning(
+            f"Skipping {len(options)} URLs that look like options: {options}"
+        )
+        urls = [url for url in urls if not url.startswith("-")]
+        if not urls:
+            return
+
     commands = []
 
     if browser_data and "executable" in browser_data:
         system = platform.system()
         commands.extend(browser_data["executable"].get(system, []))
 
-    commands.extend(BROWSERS.get(browser, []))
+    spec = REGISTRY.get(browser)
+    if spec is not None:
+        commands.extend(spec.executables.get(platform.system(), ()))
+        commands.extend(spec.commands)
 
     cmd_name = ""
     for cmd in commands:
@@ -94,16 +164,17 @@ def launch_browser_tabs(browser: str, urls: list[str], browser_data: dict) -> No
         print_warning(f"{browser} не найден ни по абсолютному пути, ни в PATH.")
         return
 
-    # For Firefox, use --new-tab to open multiple URLs in new tabs
-    if browser == "Firefox":
-        args = [cmd_name, "--new-tab"] + urls
-    else:
-        args = [cmd_name] + urls
+    # e.g. Firefox needs --new-tab to open multiple URLs in new tabs
+    args = [cmd_name, *(spec.new_tab_args if spec else ()), *urls]
 
     logger.info(f"Launching {len(urls)} tabs in {browser}")
+    if launch_logger.isEnabledFor(DEBUG):
+        launch_logger.debug("%s command line: %s", browser, args)
 
     try:
-        Popen(args)
+        with metrics.phase("launch", browser):
+            Popen(args)
+        metrics.count(browser, tabs=len(urls))
         logger.info(f"Opened {len(urls)} tabs in {browser}")
         print_success(f"Открыто {len(urls)} вкладок в {browser}")
     except Exception as e:
@@ -112,8 +183,283 @@ def launch_browser_tabs(browser: str, urls: list[str], browser_data: dict) -> No
         raise
 
 
+def convert_browser_profile(
+    browser: str,
+    export_path: Path | str,
+    target: str,
+    target_root: Optional[Path | str] = None,
+) -> None:
+    """
+    Converts the history and bookmarks of an exported profile into another browser.
+
+    Instead of restoring the exported profile, its History/Bookmarks or places.sqlite are
+    written into the existing profile of the target browser (see
+    migrations.profile_convert). The target browser is closed first.
+
+    Raises:
+        Exception: Throwing the exception above.
+
+    Args:
+        browser (str): The browser the export comes from.
+        export_path (Path | str): The exported profile of that browser.
+        target (str): The browser to convert into.
+        target_root (Optional[Path | str]): Profile root of the target browser.
+                                            Default is None (the current user's).
+    """
+
+    if target_root is None:
+        target_root = get_browser_profile_path(Path.home(), target)
+
+    with metrics.phase("process_scan", target):
+        running = is_browser_running(target)
+    if running:
+        logger.info(f"{target} is running, killing the process.")
+        print_warning(f"{target} запущен, процесс будет завершен.")
+        with metrics.phase("kill", target):
+            kill_browser_process(target)
+
+    try:
+        with metrics.phase("convert", browser):
+            stats = convert_profile(
+                browser, Path(export_path), target, Path(target_root)
+            )
+        metrics.count(
+            browser,
+            urls=stats["urls"],
+            visits=stats["visits"],
+            bookmarks=stats["bookmarks"],
+        )
+        print_success(
+            f"{browser} → {target}: адресов {stats['urls']}, посещений {stats['visits']}, "
+            f"закладок {stats['bookmarks']}"
+        )
+    except Exception as e:
+        logger.error(f"Error converting {browser} profile into {target}: {e}")
+        print_error(f"Ошибка при переносе профиля {browser} в {target}: {e}")
+        raise
+
+
+def _replace_profile(
+    browser: str,
+    export_path: str,
+    profile_path: str,
+    cancel: Event,
+    maintain: bool = False,
+) -> None:
+    # blocking part of a restore, run in the executor of import_browsers
+    with metrics.phase("process_scan", browser):
+        running = is_browser_running(browser)
+    if running:
+        logger.info(f"{browser} is running, killing the process.")
+        print_warning(f"{browser} запущен, процесс будет завершен.")
+        with metrics.phase("kill", browser):
+            kill_browser_process(browser)
+    if cancel.is_set():
+        raise asyncio.CancelledError(f"Restore of {browser} cancelled")
+    with metrics.phase("copy", browser):
+        restore_profile_files(export_path, profile_path, browser, cancel)
+    if maintain and Path(profile_path).exists():
+        totals = maintain_profile(browser, profile_path, cancel=cancel)
+        print_success(
+            f"{browser}: обслужено баз данных {totals['databases']}, "
+            f"освобождено {totals['bytes_reclaimed'] / 1_000_000:.1f} МБ"
+        )
+
+
+def _lock_key(
+    browser: str,
+    browser_data: dict,
+    target: Optional[str],
+    user_profile_path: Optional[Path],
+) -> str:
+    # Tasks are serialized per directory they write: with `import -u` every browser restores
+    # into the same path, and a conversion writes into the target's profile root.
+    if target is not None:
+        path = user_profile_path or get_browser_profile_path(Path.home(), target)
+    else:
+        path = browser_data.get("profile_path")
+    return str(Path(path).resolve()) if path else browser
+
+
+async def _in_executor(
+    executor: ThreadPoolExecutor, cancel: Event, function: Callable, *args: Any
+) -> Any:
+    future = asyncio.get_running_loop().run_in_executor(executor, function, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # a thread cannot be stopped from outside: ask the copy to stop and wait for it, so
+        # that nothing is still writing into the profile once the task has ended
+        cancel.set()
+        await asyncio.wait([future])
+        raise
+
+
+async def _import_browser(
+    browser: str,
+    browser_data: dict,
+    target: Optional[str],
+    user_profile_path: Optional[Path],
+    executor: ThreadPoolExecutor,
+    lock: asyncio.Lock,
+    maintain: bool = False,
+) -> None:
+    cancel = Event()
+    async with lock:
+        if target is not None:
+            await _in_executor(
+                executor,
+                cancel,
+                convert_browser_profile,
+                browser,
+                browser_data["export_path"],
+                target,
+                user_profile_path,
+            )
+        else:
+            await _in_executor(
+                executor,
+                cancel,
+                _replace_profile,
+                browser,
+                browser_data.get("export_path"),
+                browser_data.get("profile_path"),
+                cancel,
+                maintain,
+            )
+
+    tabs = browser_data.get("tabs", [])
+    urls = [tab.get("url") for tab in tabs if tab.get("url")]
+    if urls:
+        # not in the bounded executor: a launch must not queue behind other browsers' copies
+        if target is not None:
+            await asyncio.to_thread(launch_browser_tabs, target, urls, {})
+        else:
+            await asyncio.to_thread(launch_browser_tabs, browser, urls, browser_data)
+
+
+async def import_browsers(
+    user_profile_path: Optional[Path],
+    session_file: str = "browser_data.json",
+    browsers: Optional[list[str]] = None,
+    convert: Optional[dict[str, str]] = None,
+    workers: int = DEFAULT_IMPORT_WORKERS,
+    timeout: Optional[float] = None,
+    maintain: bool = False,
+) -> dict[str, str]:
+    """
+    Restores the browsers of a session file concurrently and opens their tabs.
+
+    Every browser is a task started as soon as it has been read from the file: it closes the
+    browser, restores (or converts) its profile in a thread of a bounded executor and then
+    opens its tabs, without waiting for the other browsers. Tasks that write into the same
+    directory (a restored browser and the conversions into it, or browsers restored into one
+    user profile path) run one after another, in the order of the file. A browser that fails
+    or times out does not stop the others; if the orchestrator itself is cancelled, every
+    task is cancelled. A cancelled copy stops before its next file and leaves the existing
+    profile as it was.
+    With `maintain`, the databases of a restored profile are maintained and its hot files
+    prewarmed before its tabs are opened (see migrations.profile_maintenance).
+
+    Raises:
+        Exception: The first error of a browser, once every browser has finished.
+
+    Args:
+        user_profile_path (Optional[Path]): See browser_data_import.
+        session_file (str): See browser_data_import. Default is "browser_data.json".
+        browsers (Optional[list[str]]): See browser_data_import. Default is None.
+        convert (Optional[dict[str, str]]): See browser_data_import. Default is None.
+        workers (int): Profiles copied at the same time. Default is DEFAULT_IMPORT_WORKERS.
+        timeout (Optional[float]): Seconds after which a browser's task is cancelled.
+                                   Default is None (no limit).
+        maintain (bool): Whether to maintain restored profiles. Default is False.
+
+    Returns:
+        dict[str, str]: "ok", "failed" or "timeout" per imported browser.
+    """
+
+    locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+    tasks: dict[str, asyncio.Task] = {}
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="restore") as executor:
+        try:
+            entries = iter_browser_data(session_file)
+            # the file is parsed in a thread, so that launches are not held up by it
+            while (entry := await asyncio.to_thread(next, entries, None)) is not None:
+                browser_name, browser_data = entry
+                if browsers is not None and browser_name not in browsers:
+                    continue
+                target = (convert or {}).get(browser_name)
+                if target is not None:
+                    if not browser_data.get("export_path"):
+                        logger.warning(f"No export path found for {browser_name}.")
+                        print_warning(f"Не найден путь экспорта для {browser_name}.")
+                        continue
+                else:
+                    if (
+                        user_profile_path != None
+                        and browser_data.get("profile_path") != user_profile_path
+                    ):
+                        browser_data["profile_path"] = user_profile_path
+                    if not browser_data.get("export_path") and not browser_data.get(
+                        "profile_path"
+                    ):
+                        logger.warning(
+                            f"No export or profile path found for {browser_name}."
+                        )
+                        print_warning(
+                            f"Не найден путь экспорта или профиля для {browser_name}."
+                        )
+                        continue
+
+                task = _import_browser(
+                    browser_name,
+                    browser_data,
+                    target,
+                    user_profile_path,
+                    executor,
+                    locks[
+                        _lock_key(browser_name, browser_data, target, user_profile_path)
+                    ],
+                    maintain,
+                )
+                tasks[browser_name] = asyncio.create_task(
+                    asyncio.wait_for(task, timeout), name=f"import-{browser_name}"
+                )
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+    outcomes = {}
+    errors = []
+    for browser_name, result in zip(tasks, results):
+        if isinstance(result, asyncio.TimeoutError):
+            outcomes[browser_name] = "timeout"
+            logger.error(f"Import of {browser_name} timed out after {timeout} s")
+            print_error(f"Импорт {browser_name} прерван: превышено время {timeout} с")
+        elif isinstance(result, BaseException):
+            outcomes[browser_name] = "failed"
+        else:
+            outcomes[browser_name] = "ok"
+        if isinstance(result, BaseException):
+            errors.append(result)
+    if errors:
+        raise errors[0]
+    return outcomes
+
+
 def browser_data_import(
-    user_profile_path: Optional[Path], session_file: str = "browser_data.json"
+    user_profile_path: Optional[Path],
+    session_file: str = "browser_data.json",
+    profile: bool = False,
+    browsers: Optional[list[str]] = None,
+    convert: Optional[dict[str, str]] = None,
+    workers: int = DEFAULT_IMPORT_WORKERS,
+    timeout: Optional[float] = None,
+    maintain: bool = False,
 ) -> None:
     """
     Imports browser session data from a JSON file and restores the profiles.
@@ -121,6 +467,12 @@ def browser_data_import(
     This function reads the session data from the specified JSON file, checks if the user profile path is provided,
     and if not, use default path from the data. It then checks if any of the browsers in the data
     are running, and if so, kills their processes. It then restores the profiles.
+    Browsers are restored concurrently as they are read from the file (see import_browsers),
+    and each browser's tabs are opened as soon as its own profile is restored, so the import
+    takes about as long as the largest profile. `.json.lz4` files are supported.
+    Per-phase timings and counters are written to import_metrics.json next to the session file.
+    A browser mapped to another one in `convert` is not restored: its history and bookmarks
+    are converted into the other browser's profile, and its tabs are opened there.
 
     Raises:
         Exception: Throwing the exception above.
@@ -128,40 +480,34 @@ def browser_data_import(
     Args:
         user_profile_path (Optional[Path]): The path to the user profile directory.
         session_file (str): The path to the JSON file containing browser session data. Default is "browser_data.json".
+        profile (bool): Whether to run the import under cProfile and save import.prof. Default is False.
+        browsers (Optional[list[str]]): Browsers to import. Default is None (all browsers in the file).
+        convert (Optional[dict[str, str]]): Target browser per exported browser, e.g.
+            {"Chrome": "Firefox"}. With a user profile path, it is the target's profile root.
+            Default is None (restore every browser as itself).
+        workers (int): Profiles restored at the same time. Default is DEFAULT_IMPORT_WORKERS.
+        timeout (Optional[float]): Seconds after which the import of a browser is cancelled.
+                                   Default is None (no limit).
+        maintain (bool): Whether to checkpoint, vacuum and analyze the databases of restored
+                         profiles and prewarm their hot files before opening the tabs.
+                         Default is False.
     """
 
     logger.info("Starting browser data import...")
 
     try:
-        data = load_from_json(session_file)
-
-        for browser_name, browser_data in data["browsers"].items():
-            if (
-                user_profile_path != None
-                and browser_data.get("profile_path") != user_profile_path
-            ):
-                browser_data["profile_path"] = user_profile_path
-            if is_browser_running(browser_name):
-                logger.info(f"{browser_name} is running, killing the process.")
-                print_warning(f"{browser_name} запущен, процесс будет завершен.")
-                kill_browser_process(browser_name)
-
-            export_path = browser_data.get("export_path")
-            profile_path = browser_data.get("profile_path")
-
-            if not export_path and not profile_path:
-                logger.warning(f"No export or profile path found for {browser_name}.")
-                print_warning(
-                    f"Не найден путь экспорта или профиля для {browser_name}."
+        with metrics.run("import", Path(session_file).parent, profile):
+            asyncio.run(
+                import_browsers(
+                    user_profile_path,
+                    session_file,
+                    browsers,
+                    convert,
+                    workers,
+                    timeout,
+                    maintain,
                 )
-                continue
-
-            restore_profile_files(export_path, profile_path)
-
-            tabs = browser_data.get("tabs", [])
-            urls = [tab.get("url") for tab in tabs if tab.get("url")]
-            if urls:
-                launch_browser_tabs(browser_name, urls, browser_data)
+            )
 
         logger.info("Browser data imported from {session_file}.")
         print_success("Данные браузеров успешно импортированы из {session_file}.")
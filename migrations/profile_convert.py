@@ -0,0 +1,1019 @@
+import sqlite3
+from base64 import urlsafe_b64encode
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from hashlib import md5
+from json import dump, load
+from os import urandom
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from migrations.history_export import (
+    HistorySchema,
+    find_history_databases,
+    history_schema,
+)
+from utils.browser_registry import is_gecko
+from utils.get_browser_profile_paths import (
+    CHROMIUM_PROFILE_PATTERN,
+    FIREFOX_PROFILE_PATTERN,
+)
+from utils.logger import logger
+
+# Microseconds between the WebKit epoch (1601-01-01) of Chromium timestamps and the Unix
+# epoch of Firefox timestamps.
+WEBKIT_EPOCH_OFFSET = 11_644_473_600_000_000
+
+# Visit types passed between readers and writers; the numbers Firefox stores in
+# moz_historyvisits.visit_type.
+VISIT_LINK = 1
+VISIT_TYPED = 2
+VISIT_BOOKMARK = 3
+VISIT_EMBED = 4
+VISIT_REDIRECT_PERMANENT = 5
+VISIT_REDIRECT_TEMPORARY = 6
+VISIT_DOWNLOAD = 7
+VISIT_FRAMED_LINK = 8
+VISIT_RELOAD = 9
+
+# Chromium page transitions: the core type is the low byte, qualifiers are high bits.
+CHROMIUM_CORE_TO_VISIT = {
+    0: VISIT_LINK,
+    1: VISIT_TYPED,
+    2: VISIT_BOOKMARK,
+    3: VISIT_EMBED,
+    4: VISIT_FRAMED_LINK,
+    5: VISIT_TYPED,  # GENERATED, e.g. a search from the address bar
+    6: VISIT_LINK,
+    7: VISIT_LINK,
+    8: VISIT_RELOAD,
+    9: VISIT_TYPED,
+    10: VISIT_TYPED,
+}
+VISIT_TO_CHROMIUM_CORE = {
+    VISIT_TYPED: 1,
+    VISIT_BOOKMARK: 2,
+    VISIT_EMBED: 3,
+    VISIT_FRAMED_LINK: 4,
+    VISIT_RELOAD: 8,
+}
+CHROMIUM_CLIENT_REDIRECT = 0x40000000
+CHROMIUM_SERVER_REDIRECT = 0x80000000
+# CHAIN_START | CHAIN_END: every converted visit is a redirect chain of its own
+CHROMIUM_CHAIN = 0x30000000
+# visit_source.source of visits imported from Firefox
+CHROMIUM_SOURCE_FIREFOX_IMPORTED = 3
+
+# Bookmark roots converted, in order. Chromium: JSON key -> (id, name, guid).
+CHROMIUM_ROOTS = {
+    "bookmark_bar": ("1", "Bookmarks bar", "0bc5d13f-2cba-5d74-951f-3f233fe6c908"),
+    "other": ("2", "Other bookmarks", "82b081ec-3dd3-529c-8475-ab6c344590dd"),
+    "synced": ("3", "Mobile bookmarks", "4cf2e351-0e85-532b-bb37-df045d8f8d0f"),
+}
+# Firefox: root guid -> name. The tags root is not converted.
+FIREFOX_ROOTS = {
+    "toolbar_____": "Bookmarks Toolbar",
+    "menu________": "Bookmarks Menu",
+    "unfiled_____": "Other Bookmarks",
+    "mobile______": "Mobile Bookmarks",
+}
+FIREFOX_TOOLBAR = "toolbar_____"
+FIREFOX_BOOKMARK = 1
+FIREFOX_FOLDER = 2
+
+# Firefox only hashes the first 1500 characters of a URL.
+FIREFOX_MAX_CHARS_TO_HASH = 1500
+
+
+class HistoryUrl(NamedTuple):
+    id: int
+    url: str
+    title: str
+    visit_count: int
+    typed_count: int
+    last_visit: int  # microseconds since 1970, 0 if never visited
+    hidden: int
+
+
+class HistoryVisit(NamedTuple):
+    id: int
+    url_id: int
+    time: int  # microseconds since 1970
+    from_visit: int
+    visit_type: int
+
+
+@dataclass
+class BookmarkNode:
+    """
+    A bookmark or a bookmark folder, independent of the browser it comes from.
+
+    Attributes:
+        title (str): The title.
+        url (Optional[str]): The URL, None for folders.
+        date_added (int): Microseconds since 1970, 0 if unknown.
+        children (list[BookmarkNode]): Folder contents, in order.
+    """
+
+    title: str
+    url: Optional[str] = None
+    date_added: int = 0
+    children: list["BookmarkNode"] = field(default_factory=list)
+
+    def count(self) -> int:
+        return (self.url is not None) + sum(child.count() for child in self.children)
+
+
+def _mozilla_hash(data: bytes) -> int:
+    # mozilla::HashString: golden ratio multiply of the rotated hash and each byte
+    value = 0
+    for byte in data:
+        value = (
+            ((((value << 5) | (value >> 27)) & 0xFFFFFFFF) ^ byte) * 0x9E3779B9
+        ) & 0xFFFFFFFF
+    return value
+
+
+def firefox_url_hash(url: str) -> int:
+    """
+    Computes moz_places.url_hash, the value Firefox looks URLs up by.
+
+    The scheme is hashed into bits 32-47 and the URL into bits 0-31.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        int: The hash.
+    """
+
+    spec = url.encode()
+    scheme_end = spec.find(b":", 0, 50)
+    prefix = (_mozilla_hash(spec[:scheme_end]) & 0xFFFF) << 32 if scheme_end > 0 else 0
+    return prefix + _mozilla_hash(spec[:FIREFOX_MAX_CHARS_TO_HASH])
+
+
+def new_firefox_guid() -> str:
+    return urlsafe_b64encode(urandom(9)).decode()
+
+
+def _url_origin(url: str) -> tuple[str, str]:
+    # (prefix, host) of moz_origins, e.g. ("https://", "www.example.com")
+    parts = urlsplit(url)
+    return f"{parts.scheme}://", (parts.hostname or "")
+
+
+def chromium_visit_type(transition: int) -> int:
+    transition &= 0xFFFFFFFF
+    if transition & CHROMIUM_SERVER_REDIRECT:
+        return VISIT_REDIRECT_PERMANENT
+    if transition & CHROMIUM_CLIENT_REDIRECT:
+        return VISIT_REDIRECT_TEMPORARY
+    return CHROMIUM_CORE_TO_VISIT.get(transition & 0xFF, VISIT_LINK)
+
+
+def chromium_transition(visit_type: int) -> int:
+    transition = VISIT_TO_CHROMIUM_CORE.get(visit_type, 0) | CHROMIUM_CHAIN
+    if visit_type == VISIT_REDIRECT_PERMANENT:
+        transition |= CHROMIUM_SERVER_REDIRECT
+    elif visit_type == VISIT_REDIRECT_TEMPORARY:
+        transition |= CHROMIUM_CLIENT_REDIRECT
+    return transition
+
+
+def read_chromium_history(
+    connection: sqlite3.Connection,
+) -> tuple[Iterator[HistoryUrl], Iterator[HistoryVisit]]:
+    """
+    Streams the visited URLs and the visits of a Chromium History database.
+
+    Args:
+        connection (sqlite3.Connection): The open database.
+
+    Returns:
+        tuple[Iterator[HistoryUrl], Iterator[HistoryVisit]]: URLs and visits, read lazily.
+    """
+
+    def urls() -> Iterator[HistoryUrl]:
+        for id_, url, title, visits, typed, last, hidden in connection.execute(
+            "SELECT id, url, title, visit_count, typed_count, last_visit_time, hidden"
+            " FROM urls WHERE EXISTS (SELECT 1 FROM visits WHERE visits.url = urls.id)"
+        ):
+            last = last - WEBKIT_EPOCH_OFFSET if last else 0
+            yield HistoryUrl(id_, url, title or "", visits, typed, last, hidden)
+
+    def visits() -> Iterator[HistoryVisit]:
+        for id_, url_id, time, from_visit, transition in connection.execute(
+            "SELECT id, url, visit_time, from_visit, transition FROM visits"
+        ):
+            yield HistoryVisit(
+                id_,
+                url_id,
+                time - WEBKIT_EPOCH_OFFSET,
+                from_visit or 0,
+                chromium_visit_type(transition),
+            )
+
+    return urls(), visits()
+
+
+def read_firefox_history(
+    connection: sqlite3.Connection,
+) -> tuple[Iterator[HistoryUrl], Iterator[HistoryVisit]]:
+    """
+    Streams the visited places and the visits of a Firefox places.sqlite database.
+    Internal "place:" queries are skipped.
+
+    Args:
+        connection (sqlite3.Connection): The open database.
+
+    Returns:
+        tuple[Iterator[HistoryUrl], Iterator[HistoryVisit]]: URLs and visits, read lazily.
+    """
+
+    def urls() -> Iterator[HistoryUrl]:
+        for id_, url, title, visits, typed, last, hidden in connection.execute(
+            "SELECT id, url, title, visit_count, typed, last_visit_date, hidden"
+            " FROM moz_places WHERE url NOT LIKE 'place:%' AND EXISTS"
+            " (SELECT 1 FROM moz_historyvisits v WHERE v.place_id = moz_places.id)"
+        ):
+            yield HistoryUrl(id_, url, title or "", visits, typed, last or 0, hidden)
+
+    def visits() -> Iterator[HistoryVisit]:
+        for id_, place_id, time, from_visit, visit_type in connection.execute(
+            "SELECT v.id, v.place_id, v.visit_date, v.from_visit, v.visit_type"
+            " FROM moz_historyvisits v JOIN moz_places p ON p.id = v.place_id"
+            " WHERE p.url NOT LIKE 'place:%'"
+        ):
+            yield HistoryVisit(id_, place_id, time, from_visit or 0, visit_type)
+
+    return urls(), visits()
+
+
+def _columns(connection: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')}
+
+
+def _insert(
+    connection: sqlite3.Connection,
+    table: str,
+    columns: list[str],
+    rows: Iterable[tuple],
+) -> None:
+    # columns missing from this version of the browser's schema are left out
+    existing = _columns(connection, table)
+    keep = [index for index, column in enumerate(columns) if column in existing]
+    names = ", ".join(columns[index] for index in keep)
+    placeholders = ", ".join("?" * len(keep))
+    if len(keep) != len(columns):
+        rows = (tuple(row[index] for index in keep) for row in rows)
+    connection.executemany(
+        f"INSERT INTO {table} ({names}) VALUES ({placeholders})", rows
+    )
+
+
+@contextmanager
+def bulk_load(connection: sqlite3.Connection, tables: list[str]) -> Iterator[None]:
+    """
+    Runs a bulk load in one transaction, with the indexes of the loaded tables dropped
+    during the load and rebuilt once at the end. On error everything is rolled back,
+    indexes included.
+
+    Args:
+        connection (sqlite3.Connection): Connection opened with isolation_level=None.
+        tables (list[str]): The tables that are loaded.
+    """
+
+    placeholders = ", ".join("?" * len(tables))
+    indexes = connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        f" AND tbl_name IN ({placeholders})",
+        tables,
+    ).fetchall()
+    connection.execute("BEGIN")
+    try:
+        for name, _ in indexes:
+            connection.execute(f'DROP INDEX "{name}"')
+        yield
+        for _, sql in indexes:
+            connection.execute(sql)
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+
+def _load_history(
+    connection: sqlite3.Connection,
+    schema: HistorySchema,
+    urls: Iterable[HistoryUrl],
+    visits: Iterable[HistoryVisit],
+    url_columns: list[str],
+    url_row: Callable[[HistoryUrl, int], tuple],
+    visit_columns: list[str],
+    visit_row: Callable[[HistoryVisit, int, int, int], tuple],
+    url_update: str,
+    time_offset: int = 0,
+) -> dict:
+    # Source ids are shifted past the largest target id, so no id map has to be kept.
+    # Only URLs the target already has are remapped to its rows; that map, and the
+    # visits already stored for them, are bounded by the size of the target.
+    # url_update takes the number of added visits, the newest of them and the URL id;
+    # the target stores visit times as HistoryVisit.time + time_offset.
+    existing = dict(connection.execute(f"SELECT url, id FROM {schema.urls}"))
+    url_base, visit_base = (
+        connection.execute(f"SELECT max(id) FROM {table}").fetchone()[0] or 0
+        for table in (schema.urls, schema.visits)
+    )
+    merged: dict[int, int] = {}
+    stats = {"urls": 0, "urls_merged": 0, "visits": 0, "visits_skipped": 0}
+
+    def url_rows() -> Iterator[tuple]:
+        for url in urls:
+            target_id = existing.get(url.url)
+            if target_id is not None:
+                merged[url.id] = target_id
+                stats["urls_merged"] += 1
+                continue
+            stats["urls"] += 1
+            yield url_row(url, url.id + url_base)
+
+    _insert(connection, schema.urls, url_columns, url_rows())
+
+    merged_ids = set(merged.values())
+    seen = {
+        (url_id, time - time_offset)
+        for url_id, time in connection.execute(
+            f"SELECT {schema.visit_url}, {schema.visit_time} FROM {schema.visits}"
+        )
+        if url_id in merged_ids
+    }
+    added: Counter = Counter()
+    latest: dict[int, int] = {}
+
+    def visit_rows() -> Iterator[tuple]:
+        for visit in visits:
+            url_id = merged.get(visit.url_id, visit.url_id + url_base)
+            if url_id in merged_ids:
+                if (url_id, visit.time) in seen:
+                    stats["visits_skipped"] += 1
+                    continue
+                added[url_id] += 1
+                latest[url_id] = max(latest.get(url_id, 0), visit.time)
+            stats["visits"] += 1
+            from_visit = visit.from_visit + visit_base if visit.from_visit else 0
+            yield visit_row(visit, visit.id + visit_base, url_id, from_visit)
+
+    _insert(connection, schema.visits, visit_columns, visit_rows())
+    connection.executemany(
+        url_update, ((count, latest[id_], id_) for id_, count in added.items())
+    )
+    stats["visit_id_base"] = visit_base
+    return stats
+
+
+def write_firefox_history(
+    connection: sqlite3.Connection,
+    urls: Iterable[HistoryUrl],
+    visits: Iterable[HistoryVisit],
+) -> dict:
+    """
+    Adds URLs and visits to a Firefox places.sqlite database.
+
+    URLs the database already has are merged into their place. url_hash, rev_host, guid and
+    the moz_origins entry are computed for new places; frecency is left for Firefox to
+    recalculate. Visits already stored for a merged place are skipped, so converting the
+    same history twice does not duplicate it.
+
+    Args:
+        connection (sqlite3.Connection): The open database, inside a bulk_load().
+        urls (Iterable[HistoryUrl]): URLs to add.
+        visits (Iterable[HistoryVisit]): Visits of those URLs.
+
+    Returns:
+        dict: Numbers of URLs added and merged, and of visits added and skipped.
+    """
+
+    has_origins = "moz_origins" in _table_names(connection)
+    origins: dict[tuple[str, str], int] = {}
+    if has_origins:
+        origins = {
+            (prefix, host): id_
+            for id_, prefix, host in connection.execute(
+                "SELECT id, prefix, host FROM moz_origins"
+            )
+        }
+    new_origins: list[tuple[int, str, str]] = []
+    origin_base = max(origins.values(), default=0)
+
+    def origin_id(key: tuple[str, str]) -> Optional[int]:
+        if not has_origins:
+            return None
+        id_ = origins.get(key)
+        if id_ is None:
+            id_ = origins[key] = origin_base + len(new_origins) + 1
+            new_origins.append((id_, *key))
+        return id_
+
+    def place_row(url: HistoryUrl, id_: int) -> tuple:
+        origin = _url_origin(url.url)
+        return (
+            id_,
+            url.url,
+            url.title,
+            origin[1][::-1] + ".",
+            url.visit_count,
+            url.hidden,
+            1 if url.typed_count else 0,
+            -1,
+            1,
+            url.last_visit or None,
+            new_firefox_guid(),
+            firefox_url_hash(url.url),
+            origin_id(origin),
+        )
+
+    stats = _load_history(
+        connection,
+        history_schema("Firefox"),
+        urls,
+        visits,
+        [
+            "id",
+            "url",
+            "title",
+            "rev_host",
+            "visit_count",
+            "hidden",
+            "typed",
+            "frecency",
+            "recalc_frecency",
+            "last_visit_date",
+            "guid",
+            "url_hash",
+            "origin_id",
+        ],
+        place_row,
+        ["id", "from_visit", "place_id", "visit_date", "visit_type", "source"],
+        lambda visit, id_, url_id, from_visit: (
+            id_,
+            from_visit,
+            url_id,
+            visit.time,
+            visit.visit_type,
+            0,
+        ),
+        "UPDATE moz_places SET visit_count = visit_count + ?, frecency = -1,"
+        " last_visit_date = max(coalesce(last_visit_date, 0), ?) WHERE id = ?",
+    )
+    if new_origins:
+        _insert(
+            connection,
+            "moz_origins",
+            ["id", "prefix", "host", "frecency", "recalc_frecency"],
+            ((*origin, 0, 1) for origin in new_origins),
+        )
+    return stats
+
+
+def write_chromium_history(
+    connection: sqlite3.Connection,
+    urls: Iterable[HistoryUrl],
+    visits: Iterable[HistoryVisit],
+    visit_source: Optional[int] = None,
+) -> dict:
+    """
+    Adds URLs and visits to a Chromium History database.
+
+    URLs the database already has are merged into their row, and visits already stored
+    for them are skipped, so converting the same history twice does not duplicate it.
+
+    Args:
+        connection (sqlite3.Connection): The open database, inside a bulk_load().
+        urls (Iterable[HistoryUrl]): URLs to add.
+        visits (Iterable[HistoryVisit]): Visits of those URLs.
+        visit_source (Optional[int]): visit_source.source recorded for every added visit,
+                                      e.g. CHROMIUM_SOURCE_FIREFOX_IMPORTED. Default is None.
+
+    Returns:
+        dict: Numbers of URLs added and merged, and of visits added and skipped.
+    """
+
+    stats = _load_history(
+        connection,
+        history_schema("Chrome"),
+        urls,
+        visits,
+        [
+            "id",
+            "url",
+            "title",
+            "visit_count",
+            "typed_count",
+            "last_visit_time",
+            "hidden",
+        ],
+        lambda url, id_: (
+            id_,
+            url.url,
+            url.title,
+            url.visit_count,
+            url.typed_count,
+            url.last_visit + WEBKIT_EPOCH_OFFSET if url.last_visit else 0,
+            url.hidden,
+        ),
+        [
+            "id",
+            "url",
+            "visit_time",
+            "from_visit",
+            "transition",
+            "segment_id",
+            "visit_duration",
+        ],
+        lambda visit, id_, url_id, from_visit: (
+            id_,
+            url_id,
+            visit.time + WEBKIT_EPOCH_OFFSET,
+            from_visit,
+            chromium_transition(visit.visit_type),
+            0,
+            0,
+        ),
+        "UPDATE urls SET visit_count = visit_count + ?,"
+        f" last_visit_time = max(last_visit_time, ? + {WEBKIT_EPOCH_OFFSET}) WHERE id = ?",
+        WEBKIT_EPOCH_OFFSET,
+    )
+    if visit_source is not None and "visit_source" in _table_names(connection):
+        connection.execute(
+            "INSERT OR REPLACE INTO visit_source (id, source)"
+            " SELECT id, ? FROM visits WHERE id > ?",
+            (visit_source, stats["visit_id_base"]),
+        )
+    return stats
+
+
+def _table_names(connection: sqlite3.Connection) -> set[str]:
+    return {
+        row[0]
+        for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+
+
+def read_chromium_bookmarks(path: Path) -> list[BookmarkNode]:
+    """
+    Reads a Chromium Bookmarks file.
+
+    Args:
+        path (Path): The Bookmarks JSON file.
+
+    Returns:
+        list[BookmarkNode]: One folder per root (bookmarks bar, other, mobile).
+    """
+
+    def node(data: dict) -> BookmarkNode:
+        added = int(data.get("date_added") or 0)
+        added = added - WEBKIT_EPOCH_OFFSET if added else 0
+        if data.get("type") == "url":
+            return BookmarkNode(data.get("name", ""), data.get("url", ""), added)
+        return BookmarkNode(
+            data.get("name", ""),
+            None,
+            added,
+            [node(c) for c in data.get("children", [])],
+        )
+
+    with open(path, "r", encoding="utf-8") as f:
+        roots = load(f).get("roots", {})
+    return [node(roots[key]) for key in CHROMIUM_ROOTS if key in roots]
+
+
+def read_firefox_bookmarks(connection: sqlite3.Connection) -> list[BookmarkNode]:
+    """
+    Reads the bookmarks of a Firefox places.sqlite database. Separators are skipped.
+
+    Args:
+        connection (sqlite3.Connection): The open database.
+
+    Returns:
+        list[BookmarkNode]: One folder per root (toolbar, menu, other, mobile).
+    """
+
+    nodes: dict[int, BookmarkNode] = {}
+    parents: list[tuple[int, int]] = []
+    roots: dict[str, int] = {}
+    for id_, kind, parent, title, added, guid, url in connection.execute(
+        "SELECT b.id, b.type, b.parent, b.title, b.dateAdded, b.guid, p.url"
+        " FROM moz_bookmarks b LEFT JOIN moz_places p ON p.id = b.fk"
+        " ORDER BY b.parent, b.position"
+    ):
+        if kind == FIREFOX_BOOKMARK:
+            nodes[id_] = BookmarkNode(title or "", url or "", added or 0)
+        elif kind == FIREFOX_FOLDER:
+            nodes[id_] = BookmarkNode(title or "", None, added or 0)
+        else:
+            continue
+        parents.append((id_, parent))
+        if guid in FIREFOX_ROOTS:
+            roots[guid] = id_
+    for id_, parent in parents:
+        if parent in nodes:
+            nodes[parent].children.append(nodes[id_])
+
+    result = []
+    for guid, name in FIREFOX_ROOTS.items():
+        if guid in roots:
+            root = nodes[roots[guid]]
+            result.append(BookmarkNode(name, None, root.date_added, root.children))
+    return result
+
+
+def chromium_bookmarks_checksum(roots: dict) -> str:
+    """
+    Computes the checksum Chromium stores in the Bookmarks file.
+
+    Every node is hashed in tree order: its id, its title as UTF-16LE, then "url" and the URL
+    or "folder".
+
+    Args:
+        roots (dict): The "roots" object of the file.
+
+    Returns:
+        str: The MD5 hex digest.
+    """
+
+    digest = md5()
+
+    def update(node: dict) -> None:
+        digest.update(node["id"].encode())
+        digest.update(node.get("name", "").encode("utf-16-le"))
+        if node.get("type") == "url":
+            digest.update(b"url")
+            digest.update(node.get("url", "").encode())
+        else:
+            digest.update(b"folder")
+            for child in node.get("children", []):
+                update(child)
+
+    for key in CHROMIUM_ROOTS:
+        if key in roots:
+            update(roots[key])
+    return digest.hexdigest()
+
+
+def write_chromium_bookmarks(
+    path: Path, folder_title: str, roots: list[BookmarkNode]
+) -> int:
+    """
+    Adds bookmarks to a Chromium Bookmarks file, in a folder on the bookmarks bar.
+
+    A folder with the same title left by a previous conversion is replaced. The file is
+    created when the profile has none, and written with a fresh checksum.
+
+    Args:
+        path (Path): The Bookmarks JSON file.
+        folder_title (str): Title of the folder, e.g. "Imported from Firefox".
+        roots (list[BookmarkNode]): The converted roots; each non-empty one becomes a subfolder.
+
+    Returns:
+        int: The number of bookmarks added.
+    """
+
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            data = load(f)
+    else:
+        data = {"roots": {}, "version": 1}
+    for key, (id_, name, guid) in CHROMIUM_ROOTS.items():
+        data["roots"].setdefault(
+            key,
+            {
+                "children": [],
+                "date_added": "0",
+                "date_last_used": "0",
+                "date_modified": "0",
+                "guid": guid,
+                "id": id_,
+                "name": name,
+                "type": "folder",
+            },
+        )
+
+    def max_id(node: dict) -> int:
+        return max(
+            [int(node.get("id", 0))] + [max_id(c) for c in node.get("children", [])]
+        )
+
+    next_id = max(max_id(node) for node in data["roots"].values()) + 1
+
+    def encode(node: BookmarkNode) -> dict:
+        nonlocal next_id
+        encoded = {
+            "date_added": str(node.date_added + WEBKIT_EPOCH_OFFSET),
+            "date_last_used": "0",
+            "guid": str(uuid4()),
+            "id": str(next_id),
+            "name": node.title,
+        }
+        next_id += 1
+        if node.url is not None:
+            encoded.update(type="url", url=node.url)
+        else:
+            encoded.update(
+                children=[encode(child) for child in node.children],
+                date_modified="0",
+                type="folder",
+            )
+        return encoded
+
+    bar = data["roots"]["bookmark_bar"]
+    bar["children"] = [
+        child
+        for child in bar["children"]
+        if not (child.get("type") == "folder" and child.get("name") == folder_title)
+    ]
+    folder = BookmarkNode(folder_title, children=[r for r in roots if r.children])
+    bar["children"].append(encode(folder))
+    data["checksum"] = chromium_bookmarks_checksum(data["roots"])
+
+    part_path = path.with_name(path.name + ".part")
+    with open(part_path, "w", encoding="utf-8") as f:
+        dump(data, f, indent=3, ensure_ascii=False)
+    part_path.replace(path)
+    return folder.count()
+
+
+def write_firefox_bookmarks(
+    connection: sqlite3.Connection, folder_title: str, roots: list[BookmarkNode]
+) -> int:
+    """
+    Adds bookmarks to a Firefox places.sqlite database, in a folder on the toolbar.
+
+    A folder with the same title left by a previous conversion is removed first. Bookmarked
+    URLs without a place get one, and foreign_count of every bookmarked place is kept in step.
+
+    Args:
+        connection (sqlite3.Connection): The open database, inside a transaction.
+        folder_title (str): Title of the folder, e.g. "Imported from Chrome".
+        roots (list[BookmarkNode]): The converted roots; each non-empty one becomes a subfolder.
+
+    Returns:
+        int: The number of bookmarks added.
+    """
+
+    toolbar = connection.execute(
+        "SELECT id FROM moz_bookmarks WHERE guid = ?", (FIREFOX_TOOLBAR,)
+    ).fetchone()
+    if toolbar is None:
+        raise ValueError("places.sqlite has no bookmarks toolbar")
+    toolbar = toolbar[0]
+
+    for (old,) in connection.execute(
+        "SELECT id FROM moz_bookmarks WHERE parent = ? AND type = ? AND title = ?",
+        (toolbar, FIREFOX_FOLDER, folder_title),
+    ).fetchall():
+        subtree = (
+            "WITH RECURSIVE tree(id) AS (SELECT ? UNION ALL SELECT b.id FROM moz_bookmarks"
+            " b JOIN tree ON b.parent = tree.id)"
+        )
+        connection.execute(
+            f"{subtree} UPDATE moz_places SET foreign_count = foreign_count -"
+            " (SELECT count(*) FROM moz_bookmarks b WHERE b.fk = moz_places.id"
+            "  AND b.id IN tree) WHERE id IN (SELECT fk FROM moz_bookmarks"
+            "  WHERE id IN tree)",
+            (old,),
+        )
+        connection.execute(
+            f"{subtree} DELETE FROM moz_bookmarks WHERE id IN tree", (old,)
+        )
+
+    bookmark_columns = _columns(connection, "moz_bookmarks")
+    has_origins = "origin_id" in _columns(connection, "moz_places")
+    now = connection.execute(
+        "SELECT CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER)"
+    ).fetchone()[0]
+    added = 0
+
+    def place_id(url: str) -> int:
+        url_hash = firefox_url_hash(url)
+        row = connection.execute(
+            "SELECT id FROM moz_places WHERE url_hash = ? AND url = ?", (url_hash, url)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        prefix, host = _url_origin(url)
+        columns = ["url", "rev_host", "hidden", "frecency", "guid", "url_hash"]
+        values = [url, host[::-1] + ".", 0, -1, new_firefox_guid(), url_hash]
+        if has_origins:
+            connection.execute(
+                "INSERT OR IGNORE INTO moz_origins (prefix, host, frecency)"
+                " VALUES (?, ?, 0)",
+                (prefix, host),
+            )
+            columns.append("origin_id")
+            values.append(
+                connection.execute(
+                    "SELECT id FROM moz_origins WHERE prefix = ? AND host = ?",
+                    (prefix, host),
+                ).fetchone()[0]
+            )
+        return connection.execute(
+            f"INSERT INTO moz_places ({', '.join(columns)})"
+            f" VALUES ({', '.join('?' * len(columns))})",
+            values,
+        ).lastrowid
+
+    def insert(node: BookmarkNode, parent: int, position: int) -> None:
+        nonlocal added
+        fk = None
+        if node.url is not None:
+            fk = place_id(node.url)
+            connection.execute(
+                "UPDATE moz_places SET foreign_count = foreign_count + 1 WHERE id = ?",
+                (fk,),
+            )
+            added += 1
+        row = {
+            "type": FIREFOX_BOOKMARK if node.url is not None else FIREFOX_FOLDER,
+            "fk": fk,
+            "parent": parent,
+            "position": position,
+            "title": node.title,
+            "dateAdded": node.date_added or now,
+            "lastModified": now,
+            "guid": new_firefox_guid(),
+        }
+        row = {k: v for k, v in row.items() if k in bookmark_columns}
+        id_ = connection.execute(
+            f"INSERT INTO moz_bookmarks ({', '.join(row)})"
+            f" VALUES ({', '.join('?' * len(row))})",
+            list(row.values()),
+        ).lastrowid
+        for index, child in enumerate(node.children):
+            insert(child, id_, index)
+
+    position = connection.execute(
+        "SELECT coalesce(max(position) + 1, 0) FROM moz_bookmarks WHERE parent = ?",
+        (toolbar,),
+    ).fetchone()[0]
+    insert(
+        BookmarkNode(folder_title, children=[r for r in roots if r.children]),
+        toolbar,
+        position,
+    )
+    return added
+
+
+def find_profile_directory(browser: str, root: Path) -> Optional[Path]:
+    """
+    Finds the main profile directory below a browser's profile root: "Default" for
+    Chromium, the profile with a places.sqlite for Firefox.
+
+    Args:
+        browser (str): The browser name.
+        root (Path): The browser's profile root, or its exported copy.
+
+    Returns:
+        Optional[Path]: The profile directory, or None if there is none.
+    """
+
+    databases = find_history_databases(browser, root)
+    if databases:
+        return databases[0].parent
+    if is_gecko(browser):
+        candidates = [*root.glob("*"), *root.glob("Profiles/*")]
+        pattern = FIREFOX_PROFILE_PATTERN
+    else:
+        candidates = [root / "Default", *sorted(root.glob("*"))]
+        pattern = CHROMIUM_PROFILE_PATTERN
+    for candidate in candidates:
+        if candidate.is_dir() and pattern.fullmatch(candidate.name):
+            return candidate
+    return None
+
+
+def _open_database(path: Path, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        return sqlite3.connect(
+            f"{path.resolve().as_uri()}?mode=ro", uri=True, isolation_level=None
+        )
+    return sqlite3.connect(path, isolation_level=None)
+
+
+def convert_profile(
+    source_browser: str, source_root: Path, target_browser: str, target_root: Path
+) -> dict:
+    """
+    Converts the history and bookmarks of an exported profile into another browser's profile.
+
+    Chromium History and Bookmarks are written into Firefox's places.sqlite, and the other way
+    round; two Chromium browsers can be converted too. History rows are streamed from the
+    source and loaded with executemany() in one transaction per database, with the indexes
+    of the loaded tables rebuilt once after the load, so memory does not grow with the size
+    of the source history. Bookmarks land in an "Imported from <browser>" folder on the
+    target's bookmarks bar; converting again replaces that folder and skips visits that are
+    already there.
+
+    The target profile must exist and contain its history database, i.e. the target browser
+    must have been started once; otherwise only Chromium bookmarks can be written.
+
+    Args:
+        source_browser (str): Browser the export comes from.
+        source_root (Path): Export directory of that browser (exported_profiles/<browser>).
+        target_browser (str): Browser to convert into.
+        target_root (Path): Profile root of the target browser.
+
+    Raises:
+        FileNotFoundError: If the source or target profile is missing.
+        sqlite3.Error: If a database cannot be read or written.
+
+    Returns:
+        dict: URLs, visits and bookmarks added, and visits skipped as already present.
+    """
+
+    source_profile = find_profile_directory(source_browser, source_root)
+    if source_profile is None:
+        raise FileNotFoundError(f"No {source_browser} profile in {source_root}")
+    target_profile = find_profile_directory(target_browser, target_root)
+    if target_profile is None:
+        raise FileNotFoundError(f"No {target_browser} profile in {target_root}")
+
+    source_database = source_profile / history_schema(source_browser).database
+    target_database = target_profile / history_schema(target_browser).database
+    folder_title = f"Imported from {source_browser}"
+    stats = {"urls": 0, "urls_merged": 0, "visits": 0, "visits_skipped": 0}
+
+    source = _open_database(source_database, True) if source_database.exists() else None
+    target = _open_database(target_database) if target_database.exists() else None
+    try:
+        if is_gecko(source_browser):
+            read_history = read_firefox_history
+            bookmarks = read_firefox_bookmarks(source) if source is not None else []
+        else:
+            read_history = read_chromium_history
+            bookmarks_path = source_profile / "Bookmarks"
+            bookmarks = (
+                read_chromium_bookmarks(bookmarks_path)
+                if bookmarks_path.exists()
+                else []
+            )
+
+        if source is not None and target is not None:
+            schema = history_schema(target_browser)
+            urls, visits = read_history(source)
+            with bulk_load(target, [schema.urls, schema.visits]):
+                if is_gecko(target_browser):
+                    result = write_firefox_history(target, urls, visits)
+                else:
+                    result = write_chromium_history(
+                        target,
+                        urls,
+                        visits,
+                        (
+                            CHROMIUM_SOURCE_FIREFOX_IMPORTED
+                            if is_gecko(source_browser)
+                            else None
+                        ),
+                    )
+            stats.update({key: result[key] for key in stats})
+        elif source is not None:
+            logger.warning(
+                f"{target_database} not found, history of {source_browser} is not converted."
+            )
+
+        stats["bookmarks"] = 0
+        if bookmarks and is_gecko(target_browser):
+            if target is None:
+                logger.warning(
+                    f"{target_database} not found, bookmarks of {source_browser} are not converted."
+                )
+            else:
+                target.execute("BEGIN")
+                try:
+                    stats["bookmarks"] = write_firefox_bookmarks(
+                        target, folder_title, bookmarks
+                    )
+                    target.execute("COMMIT")
+                except BaseException:
+                    target.execute("ROLLBACK")
+                    raise
+        elif bookmarks:
+            stats["bookmarks"] = write_chromium_bookmarks(
+                target_profile / "Bookmarks", folder_title, bookmarks
+            )
+    finally:
+        if source is not None:
+            source.close()
+        if target is not None:
+            target.close()
+
+    logger.info(
+        f"Converted {source_browser} profile {source_profile} into {target_browser}"
+        f" profile {target_profile}: {stats}"
+    )
+    return stats
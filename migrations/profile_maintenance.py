@@ -0,0 +1,193 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event
+from typing import Optional
+
+from utils.browser_registry import is_gecko
+from utils.get_browser_profile_paths import (
+    CHROMIUM_PROFILE_PATTERN,
+    FIREFOX_PROFILE_PATTERN,
+)
+from utils.logger import logger
+from utils.metrics import metrics
+
+## Post-restore maintenance
+# A restored profile is slow on its first launch: the browser replays the WAL files copied
+# with the databases, reads databases that grew page by page over years, and reads all of it
+# from a cold disk. After a restore, every database below is checkpointed (its WAL folded
+# into it and truncated), vacuumed (rewritten in page order, free pages dropped), analyzed
+# and optimized, one thread per database, as sqlite3 releases the GIL while it works. Then
+# the page cache is asked to read the databases and the other files read at startup ahead
+# (posix_fadvise WILLNEED), so that the browser started right after finds them in memory.
+
+# Databases maintained after a restore
+CHROMIUM_DATABASES = ("History", "Login Data", "Favicons")
+FIREFOX_DATABASES = ("places.sqlite", "favicons.sqlite")
+# Other files read on every startup, prewarmed with the databases
+CHROMIUM_HOT_FILES = ("Preferences", "Secure Preferences", "Bookmarks")
+FIREFOX_HOT_FILES = ("prefs.js", "extensions.json", "xulstore.json")
+
+# Threads of maintain_profile
+DEFAULT_MAINTENANCE_WORKERS = 4
+
+
+def find_profile_files(browser: str, profile_path: Path, names: tuple) -> list[Path]:
+    """
+    Finds files of every profile below a browser's profile directory.
+
+    Args:
+        browser (str): The browser name.
+        profile_path (Path): The browser's profile directory.
+        names (tuple): File names inside a profile, e.g. ("History", "Favicons").
+
+    Returns:
+        list[Path]: The existing files, e.g. "Default/History".
+    """
+
+    pattern = FIREFOX_PROFILE_PATTERN if is_gecko(browser) else CHROMIUM_PROFILE_PATTERN
+    directories = [*profile_path.glob("*")]
+    if is_gecko(browser):
+        directories += profile_path.glob("Profiles/*")
+    return sorted(
+        directory / name
+        for directory in directories
+        if pattern.fullmatch(directory.name)
+        for name in names
+        if (directory / name).is_file()
+    )
+
+
+def maintain_database(path: Path, vacuum: bool = True) -> dict:
+    """
+    Folds the WAL of a database into it, then vacuums, analyzes and optimizes it.
+
+    The journal mode of the database is left as the browser set it.
+
+    Args:
+        path (Path): The database.
+        vacuum (bool): Whether to rebuild the database with VACUUM. Default is True.
+
+    Raises:
+        sqlite3.Error: If the database cannot be opened or maintained.
+
+    Returns:
+        dict: The WAL bytes folded, and the database size before and after.
+    """
+
+    wal = path.with_name(path.name + "-wal")
+    wal_bytes = wal.stat().st_size if wal.exists() else 0
+    before = path.stat().st_size + wal_bytes
+
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        if connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if vacuum:
+            connection.execute("VACUUM")
+        connection.execute("ANALYZE")
+        connection.execute("PRAGMA optimize")
+        if connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # VACUUM went through the WAL
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        connection.close()
+
+    after = path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+    return {"wal_bytes": wal_bytes, "bytes_before": before, "bytes": after}
+
+
+def prewarm_files(paths: list[Path]) -> int:
+    """
+    Asks the kernel to read files into the page cache ahead of use.
+
+    Only where os.posix_fadvise exists (Linux and other POSIX systems); elsewhere this does
+    nothing. The call returns at once, the reads happen in the background.
+
+    Args:
+        paths (list[Path]): The files.
+
+    Returns:
+        int: Bytes advised.
+    """
+
+    if not hasattr(os, "posix_fadvise"):
+        return 0
+    advised = 0
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            advised += os.fstat(fd).st_size
+        except OSError as e:
+            logger.debug(f"posix_fadvise failed on {path}: {e}")
+        finally:
+            os.close(fd)
+    return advised
+
+
+def maintain_profile(
+    browser: str,
+    profile_path: Path | str,
+    workers: int = DEFAULT_MAINTENANCE_WORKERS,
+    vacuum: bool = True,
+    cancel: Optional[Event] = None,
+) -> dict:
+    """
+    Maintains the databases of a restored profile in parallel and prewarms its hot files.
+
+    A database that cannot be maintained is logged and left as it is. Seconds are recorded as
+    the "maintain" and "prewarm" phases, the databases, WAL bytes folded, bytes reclaimed and
+    bytes prewarmed as counters of the browser.
+
+    Args:
+        browser (str): The browser name.
+        profile_path (Path | str): The restored profile directory of the browser.
+        workers (int): Databases maintained at the same time. Default is DEFAULT_MAINTENANCE_WORKERS.
+        vacuum (bool): Whether to VACUUM the databases. Default is True.
+        cancel (Optional[Event]): Databases not started yet are skipped once set. Default is None.
+
+    Returns:
+        dict: Databases maintained and failed (or skipped on cancel), WAL bytes folded,
+              bytes reclaimed and bytes prewarmed.
+    """
+
+    profile_path = Path(profile_path)
+    firefox = is_gecko(browser)
+    databases = find_profile_files(
+        browser, profile_path, FIREFOX_DATABASES if firefox else CHROMIUM_DATABASES
+    )
+    totals = {"databases": 0, "failed": 0, "wal_bytes": 0, "bytes_reclaimed": 0}
+
+    def maintain(path: Path) -> Optional[dict]:
+        if cancel is not None and cancel.is_set():
+            return None
+        try:
+            return maintain_database(path, vacuum)
+        except sqlite3.Error as e:
+            logger.warning(f"Maintenance of {path} failed: {e}")
+            return None
+
+    with metrics.phase("maintain", browser):
+        with ThreadPoolExecutor(max(1, workers), "maintain") as executor:
+            for result in executor.map(maintain, databases):
+                if result is None:
+                    totals["failed"] += 1
+                    continue
+                totals["databases"] += 1
+                totals["wal_bytes"] += result["wal_bytes"]
+                totals["bytes_reclaimed"] += result["bytes_before"] - result["bytes"]
+
+    with metrics.phase("prewarm", browser):
+        hot_files = find_profile_files(
+            browser, profile_path, FIREFOX_HOT_FILES if firefox else CHROMIUM_HOT_FILES
+        )
+        totals["bytes_prewarmed"] = prewarm_files(databases + hot_files)
+
+    metrics.count(browser, **{f"maintenance_{k}": v for k, v in totals.items()})
+    logger.info(f"Maintenance of {browser} profile {profile_path}: {totals}")
+    return totals
@@ -0,0 +1,266 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from itertools import repeat
+from os import cpu_count
+from pathlib import Path
+from typing import Optional
+
+from session_parsers.chromium_parser import parse_snss_file
+from session_parsers.firefox_parser import parse_jsonlz4_file
+from session_parsers.parse_stats import ParseStats
+from session_parsers.tab_filter import CompiledTabFilter
+from structrues.chormium_structures import ChromiumTab, ChromiumWindow
+from structrues.firefox_structures import FirefoxTab, FirefoxWindow
+from utils.browser_registry import is_gecko
+from utils.logger import logger
+
+## Session recovery
+# A browser keeps several session snapshots: Chromium the current and the previous
+# Session_* files, Firefox sessionstore.jsonlz4, recovery.jsonlz4 and its backup,
+# previous.jsonlz4 and upgrade.jsonlz4-* copies (see find_session_snapshots). The newest one
+# is often cut off when the browser has just been killed. Every snapshot is parsed
+# (tolerating a truncated tail) and the tabs are merged by recency: all tabs of the newest
+# snapshot, then, only while the snapshots read so far are truncated, the tabs of the next
+# older one that are not in the merge yet. A complete snapshot ends the merge, as anything
+# older only holds tabs that have been closed since.
+
+# Without an explicit worker count, snapshots are parsed in a process pool only when they
+# add up to PARALLEL_MIN_BYTES: below that, starting the processes (a spawn per worker on
+# Windows) costs more than the parse.
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class Snapshot:
+    """
+    One parsed session snapshot.
+
+    Attributes:
+        path (Path): The snapshot file.
+        windows (list[ChromiumWindow] | list[FirefoxWindow]): Its windows, empty on error.
+        stats (ParseStats): Parse statistics of the snapshot.
+        error (Optional[str]): Why the snapshot could not be read at all.
+        tabs_used (int): Tabs of the snapshot that are in the merged session.
+    """
+
+    path: Path
+    windows: list[ChromiumWindow] | list[FirefoxWindow]
+    stats: ParseStats
+    error: Optional[str] = None
+    tabs_used: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.error is None and not self.stats.truncated_bytes
+
+
+@dataclass(slots=True)
+class RecoveredTab:
+    """
+    A tab of the merged session.
+
+    Attributes:
+        tab (ChromiumTab | FirefoxTab): The tab.
+        window (int): Index of its window in its snapshot.
+        source (Path): The snapshot it was taken from.
+    """
+
+    tab: ChromiumTab | FirefoxTab
+    window: int
+    source: Path
+
+
+def parse_snapshot(
+    path: Path,
+    browser: str,
+    tab_filter: Optional[CompiledTabFilter] = None,
+    decode_workers: int = 1,
+) -> Snapshot:
+    """
+    Parses one snapshot, keeping the selected navigation entry of each tab.
+
+    A truncated snapshot is read as far as it goes. A snapshot that cannot be read at all
+    is returned with its error instead of raising, so that the other ones can still be used.
+
+    Args:
+        path (Path): The snapshot file.
+        browser (str): The browser name.
+        tab_filter (Optional[CompiledTabFilter]): Filter deciding which tabs are kept. Default is None.
+        decode_workers (int): Processes decoding the navigation entries of a Chromium
+                              snapshot (see parse_snss_file). Default is 1.
+
+    Returns:
+        Snapshot: The parsed snapshot.
+    """
+
+    stats = ParseStats()
+    try:
+        if is_gecko(browser):
+            windows = parse_jsonlz4_file(
+                path,
+                current_only=True,
+                tab_filter=tab_filter,
+                stats=stats,
+                tolerant=True,
+            )
+        else:
+            windows = parse_snss_file(
+                path,
+                current_only=True,
+                tab_filter=tab_filter,
+                stats=stats,
+                workers=decode_workers,
+            )
+    except Exception as e:
+        return Snapshot(path, [], stats, f"{type(e).__name__}: {e}")
+    return Snapshot(path, windows, stats)
+
+
+def parse_snapshots(
+    paths: list[Path],
+    browser: str,
+    tab_filter: Optional[CompiledTabFilter] = None,
+    workers: Optional[int] = None,
+    decode_workers: int = 1,
+) -> list[Snapshot]:
+    """
+    Parses several snapshots in parallel, one per worker process.
+
+    The pools are not nested: `decode_workers` only applies when the snapshots are parsed
+    one after the other, typically a profile with a single large snapshot.
+
+    Args:
+        paths (list[Path]): The snapshot files.
+        browser (str): The browser name.
+        tab_filter (Optional[CompiledTabFilter]): Filter deciding which tabs are kept. Default is None.
+        workers (Optional[int]): Worker processes. Default is None (one per snapshot, at most
+                                 one per CPU, if the snapshots add up to PARALLEL_MIN_BYTES,
+                                 otherwise one). With one worker, no process pool is started.
+        decode_workers (int): Processes decoding each Chromium snapshot, see parse_snapshot.
+                              Default is 1.
+
+    Returns:
+        list[Snapshot]: The snapshots, in the order of `paths`.
+    """
+
+    if not workers:
+        size = sum(path.stat().st_size for path in paths if path.exists())
+        workers = (cpu_count() or 1) if size >= PARALLEL_MIN_BYTES else 1
+    workers = min(len(paths), workers)
+    if workers <= 1:
+        return [
+            parse_snapshot(path, browser, tab_filter, decode_workers) for path in paths
+        ]
+    with ProcessPoolExecutor(workers) as executor:
+        return list(
+            executor.map(parse_snapshot, paths, repeat(browser), repeat(tab_filter))
+        )
+
+
+def merge_snapshots(
+    snapshots: list[Snapshot], max_tabs: Optional[int] = None
+) -> list[RecoveredTab]:
+    """
+    Merges snapshots by recency into the most complete tab set.
+
+    Tabs are matched by the URL of their selected entry; a URL open in several tabs is
+    matched as many times. Snapshots that could not be read are skipped.
+
+    Args:
+        snapshots (list[Snapshot]): The snapshots, newest first. Their tabs_used is set.
+        max_tabs (Optional[int]): Maximum number of merged tabs. Default is None (no limit).
+
+    Returns:
+        list[RecoveredTab]: The tabs of the newest snapshot followed by the recovered ones.
+    """
+
+    merged: list[RecoveredTab] = []
+    counts: Counter[str] = Counter()
+    for snapshot in snapshots:
+        if snapshot.error is not None:
+            continue
+        seen: Counter[str] = Counter()
+        for window_index, window in enumerate(snapshot.windows):
+            for tab in window.tabs:
+                entry = tab.current_entry()
+                url = entry.url if entry is not None else ""
+                seen[url] += 1
+                if seen[url] <= counts[url]:
+                    continue
+                if max_tabs is not None and len(merged) >= max_tabs:
+                    continue
+                merged.append(RecoveredTab(tab, window_index, snapshot.path))
+                snapshot.tabs_used += 1
+        counts |= seen
+        if snapshot.complete:
+            break
+    return merged
+
+
+def recover_session(
+    profile_path: Path,
+    snapshots: list[Path],
+    browser: str,
+    tab_filter: Optional[CompiledTabFilter] = None,
+    stats: Optional[ParseStats] = None,
+    workers: Optional[int] = None,
+    decode_workers: int = 1,
+) -> tuple[list[RecoveredTab], list[dict]]:
+    """
+    Parses every session snapshot of a profile and merges them.
+
+    The counters of the newest readable snapshot are added to `stats`, plus the number of
+    tabs taken from older snapshots (tabs_recovered).
+
+    Args:
+        profile_path (Path): Profile root of the browser, sources are reported relative to it.
+        snapshots (list[Path]): The snapshots, newest first (see find_session_snapshots).
+        browser (str): The browser name.
+        tab_filter (Optional[CompiledTabFilter]): Filter deciding which tabs are kept. Default is None.
+        stats (Optional[ParseStats]): Statistics to update. Default is None.
+        workers (Optional[int]): Worker processes, see parse_snapshots. Default is None.
+        decode_workers (int): Processes decoding each snapshot, see parse_snapshots. Default is 1.
+
+    Returns:
+        tuple[list[RecoveredTab], list[dict]]: The merged tabs, and per snapshot its source,
+            size, tabs read and used, truncated bytes and error.
+    """
+
+    parsed = parse_snapshots(snapshots, browser, tab_filter, workers, decode_workers)
+    max_tabs = tab_filter.spec.max_tabs if tab_filter is not None else None
+    merged = merge_snapshots(parsed, max_tabs)
+
+    primary = next((snapshot for snapshot in parsed if snapshot.error is None), None)
+    if stats is not None and primary is not None:
+        for counter in fields(ParseStats):
+            setattr(
+                stats,
+                counter.name,
+                getattr(stats, counter.name) + getattr(primary.stats, counter.name),
+            )
+        stats.tabs_recovered += len(merged) - primary.tabs_used
+
+    report = []
+    for snapshot in parsed:
+        source = snapshot.path.relative_to(profile_path).as_posix()
+        if snapshot.error is not None:
+            logger.warning(
+                f"Session snapshot {snapshot.path} unreadable: {snapshot.error}"
+            )
+        elif snapshot.stats.truncated_bytes:
+            logger.warning(
+                f"Session snapshot {snapshot.path} is truncated "
+                f"({snapshot.stats.truncated_bytes} bytes missing or unreadable)"
+            )
+        report.append(
+            {
+                "source": source,
+                "bytes": snapshot.path.stat().st_size if snapshot.path.exists() else 0,
+                "tabs": snapshot.stats.tabs_kept,
+                "tabs_used": snapshot.tabs_used,
+                "truncated_bytes": snapshot.stats.truncated_bytes,
+                "error": snapshot.error,
+            }
+        )
+    return merged, report
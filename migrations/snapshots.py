@@ -0,0 +1,316 @@
+from dataclasses import dataclass
+from datetime import datetime
+from json import dumps, loads
+from os import link, stat
+from pathlib import Path
+from shutil import copy2, rmtree
+from typing import Callable, Optional
+
+from utils.logger import logger
+from utils.metrics import metrics
+
+## Point-in-time export snapshots
+# In snapshot mode every export goes to exported_profiles/snapshots/<YYYYmmdd-HHMMSS>/<browser>
+# instead of overwriting exported_profiles/<browser>. Like rsync --link-dest, a file whose
+# size and modification time match the same file of the previous snapshot is hardlinked to it
+# instead of copied, so a snapshot only costs the files that changed since the last one.
+# A snapshot is complete once its manifest (snapshot.json) is written, after the session file
+# has been copied next to the profiles; snapshots without one are leftovers of failed exports.
+# Retention keeps the newest N snapshots plus the newest one of each of the last N days and
+# ISO weeks. Pruning a snapshot only unlinks its entries: the data of a file still linked
+# from a kept snapshot is not touched, so it costs time per file, not per byte.
+
+SNAPSHOT_ROOT = Path("exported_profiles") / "snapshots"
+SNAPSHOT_MANIFEST = "snapshot.json"
+SNAPSHOT_NAME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Which snapshots are kept when pruning.
+
+    A snapshot is kept if any rule keeps it. The newest snapshot is always kept, as the next
+    one links against it. With no rule set, nothing is pruned.
+
+    Attributes:
+        keep_last (int): Newest snapshots to keep. Default is 0.
+        daily (int): Days, newest first, of which the newest snapshot is kept. Default is 0.
+        weekly (int): ISO weeks, newest first, of which the newest snapshot is kept. Default is 0.
+    """
+
+    keep_last: int = 0
+    daily: int = 0
+    weekly: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.keep_last or self.daily or self.weekly)
+
+
+def snapshot_time(path: Path) -> Optional[datetime]:
+    """
+    Returns the creation time encoded in a snapshot directory name.
+
+    Args:
+        path (Path): The snapshot directory.
+
+    Returns:
+        Optional[datetime]: The time, or None if the name is not a snapshot name.
+    """
+
+    try:
+        return datetime.strptime(path.name[:15], SNAPSHOT_NAME_FORMAT)
+    except ValueError:
+        return None
+
+
+def list_snapshots(root: Path = SNAPSHOT_ROOT, complete: bool = True) -> list[Path]:
+    """
+    Lists the snapshot directories, newest first.
+
+    Args:
+        root (Path): Directory holding the snapshots. Default is SNAPSHOT_ROOT.
+        complete (bool): Only list snapshots with a manifest. Default is True; False lists
+                         the leftovers of failed exports too.
+
+    Returns:
+        list[Path]: The snapshots.
+    """
+
+    if not root.is_dir():
+        return []
+    snapshots = [
+        path
+        for path in root.iterdir()
+        if path.is_dir()
+        and snapshot_time(path) is not None
+        and (not complete or (path / SNAPSHOT_MANIFEST).is_file())
+    ]
+    return sorted(snapshots, key=lambda path: path.name, reverse=True)
+
+
+def read_manifest(snapshot: Path) -> dict:
+    """
+    Reads the manifest of a complete snapshot.
+
+    Args:
+        snapshot (Path): The snapshot directory.
+
+    Raises:
+        FileNotFoundError: If the snapshot has no manifest.
+
+    Returns:
+        dict: Name, creation time, base snapshot, session file, and the files and bytes
+              of the snapshot, of which linked_files/linked_bytes are shared with the base.
+    """
+
+    return loads((snapshot / SNAPSHOT_MANIFEST).read_text("utf-8"))
+
+
+def resolve_snapshot(name: str, root: Path = SNAPSHOT_ROOT) -> Path:
+    """
+    Finds a complete snapshot by name.
+
+    Args:
+        name (str): The snapshot name, or "latest" for the newest snapshot.
+        root (Path): Directory holding the snapshots. Default is SNAPSHOT_ROOT.
+
+    Raises:
+        FileNotFoundError: If there is no such complete snapshot.
+
+    Returns:
+        Path: The snapshot directory.
+    """
+
+    snapshots = list_snapshots(root)
+    if name == "latest":
+        if not snapshots:
+            raise FileNotFoundError(f"No snapshots in {root}")
+        return snapshots[0]
+    for snapshot in snapshots:
+        if snapshot.name == name:
+            return snapshot
+    raise FileNotFoundError(f"Snapshot {name} not found in {root}")
+
+
+def snapshot_session_file(snapshot: Path) -> Path:
+    """
+    Returns the session file stored in a snapshot, for import.
+
+    Args:
+        snapshot (Path): The snapshot directory.
+
+    Returns:
+        Path: The session file.
+    """
+
+    return snapshot / read_manifest(snapshot)["session_file"]
+
+
+def new_snapshot(root: Path = SNAPSHOT_ROOT, now: Optional[datetime] = None) -> Path:
+    """
+    Creates the directory of a new snapshot.
+
+    Args:
+        root (Path): Directory holding the snapshots. Default is SNAPSHOT_ROOT.
+        now (Optional[datetime]): Creation time. Default is None (current time).
+
+    Returns:
+        Path: The empty snapshot directory.
+    """
+
+    name = (now or datetime.now()).strftime(SNAPSHOT_NAME_FORMAT)
+    path = root / name
+    # two exports within the same second
+    suffix = 1
+    while path.exists():
+        path = root / f"{name}-{suffix}"
+        suffix += 1
+    path.mkdir(parents=True)
+    return path
+
+
+def link_dest_copy(
+    copy: Callable[[str, str], str],
+    browser: str,
+    component: str,
+    destination: Path,
+    base: Path,
+) -> Callable[[str, str], str]:
+    """
+    Wraps a copytree copy function to hardlink files unchanged since the base snapshot.
+
+    A file is unchanged if the file at the same relative path of the base has the same size
+    and modification time (copy2 keeps the modification time, so an untouched file matches
+    exactly). Linked files are counted like copied ones, and also as "linked_files" and
+    "linked_bytes". A file that cannot be linked (e.g. on another file system) is copied.
+
+    Args:
+        copy (Callable[[str, str], str]): The copy function, see metrics.copy_function.
+        browser (str): The browser the counters belong to.
+        component (str): The component the counters belong to.
+        destination (Path): The directory copytree copies to.
+        base (Path): The same directory in the base snapshot.
+
+    Returns:
+        Callable[[str, str], str]: The copy function.
+    """
+
+    def link_or_copy(src: str, dst: str) -> str:
+        previous = base / Path(dst).relative_to(destination)
+        try:
+            current, old = stat(src), stat(previous)
+        except OSError:
+            return copy(src, dst)
+        if old.st_size != current.st_size or old.st_mtime_ns != current.st_mtime_ns:
+            return copy(src, dst)
+        try:
+            link(previous, dst)
+        except OSError:
+            return copy(src, dst)
+        size = current.st_size
+        metrics.count(
+            browser,
+            files=1,
+            bytes=size,
+            linked_files=1,
+            linked_bytes=size,
+            **{f"{component}_files": 1, f"{component}_bytes": size},
+        )
+        return dst
+
+    return link_or_copy
+
+
+def finish_snapshot(
+    snapshot: Path,
+    session_file: Path,
+    browsers: list[str],
+    base: Optional[Path] = None,
+) -> dict:
+    """
+    Copies the session file into a snapshot and writes its manifest, completing it.
+
+    Args:
+        snapshot (Path): The snapshot directory.
+        session_file (Path): The session file written by the export.
+        browsers (list[str]): The exported browsers, whose counters are summed.
+        base (Optional[Path]): The snapshot files were linked against. Default is None.
+
+    Returns:
+        dict: The manifest.
+    """
+
+    copy2(session_file, snapshot / session_file.name)
+    counters = [metrics.counters(browser) for browser in browsers]
+    manifest = {
+        "name": snapshot.name,
+        "created": snapshot_time(snapshot).isoformat(),
+        "base": base.name if base is not None else None,
+        "session_file": session_file.name,
+        "browsers": browsers,
+        **{
+            key: sum(c.get(key, 0) for c in counters)
+            for key in ("files", "bytes", "linked_files", "linked_bytes")
+        },
+    }
+    (snapshot / SNAPSHOT_MANIFEST).write_text(dumps(manifest, indent=2), "utf-8")
+    logger.info(
+        f"Snapshot {snapshot.name}: {manifest['files']} files, "
+        f"{manifest['linked_files']} linked to {manifest['base']}, "
+        f"{manifest['bytes'] - manifest['linked_bytes']} new bytes"
+    )
+    return manifest
+
+
+def select_snapshots(snapshots: list[Path], policy: RetentionPolicy) -> list[Path]:
+    """
+    Selects the snapshots a retention policy keeps.
+
+    Args:
+        snapshots (list[Path]): Complete snapshots, newest first.
+        policy (RetentionPolicy): The policy.
+
+    Returns:
+        list[Path]: The kept snapshots, newest first.
+    """
+
+    if not policy:
+        return list(snapshots)
+    kept = set(snapshots[: max(policy.keep_last, 1)])
+    for count, period in (
+        (policy.daily, lambda time: time.date()),
+        (policy.weekly, lambda time: time.isocalendar()[:2]),
+    ):
+        periods = set()
+        for snapshot in snapshots:
+            if len(periods) >= count:
+                break
+            key = period(snapshot_time(snapshot))
+            if key not in periods:
+                periods.add(key)
+                kept.add(snapshot)
+    return [snapshot for snapshot in snapshots if snapshot in kept]
+
+
+def prune_snapshots(policy: RetentionPolicy, root: Path = SNAPSHOT_ROOT) -> list[Path]:
+    """
+    Removes the snapshots a retention policy does not keep, and incomplete snapshots.
+
+    Must not run while an export is writing a snapshot to the same root.
+
+    Args:
+        policy (RetentionPolicy): The policy. With no rule set, only incomplete
+                                  snapshots are removed.
+        root (Path): Directory holding the snapshots. Default is SNAPSHOT_ROOT.
+
+    Returns:
+        list[Path]: The removed snapshots.
+    """
+
+    kept = set(select_snapshots(list_snapshots(root), policy))
+    removed = [s for s in list_snapshots(root, complete=False) if s not in kept]
+    for snapshot in removed:
+        rmtree(snapshot, ignore_errors=True)
+        logger.info(f"Pruned snapshot {snapshot}")
+    return removed
@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field
+from fnmatch import translate
+from re import IGNORECASE, compile
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+# Query parameters that only carry click/campaign tracking and never change the page.
+DEFAULT_TRACKING_PARAMS = (
+    "utm_*",
+    "fbclid",
+    "gclid",
+    "dclid",
+    "gbraid",
+    "wbraid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "_hsenc",
+    "_hsmi",
+    "igshid",
+    "ref_src",
+)
+
+DEFAULT_PORTS = {"http": "80", "https": "443", "ftp": "21", "ws": "80", "wss": "443"}
+
+
+@dataclass
+class DedupOptions:
+    """
+    Settings of the tab deduplication stage of the export.
+
+    Attributes:
+        mode (str): "keep" only interns URLs and records where they are open,
+                    "drop" removes every copy of a URL after the first one,
+                    "merge" does the same and lists the {"browser", "window"} locations
+                    of the kept tab and of the copies removed in the same browser in its
+                    "seen_in" field. Copies dropped because an earlier browser already
+                    exported the URL (global scope) are only listed in "shared_urls".
+        scope (str): "browser" deduplicates inside each browser, "global" also drops URLs
+                     already exported from a previous browser.
+        strip_params (list[str]): Query parameters ignored when comparing URLs.
+                                  Shell-style wildcards are allowed ("utm_*").
+        strip_fragment (bool): Ignore the "#fragment" part when comparing URLs.
+    """
+
+    mode: str = "drop"
+    scope: str = "global"
+    strip_params: list[str] = field(
+        default_factory=lambda: list(DEFAULT_TRACKING_PARAMS)
+    )
+    strip_fragment: bool = False
+
+    def __post_init__(self) -> None:
+        if self.mode not in ("keep", "drop", "merge"):
+            raise ValueError(f"Unknown dedup mode: {self.mode}")
+        if self.scope not in ("browser", "global"):
+            raise ValueError(f"Unknown dedup scope: {self.scope}")
+
+
+class TabDeduplicator:
+    """
+    Interns tab URLs across a whole export and removes duplicate tabs.
+
+    One instance is shared by all browsers of an export. Every URL and title goes through a
+    single string pool, so copies of the same URL in different windows and browsers are one
+    object in memory. Duplicates are detected on a normalized key: lowercase scheme and host,
+    no default port, no trailing slash and no tracking parameters.
+
+    Attributes:
+        options (DedupOptions): The deduplication settings.
+        shared (dict[str, dict]): Per normalized URL, the first URL seen and the list of
+                                  {"browser", "window"} locations it is open in.
+    """
+
+    def __init__(self, options: Optional[DedupOptions] = None) -> None:
+        self.options = options or DedupOptions()
+        self.shared: dict[str, dict] = {}
+        self._strings: dict[str, str] = {}
+        self._keys: dict[str, str] = {}
+        self._owners: dict[str, str] = {}
+
+        patterns = [translate(p) for p in self.options.strip_params]
+        self._strip_param = (
+            compile("|".join(patterns), IGNORECASE).match if patterns else None
+        )
+
+    def intern(self, value: str) -> str:
+        """
+        Returns the pooled copy of a string.
+
+        Args:
+            value (str): The string to intern.
+
+        Returns:
+            str: An equal string shared by every caller.
+        """
+
+        return self._strings.setdefault(value, value)
+
+    def normalize(self, url: str) -> str:
+        """
+        Builds the comparison key of a URL.
+
+        Args:
+            url (str): The URL.
+
+        Returns:
+            str: The normalized URL. URLs without a host (about:, data:) are returned as is.
+        """
+
+        key = self._keys.get(url)
+        if key is not None:
+            return key
+
+        try:
+            scheme, netloc, path, query, fragment = urlsplit(url)
+        except ValueError:
+            key = url
+        else:
+            scheme = scheme.lower()
+            if netloc:
+                userinfo, at, hostport = netloc.rpartition("@")
+                hostport = hostport.lower()
+                port = DEFAULT_PORTS.get(scheme)
+                if port and hostport.endswith(":" + port):
+                    hostport = hostport[: -len(port) - 1]
+                netloc = userinfo + at + hostport
+                path = path.rstrip("/")
+            if query and self._strip_param:
+                query = "&".join(
+                    param
+                    for param in query.split("&")
+                    if param and not self._strip_param(param.partition("=")[0])
+                )
+            if self.options.strip_fragment:
+                fragment = ""
+            key = urlunsplit((scheme, netloc, path, query, fragment))
+
+        self._keys[url] = key
+        return key
+
+    def process(self, browser: str, tabs: list[dict]) -> tuple[list[dict], int]:
+        """
+        Interns the URLs of a browser's tabs and removes duplicates according to the options.
+
+        Tabs must carry "url" and may carry "title" and "window" (index of their window).
+        The tabs of earlier browsers are already written when a browser is processed, so in
+        merge mode a tab dropped as a copy of an earlier browser's tab is not added to that
+        tab's "seen_in"; its location is recorded in shared_urls() only.
+
+        Args:
+            browser (str): The browser the tabs come from.
+            tabs (list[dict]): The browser's tabs in window order.
+
+        Returns:
+            tuple[list[dict], int]: The tabs to export and the number of duplicates removed.
+        """
+
+        mode = self.options.mode
+        kept: list[dict] = []
+        kept_by_key: dict[str, dict] = {}
+        removed = 0
+
+        for tab in tabs:
+            url = tab["url"] = self.intern(tab.get("url") or "")
+            if tab.get("title"):
+                tab["title"] = self.intern(tab["title"])
+            key = self.normalize(url)
+            location = {"browser": browser, "window": tab.get("window", 0)}
+
+            record = self.shared.get(key)
+            if record is None:
+                record = self.shared[key] = {"url": url, "seen_in": []}
+                self._owners[key] = browser
+            record["seen_in"].append(location)
+
+            if mode == "keep":
+                kept.append(tab)
+                continue
+
+            first = kept_by_key.get(key)
+            if first is None and (
+                self.options.scope == "browser" or self._owners[key] == browser
+            ):
+                kept_by_key[key] = tab
+                kept.append(tab)
+                continue
+
+            removed += 1
+            if mode == "merge" and first is not None:
+                first.setdefault(
+                    "seen_in", [{"browser": browser, "window": first.get("window", 0)}]
+                )
+                first["seen_in"].append(location)
+
+        return kept, removed
+
+    def shared_urls(self) -> list[dict]:
+        """
+        Returns the URLs that are open in more than one place.
+
+        Returns:
+            list[dict]: {"url", "seen_in"} records, in the order the URLs were first seen.
+        """
+
+        return [record for record in self.shared.values() if len(record["seen_in"]) > 1]
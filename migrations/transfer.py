@@ -0,0 +1,733 @@
+import socket
+import ssl
+from dataclasses import dataclass, field
+from hashlib import sha256
+from hmac import compare_digest
+from json import dumps, loads
+from os import replace, utime
+from pathlib import Path, PurePosixPath
+from queue import Empty, SimpleQueue
+from shutil import rmtree
+from struct import Struct
+from threading import Event, Lock, Thread, current_thread
+from typing import Optional
+
+from lz4.frame import compress, decompress  # type: ignore
+
+from migrations.exporter import get_browser_data
+from migrations.extension_prune import ExtensionPruner
+from migrations.importer import launch_browser_tabs
+from migrations.tab_dedup import DedupOptions, TabDeduplicator
+from session_parsers.tab_filter import TabFilter
+from ui.console import print_error, print_success, print_warning
+from utils.browser_registry import REGISTRY, detect_browsers
+from utils.check_browser_status import is_browser_running, kill_browser_process
+from utils.get_browser_profile_paths import (
+    component_files,
+    get_browser_profile_path,
+    ignore_files,
+    iter_tree,
+)
+from utils.json_handler import create_default_json, save_to_json
+from utils.logger import logger
+from utils.metrics import metrics
+
+DEFAULT_PORT = 50505
+DEFAULT_CONNECTIONS = 4
+PROTOCOL_VERSION = 2
+
+# Files are sent in chunks of CHUNK_SIZE bytes, each LZ4-compressed unless that does not
+# make it smaller (images, already compressed databases).
+CHUNK_SIZE = 1024 * 1024
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+# Until a connection is authenticated (AUTH with the token, or JOIN of a known session), its
+# frames are at most FIRST_FRAME_SIZE bytes and it is dropped after AUTH_TIMEOUT seconds
+# without one.
+FIRST_FRAME_SIZE = 4096
+AUTH_TIMEOUT = 30
+
+# Written into every target profile while a transfer into it is in progress. A transfer with
+# the same session id resumes from the files already there; any other one starts over.
+SESSION_MARKER = ".browser_data_transfer"
+PART_SUFFIX = ".part"
+
+# Every message is a frame: type (1 byte), payload length (4 bytes, big endian), payload.
+FRAME_HEADER = Struct("!BI")
+# Payload of FILE and END frames: file index in the manifest and an offset or a size.
+FILE_POSITION = Struct("!IQ")
+
+AUTH = 12  # sender -> receiver, opens the control connection: JSON version and token
+MANIFEST = 1  # sender -> receiver, control connection: LZ4-compressed JSON manifest
+OFFSETS = 2  # receiver -> sender: JSON list of [file index, bytes already received]
+JOIN = 3  # sender -> receiver, opens a data connection: session id
+FILE = 4  # a file starts (or resumes) at an offset
+DATA = 5  # raw chunk of the current file
+DATA_LZ4 = 6  # LZ4-compressed chunk of the current file
+END = 7  # the current file is complete
+DONE = 8  # no more files (data connection) or transfer complete (control connection)
+ACK = 9  # receiver -> sender: everything before DONE is on disk
+SUMMARY = 10  # receiver -> sender: JSON summary of the transfer
+ERROR = 11  # either direction: UTF-8 error message
+
+
+def send_frame(sock: socket.socket, kind: int, payload: bytes = b"") -> None:
+    sock.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Connection closed by the peer")
+        received += count
+    return bytes(buffer)
+
+
+def recv_frame(
+    sock: socket.socket, *expected: int, max_size: int = MAX_FRAME_SIZE
+) -> tuple[int, bytes]:
+    """
+    Reads one frame.
+
+    Args:
+        sock (socket.socket): The connection.
+        *expected (int): Allowed frame types. Default is any type.
+        max_size (int): Largest payload accepted. Default is MAX_FRAME_SIZE.
+
+    Raises:
+        ConnectionError: If the connection is closed, the peer reports an error or the frame
+                         is not one of the expected types.
+
+    Returns:
+        tuple[int, bytes]: The frame type and payload.
+    """
+
+    kind, length = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    if length > max_size:
+        raise ConnectionError(f"Frame of {length} bytes is too large")
+    payload = _recv_exact(sock, length) if length else b""
+    if kind == ERROR:
+        raise ConnectionError(f"Peer error: {payload.decode(errors='replace')}")
+    if expected and kind not in expected:
+        raise ConnectionError(f"Unexpected frame type {kind}")
+    return kind, payload
+
+
+def _safe_path(root: Path, relative: str) -> Path:
+    # paths come from the network: no absolute paths, no way out of the profile. Backslashes
+    # and colons are separators and drive letters on Windows, where joinpath would honor them.
+    parts = PurePosixPath(relative).parts
+    if (
+        not parts
+        or relative.startswith("/")
+        or "\\" in relative
+        or ":" in relative
+        or any(p in ("..", "") for p in parts)
+    ):
+        raise ValueError(f"Unsafe path in manifest: {relative!r}")
+    return root.joinpath(*parts)
+
+
+def client_tls_context(ca_file: Optional[Path]) -> Optional[ssl.SSLContext]:
+    """
+    Creates the TLS context of a sender.
+
+    Args:
+        ca_file (Optional[Path]): Certificate (or CA) the receiver's certificate is checked
+                                  against. Default is None (plaintext).
+
+    Returns:
+        Optional[ssl.SSLContext]: The context, or None for a plaintext transfer.
+    """
+
+    return ssl.create_default_context(cafile=str(ca_file)) if ca_file else None
+
+
+def server_tls_context(
+    cert_file: Optional[Path], key_file: Optional[Path]
+) -> Optional[ssl.SSLContext]:
+    """
+    Creates the TLS context of a receiver.
+
+    Args:
+        cert_file (Optional[Path]): The receiver's certificate chain. Default is None (plaintext).
+        key_file (Optional[Path]): Its private key. Default is None (in cert_file).
+
+    Returns:
+        Optional[ssl.SSLContext]: The context, or None for a plaintext transfer.
+    """
+
+    if not cert_file:
+        return None
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+def _connect(host: str, port: int, context: Optional[ssl.SSLContext]) -> socket.socket:
+    sock = socket.create_connection((host, port))
+    if context is None:
+        return sock
+    try:
+        return context.wrap_socket(sock, server_hostname=host)
+    except BaseException:
+        sock.close()
+        raise
+
+
+def _check_manifest(manifest: dict) -> None:
+    # Only browsers of the registry are restored and launched, with the registry's
+    # executables: the executables in the session data come from the network.
+    browsers = {file[0] for file in manifest["files"]} | set(
+        manifest["data"]["browsers"]
+    )
+    unknown = browsers - set(REGISTRY)
+    if unknown:
+        raise ConnectionError(f"Unknown browsers in manifest: {sorted(unknown)}")
+    for browser_data in manifest["data"]["browsers"].values():
+        browser_data.pop("executable", None)
+
+
+def build_manifest(
+    user_profile_path: Path,
+    browsers: Optional[list[str]] = None,
+    components: Optional[dict[str, list[str]]] = None,
+    tab_filter: Optional[TabFilter] = None,
+    dedup: Optional[DedupOptions] = None,
+) -> tuple[dict, dict[str, Path]]:
+    """
+    Collects what a send transfers: the session data of every browser, as an export would
+    write it to browser_data.json, and the profile files an export would copy.
+
+    Running browsers are closed first, as for an export, and unused extension folders are
+    left out the same way (see migrations.extension_prune).
+
+    Args:
+        user_profile_path (Path): Home directory of the user to send.
+        browsers (Optional[list[str]]): Browsers to send. Default is None (the installed ones).
+        components (Optional[dict[str, list[str]]]): Components per browser. Default is None (all).
+        tab_filter (Optional[TabFilter]): Which tabs to keep. Default is None.
+        dedup (Optional[DedupOptions]): How duplicate tabs are handled. Default is None.
+
+    Returns:
+        tuple[dict, dict[str, Path]]: The manifest and the profile path of each browser.
+    """
+
+    if browsers is None:
+        browsers = list(detect_browsers(user_profile_path))
+        logger.info(f"Detected browsers: {browsers}")
+    json = create_default_json(browsers)
+    compiled_filter = tab_filter.compile() if tab_filter else None
+    deduplicator = TabDeduplicator(dedup) if dedup else None
+
+    files: list[list] = []
+    roots: dict[str, Path] = {}
+    for browser, browser_data in json["browsers"].items():
+        with metrics.phase("process_scan", browser):
+            running = is_browser_running(browser)
+        if running:
+            logger.info(f"{browser} is running, killing the process.")
+            print_warning(f"{browser} запущен, процесс будет завершен.")
+            with metrics.phase("kill", browser):
+                kill_browser_process(browser)
+        selected = (components or {}).get(browser)
+        get_browser_data(
+            user_profile_path,
+            json,
+            browser,
+            compiled_filter,
+            deduplicator,
+            selected,
+            copy_profile=False,
+        )
+
+        profile_path = browser_data.get("profile_path")
+        if not profile_path or not Path(profile_path).exists():
+            continue
+        roots[browser] = Path(profile_path)
+        allowed = None
+        if selected is not None:
+            allowed = component_files(browser, [c for c in selected if c != "tabs"])
+            if not allowed:
+                continue
+        pruner = ExtensionPruner(browser)
+        with metrics.phase("discovery", browser):
+            for relative, stat in iter_tree(
+                Path(profile_path),
+                lambda src, entries: ignore_files(Path(src), entries, browser, allowed)
+                + pruner.ignore(src, entries),
+            ):
+                files.append([browser, relative, stat.st_size, stat.st_mtime_ns])
+        metrics.count(
+            browser,
+            extensions_pruned_files=pruner.pruned_files,
+            extensions_pruned_bytes=pruner.pruned_bytes,
+        )
+        browser_files = [f for f in files if f[0] == browser]
+        metrics.plan(
+            browser, files=len(browser_files), bytes=sum(f[2] for f in browser_files)
+        )
+
+    if deduplicator is not None:
+        json["shared_urls"] = deduplicator.shared_urls()
+    session = sha256(dumps(files).encode()).hexdigest()[:16]
+    manifest = {
+        "version": PROTOCOL_VERSION,
+        "session": session,
+        "data": json,
+        "files": files,
+    }
+    return manifest, roots
+
+
+def _send_worker(
+    host: str,
+    port: int,
+    session: str,
+    manifest_files: list[list],
+    roots: dict[str, Path],
+    queue: SimpleQueue,
+    counters_lock: Lock,
+    context: Optional[ssl.SSLContext] = None,
+) -> None:
+    with _connect(host, port, context) as sock:
+        send_frame(sock, JOIN, session.encode())
+        while True:
+            try:
+                index, offset = queue.get_nowait()
+            except Empty:
+                break
+            browser, relative, _, _ = manifest_files[index]
+            sent = wire = 0
+            with open(roots[browser] / relative, "rb") as f:
+                f.seek(offset)
+                send_frame(sock, FILE, FILE_POSITION.pack(index, offset))
+                while chunk := f.read(CHUNK_SIZE):
+                    packed = compress(chunk)
+                    if len(packed) < len(chunk):
+                        send_frame(sock, DATA_LZ4, packed)
+                        wire += len(packed)
+                    else:
+                        send_frame(sock, DATA, chunk)
+                        wire += len(chunk)
+                    sent += len(chunk)
+            send_frame(sock, END, FILE_POSITION.pack(index, offset + sent))
+            with counters_lock:
+                metrics.count(browser, files=1, bytes=sent, wire_bytes=wire)
+        send_frame(sock, DONE)
+        recv_frame(sock, ACK)
+
+
+def send_browser_data(
+    host: str,
+    port: int = DEFAULT_PORT,
+    user_profile_path: Path = Path.home(),
+    connections: int = DEFAULT_CONNECTIONS,
+    browsers: Optional[list[str]] = None,
+    components: Optional[dict[str, list[str]]] = None,
+    tab_filter: Optional[TabFilter] = None,
+    dedup: Optional[DedupOptions] = None,
+    token: str = "",
+    profile: bool = False,
+    tls_ca: Optional[Path] = None,
+) -> dict:
+    """
+    Sends the session data and profiles of a user straight to a receiving machine.
+
+    Nothing is written to disk on this side: the profile files the export would copy are
+    read once and streamed, LZ4-compressed chunk by chunk, over `connections` parallel TCP
+    connections that take files from a shared queue. A control connection carries the
+    manifest (the would-be browser_data.json and the file list) first; the receiver answers
+    with the files it still needs and from which offset, so an interrupted transfer is
+    resumed by running the same send again.
+    Without tls_ca the stream, token included, is plaintext: profiles hold cookies and saved
+    passwords, so only send over a network you trust, or through an SSH tunnel.
+    Per-phase timings and counters are written to send_metrics.json.
+
+    Raises:
+        Exception: Throwing the exception above.
+
+    Args:
+        host (str): The receiving machine.
+        port (int): Its port. Default is DEFAULT_PORT.
+        user_profile_path (Path): Home directory of the user to send. Default is the current user's.
+        connections (int): Parallel data connections. Default is DEFAULT_CONNECTIONS.
+        browsers (Optional[list[str]]): Browsers to send. Default is None (the installed ones).
+        components (Optional[dict[str, list[str]]]): Components per browser. Default is None (all).
+        tab_filter (Optional[TabFilter]): Which tabs to keep. Default is None.
+        dedup (Optional[DedupOptions]): How duplicate tabs are handled. Default is None.
+        token (str): Shared secret the receiver expects. Default is "".
+        profile (bool): Whether to run under cProfile and save send.prof. Default is False.
+        tls_ca (Optional[Path]): Certificate the receiver's TLS certificate is checked
+            against; the transfer uses TLS when set. Default is None (plaintext).
+
+    Returns:
+        dict: The receiver's summary: files and bytes written per browser.
+    """
+
+    logger.info(f"Starting transfer to {host}:{port}...")
+    context = client_tls_context(tls_ca)
+    if context is None:
+        logger.warning("Transfer is not encrypted (no TLS certificate given)")
+        print_warning("Передача не шифруется: данные профилей идут открытым текстом.")
+
+    try:
+        with metrics.run("send", ".", profile):
+            manifest, roots = build_manifest(
+                user_profile_path, browsers, components, tab_filter, dedup
+            )
+            files = manifest["files"]
+            with _connect(host, port, context) as control:
+                send_frame(
+                    control,
+                    AUTH,
+                    dumps({"version": PROTOCOL_VERSION, "token": token}).encode(),
+                )
+                send_frame(control, MANIFEST, compress(dumps(manifest).encode()))
+                _, payload = recv_frame(control, OFFSETS)
+                pending = loads(payload)
+
+                queue: SimpleQueue = SimpleQueue()
+                # largest files first, so one big database does not finish last
+                for index, offset in sorted(pending, key=lambda p: -files[p[0]][2]):
+                    queue.put((index, offset))
+                logger.info(
+                    f"Sending {len(pending)} of {len(files)} files over {connections} connections"
+                )
+
+                errors: list[BaseException] = []
+                counters_lock = Lock()
+
+                def worker() -> None:
+                    try:
+                        _send_worker(
+                            host,
+                            port,
+                            manifest["session"],
+                            files,
+                            roots,
+                            queue,
+                            counters_lock,
+                            context,
+                        )
+                    except BaseException as e:
+                        errors.append(e)
+
+                with metrics.phase("transfer"):
+                    threads = [
+                        Thread(target=worker, name=f"send-{n}")
+                        for n in range(max(1, min(connections, len(pending))))
+                    ]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                if errors:
+                    send_frame(control, ERROR, str(errors[0]).encode())
+                    raise errors[0]
+
+                send_frame(control, DONE)
+                _, payload = recv_frame(control, SUMMARY)
+                summary = loads(payload)
+
+        logger.info(f"Transfer to {host}:{port} complete: {summary}")
+        print_success(f"Данные браузеров переданы на {host}:{port}")
+        return summary
+    except Exception as e:
+        logger.error(f"Error sending data to {host}:{port}: {e}")
+        raise
+
+
+@dataclass
+class _ReceiveSession:
+    manifest: dict
+    targets: dict[str, Path]
+    received: dict[str, dict[str, int]] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+
+def _prepare_targets(manifest: dict, user_profile_path: Path) -> dict[str, Path]:
+    # The old profile is removed before the new one is written, unless this is the
+    # resumption of a transfer into it (a transfer resumes in place, it has no staging copy
+    # as restore_profile_files does).
+    targets = {}
+    for browser in {file[0] for file in manifest["files"]}:
+        target = get_browser_profile_path(user_profile_path, browser)
+        with metrics.phase("process_scan", browser):
+            running = is_browser_running(browser)
+        if running:
+            logger.info(f"{browser} is running, killing the process.")
+            print_warning(f"{browser} запущен, процесс будет завершен.")
+            with metrics.phase("kill", browser):
+                kill_browser_process(browser)
+
+        marker = target / SESSION_MARKER
+        if marker.is_file() and marker.read_text() == manifest["session"]:
+            logger.info(f"Resuming transfer into {target}")
+        else:
+            if target.exists():
+                rmtree(target)
+            target.mkdir(parents=True)
+            marker.write_text(manifest["session"])
+        targets[browser] = target
+    return targets
+
+
+def _pending_files(manifest: dict, targets: dict[str, Path]) -> list[list[int]]:
+    pending = []
+    for index, (browser, relative, size, _) in enumerate(manifest["files"]):
+        path = _safe_path(targets[browser], relative)
+        part = path.with_name(path.name + PART_SUFFIX)
+        if path.is_file() and path.stat().st_size == size:
+            continue
+        offset = part.stat().st_size if part.is_file() else 0
+        pending.append([index, offset if offset <= size else 0])
+    return pending
+
+
+def _receive_files(sock: socket.socket, session: _ReceiveSession) -> None:
+    files = session.manifest["files"]
+    current = None
+    try:
+        while True:
+            kind, payload = recv_frame(sock)
+            if kind == FILE:
+                index, offset = FILE_POSITION.unpack(payload)
+                browser, relative, _, mtime_ns = files[index]
+                path = _safe_path(session.targets[browser], relative)
+                part = path.with_name(path.name + PART_SUFFIX)
+                part.parent.mkdir(parents=True, exist_ok=True)
+                current = open(part, "r+b" if part.exists() else "wb")
+                current.truncate(offset)
+                current.seek(offset)
+                written = 0
+            elif kind in (DATA, DATA_LZ4) and current is not None:
+                data = decompress(payload) if kind == DATA_LZ4 else payload
+                current.write(data)
+                written += len(data)
+            elif kind == END and current is not None:
+                end_index, size = FILE_POSITION.unpack(payload)
+                current.close()
+                current = None
+                if end_index != index or offset + written != size:
+                    raise ConnectionError(f"Incomplete file {relative}")
+                replace(part, path)
+                utime(path, ns=(mtime_ns, mtime_ns))
+                with session.lock:
+                    metrics.count(browser, files=1, bytes=written)
+                    totals = session.received.setdefault(
+                        browser, {"files": 0, "bytes": 0}
+                    )
+                    totals["files"] += 1
+                    totals["bytes"] += written
+            elif kind == DONE:
+                send_frame(sock, ACK)
+                return
+            else:
+                raise ConnectionError(f"Unexpected frame type {kind}")
+    finally:
+        # whatever arrived of an interrupted file stays in its .part file for a resume
+        if current is not None:
+            current.close()
+
+
+def receive_browser_data(
+    port: int = DEFAULT_PORT,
+    user_profile_path: Path = Path.home(),
+    bind: str = "",
+    session_file: str = "browser_data.json",
+    token: str = "",
+    launch: bool = True,
+    profile: bool = False,
+    ready: Optional[Event] = None,
+    tls_cert: Optional[Path] = None,
+    tls_key: Optional[Path] = None,
+) -> dict:
+    """
+    Receives a transfer from send_browser_data and restores it.
+
+    Profile files are written straight into the profile directories of the user on this
+    machine, where restore_profile_files would place them: the old profile is removed first
+    (unless an interrupted transfer into it is being resumed), every file is written to a
+    ".part" file next to its final path and renamed when complete, and its modification
+    time is kept. The session data is saved to `session_file` with the new profile paths,
+    and the tabs are opened as after an import, with the executables of the browser registry
+    (the executables in the received data are dropped).
+    A token is required: whoever presents it may replace the profiles of the user. It is
+    checked in the first frame of the sender, before the manifest is read; connections that
+    fail or stay silent before that are dropped and the receive goes on. Without a TLS
+    certificate the stream, token included, is plaintext.
+    Per-phase timings and counters are written to receive_metrics.json next to the session file.
+
+    Raises:
+        ValueError: If no token is given.
+        Exception: Throwing the exception above.
+
+    Args:
+        port (int): Port to listen on. Default is DEFAULT_PORT.
+        user_profile_path (Path): Home directory of the user to restore into. Default is the current user's.
+        bind (str): Address to listen on. Default is "" (all interfaces).
+        session_file (str): Where to save the received session data. Default is "browser_data.json".
+        token (str): Shared secret the sender must present. Must not be empty.
+        launch (bool): Whether to open the received tabs. Default is True.
+        profile (bool): Whether to run under cProfile and save receive.prof. Default is False.
+        ready (Optional[Event]): Set once the port is listening. Default is None.
+        tls_cert (Optional[Path]): Certificate chain to serve TLS with. Default is None (plaintext).
+        tls_key (Optional[Path]): Its private key. Default is None (in tls_cert).
+
+    Returns:
+        dict: Files and bytes written per browser.
+    """
+
+    if not token:
+        raise ValueError("A token is required to receive a transfer")
+    context = server_tls_context(tls_cert, tls_key)
+    if context is None:
+        logger.warning("Transfer is not encrypted (no TLS certificate given)")
+        print_warning("Передача не шифруется: данные профилей идут открытым текстом.")
+    logger.info(f"Waiting for a transfer on port {port}...")
+
+    try:
+        with (
+            metrics.run("receive", Path(session_file).parent, profile),
+            socket.create_server((bind, port)) as server,
+        ):
+            server.settimeout(0.5)
+            if ready is not None:
+                ready.set()
+
+            finished = Event()
+            session: Optional[_ReceiveSession] = None
+            errors: list[BaseException] = []
+            threads: list[Thread] = []
+
+            def authenticate(payload: bytes) -> None:
+                # the token is checked before anything else of the sender is read
+                try:
+                    auth = loads(payload)
+                except ValueError:
+                    raise ConnectionError("Malformed AUTH frame")
+                if not isinstance(auth, dict):
+                    raise ConnectionError("Malformed AUTH frame")
+                if auth.get("version") != PROTOCOL_VERSION:
+                    raise ConnectionError(f"Unsupported version {auth.get('version')}")
+                if not compare_digest(
+                    str(auth.get("token", "")).encode(), token.encode()
+                ):
+                    raise ConnectionError("Invalid token")
+
+            def control(sock: socket.socket) -> None:
+                nonlocal session
+                _, payload = recv_frame(sock, MANIFEST)
+                manifest = loads(decompress(payload))
+                _check_manifest(manifest)
+                targets = _prepare_targets(manifest, user_profile_path)
+                for browser, target in targets.items():
+                    browser_files = [f for f in manifest["files"] if f[0] == browser]
+                    metrics.plan(
+                        browser,
+                        files=len(browser_files),
+                        bytes=sum(f[2] for f in browser_files),
+                    )
+                session = _ReceiveSession(manifest, targets)
+                send_frame(
+                    sock, OFFSETS, dumps(_pending_files(manifest, targets)).encode()
+                )
+
+                recv_frame(sock, DONE)
+                data = manifest["data"]
+                for target in targets.values():
+                    (target / SESSION_MARKER).unlink(missing_ok=True)
+                # the session file describes this machine: the profiles are in place and
+                # there is no export directory
+                for browser, browser_data in data["browsers"].items():
+                    target = targets.get(browser) or get_browser_profile_path(
+                        user_profile_path, browser
+                    )
+                    browser_data["profile_path"] = target.as_posix() if target else ""
+                    browser_data["export_path"] = ""
+                save_to_json(data, session_file)
+                send_frame(sock, SUMMARY, dumps(session.received).encode())
+
+            def handle(sock: socket.socket, address: str) -> None:
+                # A connection that fails before it is authenticated (a port scan, a wrong
+                # token, a stray client) is logged and dropped, the receive goes on. Only
+                # the failure of an authenticated connection ends the receive.
+                sock.settimeout(AUTH_TIMEOUT)
+                if context is not None:
+                    try:
+                        sock = context.wrap_socket(sock, server_side=True)
+                    except OSError as e:
+                        logger.warning(f"TLS handshake with {address} failed: {e}")
+                        sock.close()
+                        return
+                with sock:
+                    authenticated = False
+                    try:
+                        kind, payload = recv_frame(
+                            sock, AUTH, JOIN, max_size=FIRST_FRAME_SIZE
+                        )
+                        if kind == AUTH:
+                            authenticate(payload)
+                        elif (
+                            session is None
+                            or payload.decode(errors="replace")
+                            != session.manifest["session"]
+                        ):
+                            raise ConnectionError("Unknown transfer session")
+                        authenticated = True
+                        sock.settimeout(None)
+                        threads.append(current_thread())
+                        if kind == AUTH:
+                            control(sock)
+                            finished.set()
+                        else:
+                            _receive_files(sock, session)
+                    except BaseException as e:
+                        try:
+                            send_frame(sock, ERROR, str(e).encode())
+                        except OSError:
+                            pass
+                        if not authenticated:
+                            logger.warning(f"Dropped connection from {address}: {e}")
+                            return
+                        errors.append(e)
+                        finished.set()
+
+            with metrics.phase("transfer"):
+                while not finished.is_set():
+                    try:
+                        sock, address = server.accept()
+                    except socket.timeout:
+                        continue
+                    peer = f"{address[0]}:{address[1]}"
+                    logger.info(f"Connection from {peer}")
+                    Thread(target=handle, args=(sock, peer), daemon=True).start()
+                # connections that never authenticated time out on their own
+                for thread in list(threads):
+                    thread.join()
+            if errors:
+                raise errors[0]
+
+        received = session.received if session is not None else {}
+        for browser, totals in received.items():
+            print_success(
+                f"{browser}: получено {totals['files']} файлов, "
+                f"{totals['bytes'] / 1_000_000:.1f} МБ в {session.targets[browser]}"
+            )
+        if launch and session is not None:
+            for browser, browser_data in session.manifest["data"]["browsers"].items():
+                urls = [
+                    t.get("url") for t in browser_data.get("tabs", []) if t.get("url")
+                ]
+                if urls:
+                    launch_browser_tabs(browser, urls, {})
+        logger.info(f"Transfer received, session data saved to {session_file}")
+        return received
+    except Exception as e:
+        logger.error(f"Error receiving data: {e}")
+        print_error(f"Ошибка при приеме данных: {e}")
+        raise
@@ -1,15 +1,21 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
 from io import BytesIO
-from struct import unpack
+from itertools import repeat
+from operator import attrgetter
+from mmap import ACCESS_READ, mmap
+from struct import error as StructError, unpack, unpack_from
 from pathlib import Path
 from typing import Optional
 
+from session_parsers.parse_stats import ParseStats
+from session_parsers.tab_filter import CompiledTabFilter
 from structrues.chormium_structures import (
     ChromiumNavigationEntry,
     ChromiumTab,
     ChromiumWindow,
 )
 
-
 ## Chrome Session Format
 # Chrome stores session state by appending binary commands to a session file.
 # These commands are used to reconstruct the session upon browser restart.
@@ -28,6 +34,31 @@ from structrues.chormium_structures import (
 # Source:
 # https://source.chromium.org/chromium/chromium/src/+/main:components/sessions/core/session_service_commands.cc
 
+# Replayed commands and their payloads (IDs are int32 SessionID values):
+#    0  kCommandSetTabWindow                      window ID, tab ID
+#    2  kCommandSetTabIndexInWindow               tab ID, index in the tab strip
+#    5  kCommandTabNavigationPathPrunedFromBack   tab ID, first removed navigation index
+#    6  kCommandUpdateTabNavigation               pickled navigation entry (see below)
+#    7  kCommandSetSelectedNavigationIndex        tab ID, navigation index
+#    8  kCommandSetSelectedTabInIndex             window ID, index in the tab strip
+#    9  kCommandSetWindowType                     window ID, window type
+#   11  kCommandTabNavigationPathPrunedFromFront  tab ID, number of removed navigations
+#   12  kCommandSetPinnedState                    tab ID, bool
+#   16  kCommandTabClosed                         tab ID, int64 close time
+#   17  kCommandWindowClosed                      window ID, int64 close time
+#   20  kCommandSetActiveWindow                   window ID
+#   21  kCommandLastActiveTime                    tab ID, int64 time
+#   24  kCommandTabNavigationPathPruned           tab ID, first removed index, count
+# Everything else (window bounds and workspace, tab groups, app IDs, ...) is skipped.
+
+# SessionWindow::WindowType, devtools windows are never restored
+WINDOW_TYPE_DEVTOOLS = 3
+# Below this many navigation entries to decode, starting a process pool costs more than
+# it saves
+PARALLEL_DECODE_MIN_ENTRIES = 20_000
+# Worker processes send entries back as plain tuples, which pickle several times faster
+_entry_fields = attrgetter(*(f.name for f in fields(ChromiumNavigationEntry)))
+
 
 # (Payload) Pickle order (basic structure without command specifics, etc.):
 
@@ -157,27 +188,360 @@ def parse_navigation_entry(buf: BytesIO, tab: ChromiumTab) -> None:
     )
 
 
-def parse_snss_file(path: Path | str) -> ChromiumWindow:
+@dataclass(slots=True)
+class _SessionReplay:
+    """
+    Window and tab state rebuilt from SNSS commands, kept in flat maps keyed by ID.
+
+    Navigation payloads are not decoded while the commands are replayed: only the file
+    position of the latest update of every navigation index is kept. A tab or window exists
+    from its first command on and is dropped with all its state when it is closed; the
+    commands it had are then counted as dropped.
+    """
+
+    stats: ParseStats
+    # tab ID -> navigation index -> (offset, size) of the latest kCommandUpdateTabNavigation
+    navigations: dict[int, dict[int, tuple[int, int]]] = field(default_factory=dict)
+    selected_navigation: dict[int, int] = field(default_factory=dict)
+    tab_window: dict[int, int] = field(default_factory=dict)
+    tab_strip_index: dict[int, int] = field(default_factory=dict)
+    pinned: set[int] = field(default_factory=set)
+    last_active: dict[int, int] = field(default_factory=dict)
+    # commands replayed per tab and per window, in order of first appearance
+    tab_commands: dict[int, int] = field(default_factory=dict)
+    window_commands: dict[int, int] = field(default_factory=dict)
+    window_selected_tab: dict[int, int] = field(default_factory=dict)
+    window_type: dict[int, int] = field(default_factory=dict)
+    active_window: Optional[int] = None
+
+    def _touch_tab(self, tab_id: int) -> None:
+        self.tab_commands[tab_id] = self.tab_commands.get(tab_id, 0) + 1
+
+    def _touch_window(self, window_id: int) -> None:
+        self.window_commands[window_id] = self.window_commands.get(window_id, 0) + 1
+
+    def close_tab(self, tab_id: int) -> None:
+        commands = self.tab_commands.pop(tab_id, None)
+        if commands is None:
+            return
+        for state in (
+            self.navigations,
+            self.selected_navigation,
+            self.tab_window,
+            self.tab_strip_index,
+            self.last_active,
+        ):
+            state.pop(tab_id, None)
+        self.pinned.discard(tab_id)
+        self.stats.dead_tabs += 1
+        self.stats.commands_dropped += commands
+
+    def close_window(self, window_id: int) -> None:
+        for tab_id in [t for t, w in self.tab_window.items() if w == window_id]:
+            self.close_tab(tab_id)
+        commands = self.window_commands.pop(window_id, None)
+        self.window_selected_tab.pop(window_id, None)
+        self.window_type.pop(window_id, None)
+        if self.active_window == window_id:
+            self.active_window = None
+        if commands is not None:
+            self.stats.dead_windows += 1
+            self.stats.commands_dropped += commands
+
+    def _prune_navigations(self, tab_id: int, start: int, count: int) -> None:
+        # removes navigation indexes [start, start + count) and shifts the following ones
+        history = self.navigations.get(tab_id)
+        if history:
+            self.navigations[tab_id] = {
+                index if index < start else index - count: position
+                for index, position in history.items()
+                if not start <= index < start + count
+            }
+        selected = self.selected_navigation.get(tab_id)
+        if selected is not None and selected >= start:
+            self.selected_navigation[tab_id] = max(selected - count, start)
+
+    def apply(self, command_type: int, payload: bytes) -> bool:
+        """
+        Replays one command other than kCommandUpdateTabNavigation.
+
+        Args:
+            command_type (int): The command ID.
+            payload (bytes): The command payload.
+
+        Raises:
+            struct.error: If the payload is too short for the command.
+
+        Returns:
+            bool: False if the command is not replayed.
+        """
+
+        match command_type:
+            case 0:  # kCommandSetTabWindow
+                window_id, tab_id = unpack_from("<ii", payload)
+                self._touch_tab(tab_id)
+                self.tab_window[tab_id] = window_id
+                self.window_commands.setdefault(window_id, 0)
+            case 2:  # kCommandSetTabIndexInWindow
+                tab_id, index = unpack_from("<ii", payload)
+                self._touch_tab(tab_id)
+                self.tab_strip_index[tab_id] = index
+            case 5:  # kCommandTabNavigationPathPrunedFromBack
+                tab_id, index = unpack_from("<ii", payload)
+                self._touch_tab(tab_id)
+                self._prune_navigations(tab_id, index, 1 << 31)
+            case 7:  # kCommandSetSelectedNavigationIndex
+                tab_id, index = unpack_from("<ii", payload)
+                self._touch_tab(tab_id)
+                self.selected_navigation[tab_id] = index
+            case 8:  # kCommandSetSelectedTabInIndex
+                window_id, index = unpack_from("<ii", payload)
+                self._touch_window(window_id)
+                self.window_selected_tab[window_id] = index
+            case 9:  # kCommandSetWindowType
+                window_id, window_type = unpack_from("<ii", payload)
+                self._touch_window(window_id)
+                self.window_type[window_id] = window_type
+            case 11:  # kCommandTabNavigationPathPrunedFromFront
+                tab_id, count = unpack_from("<ii", payload)
+                self._touch_tab(tab_id)
+                self._prune_navigations(tab_id, 0, count)
+            case 12:  # kCommandSetPinnedState
+                tab_id, pinned = unpack_from("<i?", payload)
+                self._touch_tab(tab_id)
+                if pinned:
+                    self.pinned.add(tab_id)
+                else:
+                    self.pinned.discard(tab_id)
+            case 16:  # kCommandTabClosed
+                (tab_id,) = unpack_from("<i", payload)
+                if tab_id in self.tab_commands:
+                    self._touch_tab(tab_id)
+                    self.close_tab(tab_id)
+                else:
+                    self.stats.commands_dropped += 1
+            case 17:  # kCommandWindowClosed
+                (window_id,) = unpack_from("<i", payload)
+                self._touch_window(window_id)
+                self.close_window(window_id)
+            case 20:  # kCommandSetActiveWindow
+                (window_id,) = unpack_from("<i", payload)
+                self.active_window = window_id
+            case 21:  # kCommandLastActiveTime
+                tab_id, last_active = unpack_from("<i4xq", payload)
+                self._touch_tab(tab_id)
+                self.last_active[tab_id] = last_active
+            case 24:  # kCommandTabNavigationPathPruned
+                tab_id, index, count = unpack_from("<iii", payload)
+                self._touch_tab(tab_id)
+                self._prune_navigations(tab_id, index, count)
+            case _:
+                return False
+        return True
+
+    def live_windows(self) -> list[tuple[Optional[int], list[int]]]:
+        """
+        Returns the windows that would be restored with their live tabs.
+
+        Tabs without navigations, tabs of devtools windows and, once any tab has been
+        assigned to a window, tabs without a window are dropped, as are windows left without
+        tabs. Files without kCommandSetTabWindow get a single window with ID None.
+
+        Returns:
+            list[tuple[Optional[int], list[int]]]: Window IDs in order of appearance, each
+                                                   with its tab IDs in tab strip order.
+        """
+
+        grouped: dict[Optional[int], list[int]]
+        if self.tab_window:
+            grouped = {window_id: [] for window_id in self.window_commands}
+        else:
+            grouped = {None: []}
+        for tab_id in list(self.tab_commands):
+            window_id = self.tab_window.get(tab_id)
+            if (
+                not self.navigations.get(tab_id)
+                or window_id not in grouped
+                or self.window_type.get(window_id) == WINDOW_TYPE_DEVTOOLS
+            ):
+                self.close_tab(tab_id)
+                continue
+            grouped[window_id].append(tab_id)
+
+        windows = []
+        for window_id, tab_ids in grouped.items():
+            if not tab_ids:
+                if window_id is not None:
+                    self.close_window(window_id)
+                continue
+            tab_ids.sort(key=lambda tab_id: self.tab_strip_index.get(tab_id, -1))
+            windows.append((window_id, tab_ids))
+        return windows
+
+
+def _select_tab(
+    data: mmap,
+    tab_id: int,
+    replay: _SessionReplay,
+    current_only: bool,
+    tab_filter: Optional[CompiledTabFilter],
+    stats: ParseStats,
+) -> Optional[tuple[ChromiumTab, list[tuple[int, int]]]]:
+    """
+    Locates the navigation entries of a live tab that have to be decoded.
+
+    The entry that gets exported (the selected one) is located first. When a tab filter is
+    given, its raw URL bytes are checked before anything else is decoded, and a rejected tab
+    is dropped without decoding any of its entries.
+
+    Args:
+        data (mmap): The mapped SNSS file.
+        tab_id (int): The tab, which has at least one navigation.
+        replay (_SessionReplay): The replayed session.
+        current_only (bool): Whether to decode only the selected navigation entry.
+        tab_filter (Optional[CompiledTabFilter]): Filter deciding which tabs are kept.
+        stats (ParseStats): Statistics updated with the filtering results.
+
+    Returns:
+        Optional[tuple[ChromiumTab, list[tuple[int, int]]]]: The tab, still without entries,
+            and the (offset, size) of every payload to decode into it, in navigation index
+            order. None if the filter rejected the tab.
+    """
+
+    history = replay.navigations[tab_id]
+    indexes = sorted(history)
+    selected = replay.selected_navigation.get(tab_id, 0)
+    # like FindClosestNavigationWithIndex: the first navigation at or after the index
+    position = next(
+        (i for i, index in enumerate(indexes) if index >= selected), len(indexes) - 1
+    )
+
+    stats.tabs_seen += 1
+    if tab_filter is not None:
+        offset = history[indexes[position]][0] + 12  # pickle header, tab ID, index
+        raw_url = data[offset + 4 : offset + 4 + unpack_from("<I", data, offset)[0]]
+        if not tab_filter.accepts_tab(raw_url, None, stats):
+            return None
+    stats.tabs_kept += 1
+
+    if current_only:
+        indexes = [indexes[position]]
+        position = 0
+    tab = ChromiumTab(
+        entries=[],
+        index=position,
+        tab_id=tab_id,
+        pinned=tab_id in replay.pinned,
+        last_active_time=replay.last_active.get(tab_id),
+    )
+    return tab, [history[index] for index in indexes]
+
+
+def _decode_entries(
+    data: mmap, positions: list[tuple[int, int]]
+) -> list[ChromiumNavigationEntry]:
+    holder = ChromiumTab(entries=[])
+    for offset, size in positions:
+        buf = BytesIO(data[offset : offset + size])
+        buf.seek(8)  # pickle header size and tab ID were read during replay
+        parse_navigation_entry(buf, holder)
+    return holder.entries
+
+
+def _decode_entries_from_file(
+    path: str, file_size: int, positions: list[tuple[int, int]]
+) -> list[tuple]:
+    # runs in a worker process of _decode_parallel
+    with open(path, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+        if len(data) < file_size:
+            raise ValueError(f"{path} was rewritten while it was parsed")
+        return [_entry_fields(entry) for entry in _decode_entries(data, positions)]
+
+
+def _decode_parallel(
+    path: Path | str, file_size: int, positions: list[tuple[int, int]], workers: int
+) -> list[ChromiumNavigationEntry]:
+    """
+    Decodes navigation payloads in contiguous chunks on a process pool.
+
+    Every worker maps the file itself, so only the positions and the decoded entries (as
+    tuples) cross the process boundary. Several chunks per worker keep the pool busy when some chunks
+    hold longer titles than others.
+
+    Args:
+        path (Path | str): The SNSS file.
+        file_size (int): Its size when it was replayed.
+        positions (list[tuple[int, int]]): (offset, size) of every payload, in output order.
+        workers (int): Worker processes.
+
+    Raises:
+        ValueError: If a payload cannot be parsed, or the file shrank in the meantime.
+
+    Returns:
+        list[ChromiumNavigationEntry]: The entries, in the order of `positions`.
+    """
+
+    chunk_size = -(-len(positions) // (workers * 4))
+    chunks = [
+        positions[start : start + chunk_size]
+        for start in range(0, len(positions), chunk_size)
+    ]
+    with ProcessPoolExecutor(workers) as executor:
+        decoded = executor.map(
+            _decode_entries_from_file, repeat(str(path)), repeat(file_size), chunks
+        )
+        return [ChromiumNavigationEntry(*entry) for chunk in decoded for entry in chunk]
+
+
+def parse_snss_file(
+    path: Path | str,
+    current_only: bool = False,
+    tab_filter: Optional[CompiledTabFilter] = None,
+    stats: Optional[ParseStats] = None,
+    workers: int = 1,
+) -> list[ChromiumWindow]:
     """
     Parses a Chrome SNSS session file and extracts window/tab/navigation structure.
 
     This function reads and validates the SNSS file format (used in Chromium-based browsers
-    for session persistence, e.g. "Current Session" or "Last Session"). It processes
-    commands of type 6 (kCommandUpdateTabNavigation) to reconstruct tab histories. Additionally,
-    It also processes commands of type 7 (kCommandSetSelectedNavigationIndex) to group tabs into windows.
-
-    The function groups all tabs into a single Window object, as Chromium's SNSS format does not
-    explicitly separate windows (though tabs contain IDs that may allow grouping in the future).
+    for session persistence, e.g. "Current Session" or "Last Session") and replays its
+    window and tab lifecycle commands (see the list at the top of this module): tabs are
+    assigned to windows and ordered in the tab strip, closed tabs and windows are dropped,
+    pruned navigations are removed and the selected navigation, selected tab, pinned state
+    and window type are tracked. Only windows that would be restored are returned, with
+    their live tabs.
+
+    Navigation payloads (kCommandUpdateTabNavigation) are not decoded while the file is
+    read. Only the file position of the latest update per tab and navigation index is kept,
+    and once the whole file has been replayed the entries of the live tabs are decoded from
+    those positions, in navigation index order. In current-only mode only the selected entry
+    of each tab is decoded; the tab then holds just that entry, at index 0.
+
+    When a tab filter is given, the raw URL bytes of each tab's selected entry are matched
+    before any title or other field is decoded.
+
+    The parse runs in two phases. The first pass walks the command framing (int16 size and
+    type byte) and replays the small lifecycle commands; of the navigation commands it only
+    reads the tab ID and navigation index, building an index of payload offsets. The second
+    phase decodes the payloads still needed after the replay. With several `workers` and at
+    least PARALLEL_DECODE_MIN_ENTRIES of them, they are decoded in chunks on a process pool
+    whose workers map the file themselves; the result is the same as with one worker.
+
+    A truncated last command (a browser killed while writing) ends the replay.
 
     Args:
         path (Path | str): Path to the SNSS file to parse.
+        current_only (bool): Whether to decode only the selected navigation entry of each tab. Default is False.
+        tab_filter (Optional[CompiledTabFilter]): Filter deciding which tabs are kept. Default is None.
+        stats (Optional[ParseStats]): Statistics to update with tab, filter and command counts. Default is None.
+        workers (int): Processes decoding navigation payloads. Default is 1 (no process pool).
 
     Raises:
         ValueError: If the file does not start with the expected "SNSS" signature.
         ValueError: If the SNSS version is not supported (currently only version 3 is supported).
 
     Returns:
-        ChromiumWindow: A specific ChromiumWindow object containing the parsed Tab objects with their navigation entries.
+        list[ChromiumWindow]: The restored windows with their ChromiumTab objects and navigation entries.
     """
 
     with open(path, "rb") as f:
@@ -186,34 +550,86 @@ def parse_snss_file(path: Path | str) -> ChromiumWindow:
         version = read_uint32(f)
         if version != 3:
             raise ValueError(f"Unsupported SNSS version: {version}")
-
-        tabs: dict[int, ChromiumTab] = {}
-
-        while True:
-            size_bytes = f.read(2)
-            if len(size_bytes) < 2:
-                break
-            size = unpack("<H", size_bytes)[0]
-            if size == 0:
+        data = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+    with data:
+        stats = stats if stats is not None else ParseStats()
+        replay = _SessionReplay(stats)
+        # the hot path (navigations) updates the replay maps directly
+        navigations = replay.navigations
+        tab_commands = replay.tab_commands
+        commands = skipped = 0
+        pos, end = 8, len(data)
+
+        while pos + 2 <= end:
+            size = unpack_from("<H", data, pos)[0]
+            if size == 0 or pos + 2 + size > end:
                 break
-            command_type = read_uint8(f)
-            payload = f.read(size - 1)
-            buf = BytesIO(payload)
-
-            match command_type:
-                case 6:  # kCommandUpdateTabNavigation
-                    _ = read_uint32(buf)  # pickle header size
-                    tab_id = read_uint32(buf)
-                    if tab_id not in tabs:
-                        tabs[tab_id] = ChromiumTab(entries=[], tab_id=tab_id)
-                    parse_navigation_entry(buf, tabs[tab_id])
-
-                case 7:  # kCommandSetSelectedNavigationIndex
-                    tab_id = read_uint32(buf)
-                    selected_index = read_uint32(buf)
-                    if tab_id not in tabs:
-                        tabs[tab_id] = ChromiumTab(entries=[], tab_id=tab_id)
-                    tabs[tab_id].index = selected_index
-
-    window = ChromiumWindow(tabs=list(tabs.values()))
-    return window
+            command_type = data[pos + 2]
+            start = pos + 3
+            pos += 2 + size
+            commands += 1
+
+            if command_type == 6:  # kCommandUpdateTabNavigation
+                if size - 1 < 12:
+                    skipped += 1
+                    continue
+                # pickle header size, tab ID and navigation index
+                _, tab_id, nav_index = unpack_from("<Iii", data, start)
+                tab_commands[tab_id] = tab_commands.get(tab_id, 0) + 1
+                history = navigations.get(tab_id)
+                if history is None:
+                    history = navigations[tab_id] = {}
+                history[nav_index] = (start, size - 1)
+                continue
+
+            try:
+                if not replay.apply(command_type, data[start:pos]):
+                    skipped += 1
+            except StructError:
+                skipped += 1
+
+        stats.commands_read += commands
+        stats.commands_skipped += skipped
+        stats.truncated_bytes += end - pos
+
+        windows = []
+        pending: list[tuple[ChromiumTab, list[tuple[int, int]]]] = []
+        for window_id, tab_ids in replay.live_windows():
+            selected = replay.window_selected_tab.get(window_id, 0)
+            selected_tab = tab_ids[min(max(selected, 0), len(tab_ids) - 1)]
+            tabs = []
+            for tab_id in tab_ids:
+                located = _select_tab(
+                    data, tab_id, replay, current_only, tab_filter, stats
+                )
+                if located is not None:
+                    tabs.append(located[0])
+                    pending.append(located)
+            windows.append(
+                ChromiumWindow(
+                    tabs=tabs,
+                    window_id=window_id,
+                    selected_tab_index=next(
+                        (i for i, tab in enumerate(tabs) if tab.tab_id == selected_tab),
+                        0,
+                    ),
+                    window_type=replay.window_type.get(window_id, 0),
+                    is_active=window_id is not None
+                    and window_id == replay.active_window,
+                )
+            )
+
+        positions = [
+            position for _, tab_positions in pending for position in tab_positions
+        ]
+        if workers > 1 and len(positions) >= PARALLEL_DECODE_MIN_ENTRIES:
+            entries = _decode_parallel(path, end, positions, workers)
+        else:
+            entries = _decode_entries(data, positions)
+        start = 0
+        for tab, tab_positions in pending:
+            tab.entries = entries[start : start + len(tab_positions)]
+            start += len(tab_positions)
+
+    return windows
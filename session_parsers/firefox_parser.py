@@ -1,16 +1,19 @@
 from json import loads
 from pathlib import Path
-from typing import Optional
+from re import compile, error
+from struct import unpack_from
+from typing import Any, Iterator, Optional
 
-from lz4.block import decompress  # type: ignore
+from lz4.block import LZ4BlockError, decompress  # type: ignore
 
+from session_parsers.parse_stats import ParseStats
+from session_parsers.tab_filter import CompiledTabFilter
 from structrues.firefox_structures import (
     FirefoxNavigationEntry,
     FirefoxTab,
     FirefoxWindow,
 )
 
-
 ## Firefox Session Format
 # Firefox uses a compressed JSON file (e.g., recovery.jsonlz4) to store session data.
 
@@ -48,7 +51,357 @@ from structrues.firefox_structures import (
 # https://searchfox.org/mozilla-central/source/browser/components/sessionstore
 
 
-def parse_jsonlz4_file(path: Path | str) -> list[FirefoxWindow]:
+# Selective decoding:
+# Besides "windows", the payload carries "_closedWindows", per-window "_closedTabs",
+# form data, session storage and cookies, which are often many times larger than the
+# open tabs. In selective mode the decompressed bytes are walked with a forward-only
+# cursor that reads only windows[].tabs[].{entries,index,pinned,hidden}, jumps over
+# every other subtree without decoding it and stops as soon as the "windows" array has
+# been consumed. The payload is never decoded as a whole: only the values read are.
+# Skipping runs at about the speed json.loads decodes (the regex engine is the limit), so
+# the mode saves memory (no str of the payload, no objects for the skipped parts), and time
+# only when a large part of the payload follows "windows".
+
+# Everything up to the next bracket outside a string, the bracket included: strings are
+# matched as a whole inside the regex engine, so Python only sees the brackets.
+_BRACKET_PATTERN = rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*[\[\]{}]'
+try:  # possessive quantifiers (Python 3.11+) keep no backtracking state: about 10% faster
+    _NEXT_BRACKET = compile(_BRACKET_PATTERN.replace(b"*", b"*+"))
+except error:
+    _NEXT_BRACKET = compile(_BRACKET_PATTERN)
+_SCALAR = compile(rb"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null")
+_WHITESPACE = b" \t\n\r"
+_OPENING = b"{["
+
+
+class _SessionScanner:
+    """
+    A forward-only cursor over a decompressed session payload.
+
+    The scanner understands just enough JSON to walk objects and arrays, decode the
+    members it is asked for with the json module and jump over everything else. Skipped
+    containers are bracket-matched by the regex engine and never decoded.
+
+    Attributes:
+        buf (bytes): The UTF-8 JSON payload.
+        pos (int): Offset of the next unread byte.
+    """
+
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf: bytes) -> None:
+        self.buf = buf
+        self.pos = 0
+
+    def peek(self) -> int:
+        buf = self.buf
+        pos = self.pos
+        try:
+            while buf[pos] in _WHITESPACE:
+                pos += 1
+            char = buf[pos]
+        except IndexError:
+            raise ValueError("Unexpected end of session data")
+        self.pos = pos
+        return char
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char[0]:
+            raise ValueError(f"Malformed session data at offset {self.pos}")
+        self.pos += 1
+
+    def string_end(self, pos: int) -> int:
+        """
+        Returns the offset of the closing quote of a string whose body continues at `pos`.
+        """
+
+        buf = self.buf
+        while True:
+            end = buf.find(b'"', pos)
+            if end < 0:
+                raise ValueError("Unterminated string in session data")
+            start = end
+            while buf[start - 1] == 92:  # count the backslashes before the quote
+                start -= 1
+            if (end - start) % 2 == 0:
+                return end
+            pos = end + 1
+
+    def container_end(self, pos: int) -> int:
+        """
+        Returns the offset just past the object or array that opens at `pos`.
+        """
+
+        buf = self.buf
+        match = _NEXT_BRACKET.match
+        depth = 0
+        while True:
+            found = match(buf, pos)
+            if found is None:
+                raise ValueError("Unexpected end of session data")
+            pos = found.end()
+            if buf[pos - 1] in _OPENING:
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return pos
+
+    def value_end(self) -> int:
+        char = self.peek()
+        if char == 34:  # '"'
+            return self.string_end(self.pos + 1) + 1
+        if char in _OPENING:
+            return self.container_end(self.pos)
+        found = _SCALAR.match(self.buf, self.pos)
+        if found is None:
+            raise ValueError(f"Malformed session data at offset {self.pos}")
+        return found.end()
+
+    def skip_value(self) -> None:
+        self.pos = self.value_end()
+
+    def read_value(self) -> Any:
+        end = self.value_end()
+        value = loads(self.buf[self.pos : end])
+        self.pos = end
+        return value
+
+    def iter_object(self) -> Iterator[bytes]:
+        """
+        Yields the raw keys of an object. The caller must consume every member value
+        (read or skip it) before resuming the iteration.
+        """
+
+        self.expect(b"{")
+        if self.peek() == 125:  # "}"
+            self.pos += 1
+            return
+        while True:
+            self.expect(b'"')
+            end = self.string_end(self.pos)
+            key = self.buf[self.pos : end]
+            self.pos = end + 1
+            self.expect(b":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == 125:
+                return
+            if char != 44:  # ","
+                raise ValueError(f"Malformed session data at offset {self.pos - 1}")
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Yields once per array element. The caller must consume the element before resuming.
+        """
+
+        self.expect(b"[")
+        if self.peek() == 93:  # "]"
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == 93:
+                return
+            if char != 44:
+                raise ValueError(f"Malformed session data at offset {self.pos - 1}")
+
+
+def _entry_from_dict(entry_data: dict) -> FirefoxNavigationEntry:
+    return FirefoxNavigationEntry(
+        url=entry_data.get("url", ""),
+        title=entry_data.get("title", ""),
+        last_accessed=entry_data.get("lastAccessed"),
+        referrer=entry_data.get("referrer"),
+    )
+
+
+def _build_tab(
+    entries_data: list[dict],
+    index: int,
+    pinned: bool,
+    hidden: bool,
+    last_accessed: Optional[int],
+    current_only: bool,
+    tab_filter: Optional[CompiledTabFilter],
+    stats: ParseStats,
+) -> Optional[FirefoxTab]:
+    index -= 1  # Firefox stores a 1-based index
+    stats.tabs_seen += 1
+    if tab_filter is not None:
+        current = entries_data[index] if 0 <= index < len(entries_data) else {}
+        raw_url = current.get("url", "").encode("utf-8")
+        if not tab_filter.accepts_tab(raw_url, last_accessed, stats):
+            return None
+    stats.tabs_kept += 1
+
+    if current_only:
+        entries_data = entries_data[index : index + 1] if index >= 0 else []
+        index = 0
+
+    return FirefoxTab(
+        entries=[_entry_from_dict(entry_data) for entry_data in entries_data],
+        index=index,
+        pinned=pinned,
+        is_hidden=hidden,
+    )
+
+
+def _scan_tab(
+    scanner: _SessionScanner,
+    current_only: bool,
+    tab_filter: Optional[CompiledTabFilter],
+    stats: ParseStats,
+) -> Optional[FirefoxTab]:
+    entries_data: list[dict] = []
+    index, pinned, hidden, last_accessed = 1, False, False, None
+    for key in scanner.iter_object():
+        if key == b"entries":
+            entries_data = scanner.read_value()
+        elif key == b"index":
+            index = scanner.read_value()
+        elif key == b"pinned":
+            pinned = scanner.read_value()
+        elif key == b"hidden":
+            hidden = scanner.read_value()
+        elif key == b"lastAccessed":
+            last_accessed = scanner.read_value()
+        else:
+            scanner.skip_value()
+
+    return _build_tab(
+        entries_data,
+        index,
+        pinned,
+        hidden,
+        last_accessed,
+        current_only,
+        tab_filter,
+        stats,
+    )
+
+
+def _scan_windows(
+    payload: bytes,
+    current_only: bool,
+    tab_filter: Optional[CompiledTabFilter],
+    stats: ParseStats,
+    tolerant: bool = False,
+) -> list[FirefoxWindow]:
+    scanner = _SessionScanner(payload)
+    windows: list[FirefoxWindow] = []
+    tabs: Optional[list[FirefoxTab]] = None  # of the window being scanned
+
+    try:
+        for key in scanner.iter_object():
+            if key != b"windows":
+                scanner.skip_value()
+                continue
+            for _ in scanner.iter_array():
+                tabs = []
+                for window_key in scanner.iter_object():
+                    if window_key == b"tabs":
+                        for _ in scanner.iter_array():
+                            tab = _scan_tab(scanner, current_only, tab_filter, stats)
+                            if tab is not None:
+                                tabs.append(tab)
+                    else:
+                        scanner.skip_value()
+                windows.append(FirefoxWindow(tabs=tabs))
+                tabs = None
+            break  # nothing after "windows" is needed
+    except ValueError:
+        if not tolerant:
+            raise
+        # the payload ends inside "windows": keep every tab that was complete
+        if tabs:
+            windows.append(FirefoxWindow(tabs=tabs))
+        if not stats.truncated_bytes:
+            stats.truncated_bytes = max(len(payload) - scanner.pos, 1)
+
+    return windows
+
+
+def _decompress_lz4_prefix(block: bytes) -> bytes:
+    """
+    Decodes the complete sequences of a truncated LZ4 block.
+
+    A plain Python decoder of the LZ4 block format, used only when lz4.block rejects the
+    block. It stops at the first sequence that the block does not contain in full.
+
+    Args:
+        block (bytes): The block, without the size prefix.
+
+    Returns:
+        bytes: The decompressed prefix.
+    """
+
+    out = bytearray()
+    pos, end = 0, len(block)
+    while pos < end:
+        token = block[pos]
+        pos += 1
+        literals = token >> 4
+        if literals == 15:
+            while pos < end:
+                pos += 1
+                literals += block[pos - 1]
+                if block[pos - 1] != 255:
+                    break
+        out += block[pos : pos + literals]
+        pos += literals
+        if pos + 2 > end:
+            break
+        offset = block[pos] | block[pos + 1] << 8
+        pos += 2
+        length = (token & 15) + 4
+        if token & 15 == 15:
+            while pos < end:
+                pos += 1
+                length += block[pos - 1]
+                if block[pos - 1] != 255:
+                    break
+        if offset == 0 or offset > len(out):
+            break  # corrupt
+        start = len(out) - offset
+        if length <= offset:
+            out += out[start : start + length]
+        else:  # an overlapping match repeats the last `offset` bytes
+            out += (out[start:] * (length // offset + 1))[:length]
+    return bytes(out)
+
+
+def _read_jsonlz4_payload(
+    path: Path | str, tolerant: bool = False, stats: Optional[ParseStats] = None
+) -> bytes:
+    with open(path, "rb") as f:
+        magic = f.read(8)
+        if magic != b"mozLz40\0":
+            raise ValueError("Not a valid Firefox session file.")
+        compressed = f.read()
+    try:
+        return decompress(compressed)
+    except LZ4BlockError:
+        if not tolerant or len(compressed) < 4:
+            raise
+    # a truncated file: decode what is there
+    payload = _decompress_lz4_prefix(compressed[4:])
+    if stats is not None:
+        stats.truncated_bytes += max(unpack_from("<I", compressed)[0] - len(payload), 1)
+    return payload
+
+
+def parse_jsonlz4_file(
+    path: Path | str,
+    selective: bool = False,
+    current_only: bool = False,
+    tab_filter: Optional[CompiledTabFilter] = None,
+    stats: Optional[ParseStats] = None,
+    tolerant: bool = False,
+) -> list[FirefoxWindow]:
     """
     Parses a Firefox session file (e.g., recovery.jsonlz4) and returns structured FirefoxWindow objects.
 
@@ -56,46 +409,70 @@ def parse_jsonlz4_file(path: Path | str) -> list[FirefoxWindow]:
     The JSON structure is expected to contain a list of windows, each with tabs and navigation entries.
     The entries include URL, title, referrer, and last accessed timestamp.
 
+    In selective mode the decompressed payload is scanned incrementally instead of being loaded
+    as a whole: only windows[].tabs[].{entries,index,pinned,hidden} are decoded, while closed
+    windows and tabs, form data, storage and cookies are skipped without being materialized.
+    This takes a fraction of the memory of a full load, in about the same time (less when a
+    large part of the payload follows "windows"). The returned objects are the same in both
+    modes.
+
+    In current-only mode only the selected navigation entry of each tab is turned into a
+    FirefoxNavigationEntry. Each tab then holds just that entry, at index 0.
+
+    When a tab filter is given, each tab's URL and last access time are matched before any
+    navigation entry or tab object is created for it.
+
+    In tolerant mode a truncated file is read as far as it goes: the complete LZ4 sequences
+    are decompressed and every tab that is complete in them is returned (by a selective
+    scan, also when selective mode is off). The missing size is added to stats.truncated_bytes.
+
     Args:
         path (Path | str): Path to the .jsonlz4 file to parse.
+        selective (bool): Whether to decode only the open tabs by scanning the payload. Default is False.
+        current_only (bool): Whether to keep only the selected navigation entry of each tab. Default is False.
+        tab_filter (Optional[CompiledTabFilter]): Filter deciding which tabs are kept. Default is None.
+        stats (Optional[ParseStats]): Statistics to update with tab and filter counts. Default is None.
+        tolerant (bool): Whether to return what a truncated file still holds. Default is False.
 
     Raises:
         ValueError: If the file does not start with the expected magic header.
+        ValueError: If the payload is malformed (unless tolerant).
+        LZ4BlockError: If the payload cannot be decompressed (unless tolerant).
 
     Returns:
         list[FirefoxWindow]: A list of FirefoxWindow objects representing the session.
     """
 
-    with open(path, "rb") as f:
-        magic = f.read(8)
-        if magic != b"mozLz40\0":
-            raise ValueError("Not a valid Firefox session file.")
-        compressed = f.read()
-        json_bytes = decompress(compressed)
-        data = loads(json_bytes)
+    stats = stats if stats is not None else ParseStats()
+    payload = _read_jsonlz4_payload(path, tolerant, stats)
+    if not selective:
+        try:
+            data = loads(payload)
+        except ValueError:
+            if not tolerant:
+                raise
+            selective = True  # truncated: scan as far as it goes
+    if selective:
+        return _scan_windows(payload, current_only, tab_filter, stats, tolerant)
+    del payload
 
     windows: list[FirefoxWindow] = []
 
     for window_data in data.get("windows", []):
         tabs: list[FirefoxTab] = []
         for tab_data in window_data.get("tabs", []):
-            entries: list[FirefoxNavigationEntry] = []
-            for entry_data in tab_data.get("entries", []):
-                entry = FirefoxNavigationEntry(
-                    url=entry_data.get("url", ""),
-                    title=entry_data.get("title", ""),
-                    last_accessed=entry_data.get("lastAccessed"),
-                    referrer=entry_data.get("referrer"),
-                )
-                entries.append(entry)
-
-            tab = FirefoxTab(
-                entries=entries,
-                index=tab_data.get("index", 1) - 1,
-                pinned=tab_data.get("pinned", False),
-                is_hidden=tab_data.get("hidden", False),
+            tab = _build_tab(
+                tab_data.get("entries", []),
+                tab_data.get("index", 1),
+                tab_data.get("pinned", False),
+                tab_data.get("hidden", False),
+                tab_data.get("lastAccessed"),
+                current_only,
+                tab_filter,
+                stats,
             )
-            tabs.append(tab)
+            if tab is not None:
+                tabs.append(tab)
 
         window = FirefoxWindow(tabs=tabs)
         windows.append(window)
@@ -0,0 +1,45 @@
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class ParseStats:
+    """
+    Counters collected while a session file is parsed.
+
+    Attributes:
+        tabs_seen (int): Tabs found in the session file.
+        tabs_kept (int): Tabs returned by the parser.
+        filtered_by_url (int): Tabs dropped by the scheme/host rules of the tab filter.
+        filtered_by_age (int): Tabs dropped because they were last accessed too long ago.
+        filtered_by_limit (int): Tabs dropped after the maximum number of tabs was reached.
+        dead_tabs (int): Closed, orphaned or empty tabs left out by the SNSS replay.
+        dead_windows (int): Closed or empty windows left out by the SNSS replay.
+        commands_read (int): SNSS commands read.
+        commands_dropped (int): SNSS commands of the dead tabs and windows.
+        commands_skipped (int): SNSS commands not replayed (unknown or malformed).
+        truncated_bytes (int): Bytes missing or unreadable at the end of a truncated file.
+        tabs_recovered (int): Tabs taken from older snapshots of a truncated session.
+    """
+
+    tabs_seen: int = 0
+    tabs_kept: int = 0
+    filtered_by_url: int = 0
+    filtered_by_age: int = 0
+    filtered_by_limit: int = 0
+    dead_tabs: int = 0
+    dead_windows: int = 0
+    commands_read: int = 0
+    commands_dropped: int = 0
+    commands_skipped: int = 0
+    truncated_bytes: int = 0
+    tabs_recovered: int = 0
+
+    def as_dict(self) -> dict:
+        """
+        Returns the counters as a JSON-serializable dictionary.
+
+        Returns:
+            dict: Counter names mapped to their values.
+        """
+
+        return asdict(self)
@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+from re import IGNORECASE, compile, escape
+from typing import Optional
+
+from session_parsers.parse_stats import ParseStats
+
+# scheme, then the host of hierarchical URLs (userinfo and port are skipped)
+URL_PATTERN = compile(rb"([A-Za-z][A-Za-z0-9+.\-]*):(?://(?:[^/?#@]*@)?([^/?#:]*))?")
+
+
+@dataclass
+class TabFilter:
+    """
+    Declarative description of which tabs should be kept during parsing.
+
+    Host rules match the host itself and all of its subdomains, so "corp.local"
+    also covers "wiki.corp.local". Empty allow lists allow everything.
+
+    Attributes:
+        allow_schemes (list[str]): If set, only URLs with these schemes are kept.
+        deny_schemes (list[str]): URLs with these schemes are dropped (e.g. "chrome", "about").
+        allow_hosts (list[str]): If set, only URLs on these hosts are kept.
+        deny_hosts (list[str]): URLs on these hosts are dropped.
+        min_last_accessed (Optional[int]): Firefox only. Tabs last accessed before this
+                                           timestamp (milliseconds since epoch) are dropped.
+        max_tabs (Optional[int]): Maximum number of tabs kept per session file.
+    """
+
+    allow_schemes: list[str] = field(default_factory=list)
+    deny_schemes: list[str] = field(default_factory=list)
+    allow_hosts: list[str] = field(default_factory=list)
+    deny_hosts: list[str] = field(default_factory=list)
+    min_last_accessed: Optional[int] = None
+    max_tabs: Optional[int] = None
+
+    def compile(self) -> "CompiledTabFilter":
+        """
+        Compiles the specification into a matcher that works on raw URL bytes.
+
+        Returns:
+            CompiledTabFilter: The compiled filter.
+        """
+
+        return CompiledTabFilter(self)
+
+
+def _host_pattern(hosts: list[str]):
+    if not hosts:
+        return None
+    alternatives = b"|".join(
+        escape(host.strip(".").lower().encode("idna")) for host in hosts
+    )
+    return compile(rb"(?:.*\.)?(?:" + alternatives + rb")\.?", IGNORECASE)
+
+
+class CompiledTabFilter:
+    """
+    A TabFilter prepared for use inside the session parsers.
+
+    URLs are checked as raw UTF-8 bytes, before titles and other fields of an entry are
+    decoded, so rejected tabs cost only a scheme/host match. The filter itself is stateless;
+    counts are kept in the ParseStats of each parse.
+
+    Attributes:
+        spec (TabFilter): The specification the filter was compiled from.
+    """
+
+    __slots__ = (
+        "spec",
+        "_allow_schemes",
+        "_deny_schemes",
+        "_allow_hosts",
+        "_deny_hosts",
+    )
+
+    def __init__(self, spec: TabFilter) -> None:
+        self.spec = spec
+        self._allow_schemes = frozenset(s.lower().encode() for s in spec.allow_schemes)
+        self._deny_schemes = frozenset(s.lower().encode() for s in spec.deny_schemes)
+        self._allow_hosts = _host_pattern(spec.allow_hosts)
+        self._deny_hosts = _host_pattern(spec.deny_hosts)
+
+    def accepts_url(self, raw_url: bytes) -> bool:
+        """
+        Checks a raw URL against the scheme and host rules.
+
+        Args:
+            raw_url (bytes): The URL as UTF-8 bytes.
+
+        Returns:
+            bool: True if the URL passes all scheme and host rules.
+        """
+
+        match = URL_PATTERN.match(raw_url)
+        scheme = match.group(1).lower() if match else b""
+        host = (match.group(2) or b"") if match else b""
+
+        if self._allow_schemes and scheme not in self._allow_schemes:
+            return False
+        if scheme in self._deny_schemes:
+            return False
+        if self._allow_hosts and not self._allow_hosts.fullmatch(host):
+            return False
+        if self._deny_hosts and self._deny_hosts.fullmatch(host):
+            return False
+        return True
+
+    def accepts_tab(
+        self, raw_url: bytes, last_accessed: Optional[int], stats: ParseStats
+    ) -> bool:
+        """
+        Decides whether a tab is kept and updates the parse statistics accordingly.
+
+        Args:
+            raw_url (bytes): The URL of the tab's current entry as UTF-8 bytes.
+            last_accessed (Optional[int]): When the tab was last accessed, if known.
+            stats (ParseStats): Statistics of the current parse.
+
+        Returns:
+            bool: True if the tab should be decoded and returned.
+        """
+
+        spec = self.spec
+        if (
+            spec.min_last_accessed is not None
+            and last_accessed is not None
+            and last_accessed < spec.min_last_accessed
+        ):
+            stats.filtered_by_age += 1
+            return False
+        if not self.accepts_url(raw_url):
+            stats.filtered_by_url += 1
+            return False
+        if spec.max_tabs is not None and stats.tabs_kept >= spec.max_tabs:
+            stats.filtered_by_limit += 1
+            return False
+        return True
@@ -5,7 +5,7 @@ from typing import Generic, List, Optional, TypeVar
 # Base class definitions
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseNavigationEntry:
     """
     Represents a base abstraction of a single navigation event within a browser tab.
@@ -24,7 +24,7 @@ TEntry = TypeVar(
 )  # All must be a BaseNavigationEntry subclass
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseTab(Generic[TEntry]):
     """
     Represents a base abstraction of a browser tab consisting of multiple navigation entries.
@@ -53,7 +53,7 @@ class BaseTab(Generic[TEntry]):
 TTab = TypeVar("TTab", bound="BaseTab")  # All must be a BaseTab subclass
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseWindow(Generic[TTab]):
     """
     Represents a base abstraction of a browser window containing tabs.
@@ -4,7 +4,7 @@ from typing import Optional
 from structrues import base_structures
 
 
-@dataclass
+@dataclass(slots=True)
 class ChromiumNavigationEntry(base_structures.BaseNavigationEntry):
     """
     Extends BaseNavigationEntry with Chromium-specific metadata.
@@ -29,7 +29,7 @@ class ChromiumNavigationEntry(base_structures.BaseNavigationEntry):
     is_overriding_user_agent: Optional[bool] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ChromiumTab(base_structures.BaseTab[ChromiumNavigationEntry]):
     """
     Extends BaseTab with Chromium-specific metadata.
@@ -38,12 +38,16 @@ class ChromiumTab(base_structures.BaseTab[ChromiumNavigationEntry]):
         entries (List[ChromiumNavigationEntry]): The list of navigation entries (tab history).
         index (int): The index of the current navigation entry.
         tab_id (Optional[int]): Tab identifier.
+        pinned (bool): Whether the tab is pinned.
+        last_active_time (Optional[int]): Raw kCommandLastActiveTime value, if recorded.
     """
 
     tab_id: Optional[int] = None
+    pinned: bool = False
+    last_active_time: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ChromiumWindow(base_structures.BaseWindow[ChromiumTab]):
     """
     Chromium-specific implementation of a browser window.
@@ -51,6 +55,15 @@ class ChromiumWindow(base_structures.BaseWindow[ChromiumTab]):
     Inherits the `tabs` attribute from BaseWindow, typed as List[ChromiumTab].
     No need to override `tabs` here because the generic base class
     already specifies the correct type.
+
+    Attributes:
+        window_id (Optional[int]): Window identifier, None if the session file has none.
+        selected_tab_index (int): Index of the selected tab in `tabs`.
+        window_type (int): SessionWindow::WindowType (0 normal, 1 popup, 2 app, ...).
+        is_active (bool): Whether this was the active window.
     """
 
-    pass
+    window_id: Optional[int] = None
+    selected_tab_index: int = 0
+    window_type: int = 0
+    is_active: bool = False
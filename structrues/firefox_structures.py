@@ -4,7 +4,7 @@ from typing import Optional
 from structrues import base_structures
 
 
-@dataclass
+@dataclass(slots=True)
 class FirefoxNavigationEntry(base_structures.BaseNavigationEntry):
     """
     Extends BaseNavigationEntry with Firefox-specific metadata.
@@ -20,7 +20,7 @@ class FirefoxNavigationEntry(base_structures.BaseNavigationEntry):
     referrer: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class FirefoxTab(base_structures.BaseTab[FirefoxNavigationEntry]):
     """
     Extends BaseTab with Firefox-specific metadata.
@@ -36,7 +36,7 @@ class FirefoxTab(base_structures.BaseTab[FirefoxNavigationEntry]):
     is_hidden: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class FirefoxWindow(base_structures.BaseWindow[FirefoxTab]):
     """
     Firefox-specific implementation of a browser window.
@@ -0,0 +1,311 @@
+from array import array
+from dataclasses import fields
+from typing import Any, Generic, Iterable, Iterator, Optional, Sequence, overload
+
+from structrues.base_structures import (
+    BaseNavigationEntry,
+    BaseTab,
+    BaseWindow,
+    TEntry,
+    TTab,
+)
+
+# String-typed entry fields are stored as references into a shared string pool,
+# every other field in a plain per-field column.
+STRING_TYPES = (str, Optional[str])
+
+
+class TabTable(Generic[TEntry, TTab]):
+    """
+    Columnar backing store for the windows, tabs and navigation entries of a session.
+
+    Instead of one object per navigation entry, every entry field is kept in its own column.
+    URLs, titles and other strings are interned into a single pool and referenced by position
+    from packed arrays, so repeated URLs cost four bytes each. Tabs are ranges of entries and
+    windows are ranges of tabs, both described by offset arrays.
+
+    The regular BaseTab/BaseWindow API stays available through lightweight views: `tab()` and
+    `window()` return instances of the configured tab and window classes whose `entries` and
+    `tabs` are sequences that build entry and tab objects only when they are accessed.
+
+    Attributes:
+        entry_type (type): Navigation entry class produced by the views.
+        tab_type (type): Tab class produced by the views.
+        window_type (type): Window class produced by the views.
+    """
+
+    def __init__(
+        self,
+        entry_type: type = BaseNavigationEntry,
+        tab_type: type = BaseTab,
+        window_type: type = BaseWindow,
+    ) -> None:
+        self.entry_type = entry_type
+        self.tab_type = tab_type
+        self.window_type = window_type
+
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+
+        self._entry_fields = [f.name for f in fields(entry_type)]
+        self._string_fields = {
+            f.name for f in fields(entry_type) if f.type in STRING_TYPES
+        }
+        # string columns hold pool position + 1, so that 0 can stand for None
+        self._entry_columns: dict[str, Any] = {
+            name: array("I") if name in self._string_fields else []
+            for name in self._entry_fields
+        }
+
+        self._tab_fields = [
+            f.name for f in fields(tab_type) if f.name not in ("entries", "index")
+        ]
+        self._tab_columns: dict[str, list] = {name: [] for name in self._tab_fields}
+        self._tab_index = array("i")
+        self._tab_offsets = array("I", [0])
+        self._window_offsets = array("I", [0])
+
+    @classmethod
+    def from_windows(cls, windows: Iterable[BaseWindow]) -> "TabTable":
+        """
+        Builds a table from already parsed window objects.
+
+        The entry, tab and window classes are taken from the first objects found.
+
+        Args:
+            windows (Iterable[BaseWindow]): Parsed windows, e.g. from parse_jsonlz4_file.
+
+        Returns:
+            TabTable: A table holding the same windows, tabs and entries.
+        """
+
+        windows = list(windows)
+        tab = next((t for w in windows for t in w.tabs), None)
+        entry = next((e for w in windows for t in w.tabs for e in t.entries), None)
+        table = cls(
+            type(entry) if entry is not None else BaseNavigationEntry,
+            type(tab) if tab is not None else BaseTab,
+            type(windows[0]) if windows else BaseWindow,
+        )
+        for window in windows:
+            table.add_window()
+            for tab in window.tabs:
+                table.add_tab(
+                    tab.index,
+                    **{name: getattr(tab, name) for name in table._tab_fields}
+                )
+                for entry in tab.entries:
+                    table.add_entry(
+                        **{name: getattr(entry, name) for name in table._entry_fields}
+                    )
+        return table
+
+    def intern(self, value: Optional[str]) -> int:
+        """
+        Returns the pool reference of a string, adding it to the pool if needed.
+
+        Args:
+            value (Optional[str]): The string to intern.
+
+        Returns:
+            int: Pool position + 1, or 0 for None.
+        """
+
+        if value is None:
+            return 0
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id + 1
+
+    def add_window(self) -> int:
+        """
+        Starts a new window. Tabs added afterwards belong to it.
+
+        Returns:
+            int: Position of the new window.
+        """
+
+        self._window_offsets.append(self._window_offsets[-1])
+        return len(self._window_offsets) - 2
+
+    def add_tab(self, index: int = 0, **tab_fields: Any) -> int:
+        """
+        Appends a tab to the last window. Entries added afterwards belong to it.
+
+        Args:
+            index (int): The index of the current navigation entry. Default is 0.
+            **tab_fields: Values of the tab class's own fields (e.g. pinned, tab_id).
+
+        Returns:
+            int: Position of the new tab in the table.
+        """
+
+        if len(self._window_offsets) == 1:
+            self.add_window()
+        self._tab_index.append(index)
+        self._tab_offsets.append(self._tab_offsets[-1])
+        for name in self._tab_fields:
+            self._tab_columns[name].append(tab_fields.get(name))
+        self._window_offsets[-1] += 1
+        return len(self._tab_index) - 1
+
+    def add_entry(self, **entry_fields: Any) -> None:
+        """
+        Appends a navigation entry to the last tab.
+
+        Args:
+            **entry_fields: Values of the entry class's fields (url, title, ...).
+        """
+
+        if not self._tab_index:
+            self.add_tab()
+        for name in self._entry_fields:
+            value = entry_fields.get(name)
+            if name in self._string_fields:
+                self._entry_columns[name].append(self.intern(value))
+            else:
+                self._entry_columns[name].append(value)
+        self._tab_offsets[-1] += 1
+
+    def entry(self, position: int) -> TEntry:
+        """
+        Builds the navigation entry stored at a position of the entry columns.
+
+        Args:
+            position (int): Entry position in the table.
+
+        Returns:
+            TEntry: A new entry object.
+        """
+
+        values = {}
+        for name, column in self._entry_columns.items():
+            value = column[position]
+            if name in self._string_fields:
+                value = self._strings[value - 1] if value else None
+            values[name] = value
+        return self.entry_type(**values)
+
+    def tab(self, position: int) -> TTab:
+        """
+        Returns a view of a tab. Its entries are built only when they are accessed.
+
+        Args:
+            position (int): Tab position in the table.
+
+        Returns:
+            TTab: A tab object backed by the table.
+        """
+
+        entries = EntriesView(
+            self, self._tab_offsets[position], self._tab_offsets[position + 1]
+        )
+        extra = {name: self._tab_columns[name][position] for name in self._tab_fields}
+        return self.tab_type(entries=entries, index=self._tab_index[position], **extra)
+
+    def window(self, position: int) -> BaseWindow:
+        """
+        Returns a view of a window. Its tabs are built only when they are accessed.
+
+        Args:
+            position (int): Window position in the table.
+
+        Returns:
+            BaseWindow: A window object backed by the table.
+        """
+
+        tabs = TabsView(
+            self, self._window_offsets[position], self._window_offsets[position + 1]
+        )
+        return self.window_type(tabs=tabs)
+
+    def windows(self) -> list[BaseWindow]:
+        """
+        Returns views of all windows.
+
+        Returns:
+            list[BaseWindow]: Window objects backed by the table.
+        """
+
+        return [self.window(i) for i in range(len(self._window_offsets) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._tab_index)
+
+
+class _RangeView(Sequence):
+    """
+    A read-only sequence over a contiguous range of table rows.
+
+    Attributes:
+        table (TabTable): The backing table.
+        start (int): First row of the range.
+        stop (int): Row just past the range.
+    """
+
+    __slots__ = ("table", "start", "stop")
+
+    def __init__(self, table: TabTable, start: int, stop: int) -> None:
+        self.table = table
+        self.start = start
+        self.stop = stop
+
+    def _build(self, position: int) -> Any:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    @overload
+    def __getitem__(self, item: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, item: slice) -> list: ...
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [
+                self._build(self.start + i) for i in range(*item.indices(len(self)))
+            ]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("view index out of range")
+        return self._build(self.start + item)
+
+    def __iter__(self) -> Iterator:
+        for position in range(self.start, self.stop):
+            yield self._build(position)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class EntriesView(_RangeView):
+    """
+    The navigation entries of one tab in a TabTable.
+    """
+
+    __slots__ = ()
+
+    def _build(self, position: int) -> BaseNavigationEntry:
+        return self.table.entry(position)
+
+
+class TabsView(_RangeView):
+    """
+    The tabs of one window in a TabTable.
+    """
+
+    __slots__ = ()
+
+    def _build(self, position: int) -> BaseTab:
+        return self.table.tab(position)
@@ -0,0 +1,765 @@
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import Optional
+
+from utils.browser_registry import BROWSER_NAMES, detect_browsers
+
+# Only the standard library and utils.browser_registry (itself standard library only) are
+# imported at module level. rich, psutil, regex, lz4 and the migration modules are imported
+# inside the commands that use them, so `--help` and argument errors return without loading
+# any of them.
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # used by argparse itself
+EXIT_VERIFY_FAILED = 3
+
+SUPPORTED_BROWSERS = BROWSER_NAMES
+
+# Kept in sync with utils.get_browser_profile_paths.COMPONENTS, which is not imported here
+# to keep startup light.
+COMPONENT_NAMES = (
+    "tabs",
+    "bookmarks",
+    "passwords",
+    "history",
+    "extensions",
+    "preferences",
+)
+
+
+def build_parser() -> ArgumentParser:
+    """
+    Builds the argument parser of the non-interactive command set.
+
+    Returns:
+        ArgumentParser: The parser.
+    """
+
+    parser = ArgumentParser(
+        prog="browser-data-migration",
+        description="Export and import tabs and profiles of Firefox and Chromium-based "
+        "browsers (Chrome, Chromium, Edge, Brave, Vivaldi). "
+        "Run without arguments for the interactive menu.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = ArgumentParser(add_help=False)
+    common.add_argument(
+        "-b",
+        "--browser",
+        action="append",
+        choices=SUPPORTED_BROWSERS,
+        help="browser to process, can be repeated (default: all installed)",
+    )
+
+    retention = ArgumentParser(add_help=False)
+    retention.add_argument(
+        "--keep-last",
+        type=int,
+        default=0,
+        metavar="N",
+        help="keep the N newest snapshots",
+    )
+    retention.add_argument(
+        "--keep-daily",
+        type=int,
+        default=0,
+        metavar="N",
+        help="keep the newest snapshot of each of the last N days",
+    )
+    retention.add_argument(
+        "--keep-weekly",
+        type=int,
+        default=0,
+        metavar="N",
+        help="keep the newest snapshot of each of the last N weeks",
+    )
+
+    export = commands.add_parser(
+        "export", parents=[common, retention], help="export tabs and profiles"
+    )
+    export.add_argument(
+        "-u",
+        "--user",
+        type=Path,
+        default=Path.home(),
+        help="home directory of the user to export (default: current user)",
+    )
+    export.add_argument(
+        "-o",
+        "--output",
+        default="browser_data.json",
+        help="session file, .json or .json.lz4 (default: browser_data.json)",
+    )
+    export.add_argument("--max-tabs", type=int, help="keep at most N tabs per browser")
+    export.add_argument(
+        "--deny-scheme",
+        action="append",
+        default=[],
+        help="drop tabs with this URL scheme, can be repeated",
+    )
+    export.add_argument(
+        "--dedup",
+        choices=("keep", "drop", "merge"),
+        help="remove duplicate tabs across windows and browsers",
+    )
+    export.add_argument(
+        "-c",
+        "--component",
+        action="append",
+        default=[],
+        metavar="[BROWSER:]NAME",
+        help=f"export only these components ({', '.join(COMPONENT_NAMES)}), "
+        "for all browsers or one browser, can be repeated (default: all)",
+    )
+    export.add_argument(
+        "--components",
+        type=Path,
+        metavar="FILE",
+        help='JSON file mapping browsers to components, e.g. {"Chrome": ["bookmarks"]}',
+    )
+    export.add_argument(
+        "--history-days",
+        type=int,
+        metavar="N",
+        help="export only the history of the last N days, as a compact database",
+    )
+    export.add_argument(
+        "--history-max-visits",
+        type=int,
+        metavar="N",
+        help="export at most the N newest history visits, as a compact database",
+    )
+    export.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="export to a new timestamped snapshot, hardlinking files unchanged since "
+        "the previous one; --keep-* options prune older snapshots",
+    )
+    export.add_argument(
+        "--decode-workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="processes decoding a large Chromium session file (default: 1)",
+    )
+    export.add_argument(
+        "--profile", action="store_true", help="save a cProfile profile of the run"
+    )
+
+    import_ = commands.add_parser(
+        "import", parents=[common], help="restore profiles and reopen tabs"
+    )
+    import_.add_argument(
+        "-i",
+        "--input",
+        default="browser_data.json",
+        help="session file written by export (default: browser_data.json)",
+    )
+    import_.add_argument(
+        "-u",
+        "--user",
+        type=Path,
+        help="restore into this profile path instead of the one in the session file",
+    )
+    import_.add_argument(
+        "--convert",
+        action="append",
+        default=[],
+        metavar="SOURCE:TARGET",
+        help="convert the history and bookmarks of SOURCE into TARGET instead of "
+        "restoring SOURCE, e.g. Chrome:Firefox, can be repeated",
+    )
+    import_.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        metavar="N",
+        help="profiles restored at the same time (default: 4)",
+    )
+    import_.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="cancel the import of a browser that takes longer, keeping its old profile",
+    )
+    import_.add_argument(
+        "--maintain",
+        action="store_true",
+        help="checkpoint, vacuum and analyze the restored databases and prewarm them "
+        "before opening the tabs, for a faster first launch",
+    )
+    import_.add_argument(
+        "--snapshot",
+        metavar="NAME",
+        help="restore this export snapshot, or latest, instead of --input",
+    )
+    import_.add_argument(
+        "--profile", action="store_true", help="save a cProfile profile of the run"
+    )
+
+    plan = commands.add_parser(
+        "plan", parents=[common], help="show what an export would copy"
+    )
+    plan.add_argument(
+        "-u",
+        "--user",
+        type=Path,
+        default=Path.home(),
+        help="home directory of the user (default: current user)",
+    )
+
+    verify = commands.add_parser(
+        "verify",
+        parents=[common],
+        help="check exported or restored profiles against a session file",
+    )
+    verify.add_argument(
+        "-i",
+        "--input",
+        default="browser_data.json",
+        help="session file written by export (default: browser_data.json)",
+    )
+
+    send = commands.add_parser(
+        "send",
+        parents=[common],
+        help="send tabs and profiles to a machine running receive",
+    )
+    send.add_argument(
+        "--to",
+        required=True,
+        metavar="HOST[:PORT]",
+        help="the receiving machine (default port: 50505)",
+    )
+    send.add_argument(
+        "-u",
+        "--user",
+        type=Path,
+        default=Path.home(),
+        help="home directory of the user to send (default: current user)",
+    )
+    send.add_argument(
+        "--connections",
+        type=int,
+        default=4,
+        metavar="N",
+        help="parallel TCP connections for the profile files (default: 4)",
+    )
+    send.add_argument(
+        "-c",
+        "--component",
+        action="append",
+        default=[],
+        metavar="[BROWSER:]NAME",
+        help="send only these components, as for export, can be repeated",
+    )
+    send.add_argument(
+        "--components",
+        type=Path,
+        metavar="FILE",
+        help="JSON file mapping browsers to components, as for export",
+    )
+    send.add_argument("--token", default="", help="shared secret of the transfer")
+    send.add_argument(
+        "--tls-ca",
+        type=Path,
+        metavar="FILE",
+        help="encrypt the transfer with TLS, checking the receiver's certificate "
+        "against this certificate (default: plaintext)",
+    )
+    send.add_argument(
+        "--profile", action="store_true", help="save a cProfile profile of the run"
+    )
+
+    receive = commands.add_parser(
+        "receive", help="receive tabs and profiles sent from another machine"
+    )
+    receive.add_argument(
+        "--port", type=int, default=50505, help="port to listen on (default: 50505)"
+    )
+    receive.add_argument(
+        "--bind", default="", help="address to listen on (default: all interfaces)"
+    )
+    receive.add_argument(
+        "-u",
+        "--user",
+        type=Path,
+        default=Path.home(),
+        help="home directory of the user to restore into (default: current user)",
+    )
+    receive.add_argument(
+        "-o",
+        "--output",
+        default="browser_data.json",
+        help="session file to save (default: browser_data.json)",
+    )
+    receive.add_argument(
+        "--token", required=True, help="shared secret the sender must present"
+    )
+    receive.add_argument(
+        "--tls-cert",
+        type=Path,
+        metavar="FILE",
+        help="encrypt the transfer with TLS using this certificate (default: plaintext)",
+    )
+    receive.add_argument(
+        "--tls-key",
+        type=Path,
+        metavar="FILE",
+        help="private key of --tls-cert (default: in the certificate file)",
+    )
+    receive.add_argument(
+        "--no-launch", action="store_true", help="do not open the received tabs"
+    )
+    receive.add_argument(
+        "--profile", action="store_true", help="save a cProfile profile of the run"
+    )
+
+    index = commands.add_parser(
+        "index", help="add exports and session files to a searchable tab inventory"
+    )
+    index.add_argument(
+        "paths",
+        nargs="+",
+        type=Path,
+        metavar="PATH",
+        help="exports, session files or directories to scan (in directories, exports "
+        "must be named browser_data*.json(.lz4))",
+    )
+    index.add_argument(
+        "--db",
+        type=Path,
+        default=Path("tab_index.sqlite"),
+        help="inventory database (default: tab_index.sqlite)",
+    )
+    index.add_argument(
+        "--user", help="user the tabs belong to (default: taken from the profile path)"
+    )
+
+    snapshots = commands.add_parser(
+        "snapshots", parents=[retention], help="list or prune export snapshots"
+    )
+    snapshots.add_argument(
+        "--prune",
+        action="store_true",
+        help="remove the snapshots the --keep-* options do not keep",
+    )
+
+    search = commands.add_parser("search", help="search the tab inventory")
+    search.add_argument(
+        "text", nargs="*", help="words to find in URLs and titles, word* for a prefix"
+    )
+    search.add_argument(
+        "--db",
+        type=Path,
+        default=Path("tab_index.sqlite"),
+        help="inventory database (default: tab_index.sqlite)",
+    )
+    search.add_argument("--host", help="only tabs of this host and its subdomains")
+    search.add_argument("--user", help="only tabs of this user")
+    search.add_argument(
+        "-b", "--browser", choices=SUPPORTED_BROWSERS, help="only tabs of this browser"
+    )
+    search.add_argument(
+        "--group-by",
+        choices=("user", "browser", "host"),
+        help="count matching tabs per user, browser or host",
+    )
+    search.add_argument(
+        "--limit", type=int, default=50, help="maximum number of rows (default: 50)"
+    )
+
+    return parser
+
+
+def parse_components(
+    specs: list[str], mapping_file: Optional[Path]
+) -> Optional[dict[str, list[str]]]:
+    """
+    Builds the per-browser component selection from --component and --components.
+
+    Args:
+        specs (list[str]): "NAME" (all browsers) or "BROWSER:NAME" values.
+        mapping_file (Optional[Path]): JSON file mapping browsers to component lists.
+
+    Raises:
+        ValueError: If a browser or component name is unknown.
+
+    Returns:
+        Optional[dict[str, list[str]]]: Components per browser, None to export everything.
+    """
+
+    if not specs and mapping_file is None:
+        return None
+
+    selection: dict[str, list[str]] = {}
+    if mapping_file is not None:
+        from json import loads
+
+        selection = {
+            browser: list(names)
+            for browser, names in loads(mapping_file.read_text("utf-8")).items()
+        }
+    for spec in specs:
+        browser, _, name = spec.rpartition(":")
+        for target in [browser] if browser else SUPPORTED_BROWSERS:
+            selection.setdefault(target, []).append(name)
+
+    for browser, names in selection.items():
+        if browser not in SUPPORTED_BROWSERS:
+            raise ValueError(f"Unknown browser: {browser}")
+        for name in names:
+            if name not in COMPONENT_NAMES:
+                raise ValueError(f"Unknown component: {name}")
+    return selection
+
+
+def run_export(args: Namespace) -> int:
+    from migrations.exporter import browser_data_export
+    from migrations.history_export import HistoryWindow
+    from migrations.snapshots import RetentionPolicy
+    from migrations.tab_dedup import DedupOptions
+    from session_parsers.tab_filter import TabFilter
+
+    tab_filter = None
+    if args.max_tabs is not None or args.deny_scheme:
+        tab_filter = TabFilter(deny_schemes=args.deny_scheme, max_tabs=args.max_tabs)
+    history = None
+    if args.history_days is not None or args.history_max_visits is not None:
+        history = HistoryWindow(args.history_days, args.history_max_visits)
+
+    browser_data_export(
+        args.user,
+        args.output,
+        tab_filter=tab_filter,
+        dedup=DedupOptions(mode=args.dedup) if args.dedup else None,
+        profile=args.profile,
+        browsers=args.browser,
+        components=parse_components(args.component, args.components),
+        history=history,
+        snapshot=args.snapshot,
+        retention=RetentionPolicy(args.keep_last, args.keep_daily, args.keep_weekly),
+        decode_workers=args.decode_workers,
+    )
+    return EXIT_OK
+
+
+def parse_convert(specs: list[str]) -> Optional[dict[str, str]]:
+    """
+    Parses --convert SOURCE:TARGET values.
+
+    Args:
+        specs (list[str]): The values.
+
+    Raises:
+        ValueError: If a value is malformed or names an unknown browser.
+
+    Returns:
+        Optional[dict[str, str]]: Target per source browser, None if nothing is converted.
+    """
+
+    if not specs:
+        return None
+    convert = {}
+    for spec in specs:
+        source, _, target = spec.partition(":")
+        for browser in (source, target):
+            if browser not in SUPPORTED_BROWSERS:
+                raise ValueError(f"Unknown browser in --convert {spec}: {browser!r}")
+        convert[source] = target
+    return convert
+
+
+def run_import(args: Namespace) -> int:
+    from migrations.importer import browser_data_import
+    from migrations.snapshots import resolve_snapshot, snapshot_session_file
+
+    session_file = args.input
+    if args.snapshot:
+        session_file = str(snapshot_session_file(resolve_snapshot(args.snapshot)))
+    browser_data_import(
+        args.user,
+        session_file,
+        profile=args.profile,
+        browsers=args.browser,
+        convert=parse_convert(args.convert),
+        workers=args.workers,
+        timeout=args.timeout,
+        maintain=args.maintain,
+    )
+    return EXIT_OK
+
+
+def parse_address(address: str, default_port: int) -> tuple[str, int]:
+    """
+    Splits a HOST[:PORT] value.
+
+    Args:
+        address (str): The value, e.g. "192.168.1.20:50505" or "[::1]:50505".
+        default_port (int): Port used when the value has none.
+
+    Raises:
+        ValueError: If the port is not a number.
+
+    Returns:
+        tuple[str, int]: The host and port.
+    """
+
+    host, colon, port = address.rpartition(":")
+    # a bare IPv6 address has colons but no port
+    if not colon or (":" in host and not host.endswith("]")):
+        return address.strip("[]"), default_port
+    return host.strip("[]"), int(port)
+
+
+def run_send(args: Namespace) -> int:
+    from migrations.transfer import DEFAULT_PORT, send_browser_data
+
+    host, port = parse_address(args.to, DEFAULT_PORT)
+    send_browser_data(
+        host,
+        port,
+        args.user,
+        connections=args.connections,
+        browsers=args.browser,
+        components=parse_components(args.component, args.components),
+        token=args.token,
+        profile=args.profile,
+        tls_ca=args.tls_ca,
+    )
+    return EXIT_OK
+
+
+def run_receive(args: Namespace) -> int:
+    from migrations.transfer import receive_browser_data
+
+    receive_browser_data(
+        args.port,
+        args.user,
+        bind=args.bind,
+        session_file=args.output,
+        token=args.token,
+        launch=not args.no_launch,
+        profile=args.profile,
+        tls_cert=args.tls_cert,
+        tls_key=args.tls_key,
+    )
+    return EXIT_OK
+
+
+def run_index(args: Namespace) -> int:
+    from migrations.tab_index import index_tabs
+    from ui.console import print_success, print_warning
+
+    totals = index_tabs(args.db, args.paths, args.user)
+    print_success(
+        f"Проиндексировано файлов: {totals['indexed']}, вкладок: {totals['tabs']}; "
+        f"без изменений: {totals['skipped']}"
+    )
+    if totals["failed"]:
+        print_warning(f"Не удалось прочитать файлов: {totals['failed']}")
+    return EXIT_OK
+
+
+def run_snapshots(args: Namespace) -> int:
+    from migrations.snapshots import (
+        RetentionPolicy,
+        list_snapshots,
+        prune_snapshots,
+        read_manifest,
+    )
+    from ui.console import console, print_success
+
+    if args.prune:
+        policy = RetentionPolicy(args.keep_last, args.keep_daily, args.keep_weekly)
+        removed = prune_snapshots(policy)
+        print_success(f"Удалено снимков: {len(removed)}")
+
+    for snapshot in list_snapshots():
+        manifest = read_manifest(snapshot)
+        new_bytes = manifest["bytes"] - manifest["linked_bytes"]
+        console.print(
+            f"[bold]{manifest['name']}[/]  {', '.join(manifest['browsers'])}  "
+            f"файлов {manifest['files']}, без изменений {manifest['linked_files']}, "
+            f"новых данных {new_bytes / 1_000_000:.1f} МБ",
+            highlight=False,
+        )
+    return EXIT_OK
+
+
+def run_search(args: Namespace) -> int:
+    from rich.markup import escape
+
+    from migrations.tab_index import search_tabs
+    from ui.console import console
+
+    rows = search_tabs(
+        args.db,
+        " ".join(args.text),
+        host=args.host,
+        user=args.user,
+        browser=args.browser,
+        group_by=args.group_by,
+        limit=args.limit,
+    )
+    # urls, titles and user names come from the indexed files: never read them as markup
+    for row in rows:
+        if args.group_by:
+            console.print(
+                f"{row['tabs']:>8}  {row[args.group_by]}", highlight=False, markup=False
+            )
+        else:
+            console.print(
+                f"[bold]{escape(row['user'] or '-')}[/] {escape(row['browser'])} "
+                f"{row['timestamp']}  {escape(row['url'])}\n    {escape(row['title'])}",
+                highlight=False,
+                markup=True,
+            )
+    return EXIT_OK
+
+
+def run_plan(args: Namespace) -> int:
+    from migrations.extension_prune import ExtensionPruner
+    from ui.console import console, print_warning
+    from utils.get_browser_profile_paths import (
+        COMPONENTS,
+        component_files,
+        find_session_snapshots,
+        get_browser_profile_path,
+        ignore_files,
+        tree_totals,
+    )
+
+    for browser in args.browser or detect_browsers(args.user):
+        profile_path = get_browser_profile_path(args.user, browser)
+        if not profile_path or not profile_path.exists():
+            print_warning(f"{browser}: профиль не найден ({profile_path})")
+            continue
+
+        snapshots = find_session_snapshots(profile_path, browser)
+        pruner = ExtensionPruner(browser)
+        files, size = tree_totals(
+            profile_path,
+            lambda src, names: ignore_files(Path(src), names, browser)
+            + pruner.ignore(src, names),
+        )
+        console.print(
+            f"[bold cyan]{browser}[/]: {profile_path}\n"
+            f"  сессия: {snapshots[0] if snapshots else 'не найдена'} "
+            f"(снимков: {len(snapshots)})\n"
+            f"  будет скопировано: {files} файлов, {size / 1_000_000:.1f} МБ"
+        )
+        for component in COMPONENTS[1:]:
+            allowed = component_files(browser, [component])
+            files, size = tree_totals(
+                profile_path,
+                lambda src, names: ignore_files(Path(src), names, browser, allowed)
+                + pruner.ignore(src, names),
+            )
+            console.print(
+                f"    {component:<12}{files:>8} файлов{size / 1_000_000:>10.1f} МБ"
+            )
+        if pruner.pruned_files:
+            console.print(
+                f"  не будет скопировано (неиспользуемые расширения): "
+                f"{pruner.pruned_files} файлов, {pruner.pruned_bytes / 1_000_000:.1f} МБ"
+            )
+    return EXIT_OK
+
+
+def verify_tree(export_path: Path, profile_path: Path) -> list[str]:
+    """
+    Compares an exported profile with a profile directory by file presence and size.
+
+    Args:
+        export_path (Path): The exported profile.
+        profile_path (Path): The source or restored profile.
+
+    Returns:
+        list[str]: Relative paths of files that are missing or differ in size.
+    """
+
+    from os import walk
+
+    problems = []
+    for directory, _, names in walk(export_path):
+        relative = Path(directory).relative_to(export_path)
+        for name in names:
+            target = profile_path / relative / name
+            if not target.is_file():
+                problems.append(f"{relative / name}: отсутствует")
+            elif target.stat().st_size != (Path(directory) / name).stat().st_size:
+                problems.append(f"{relative / name}: размер отличается")
+    return problems
+
+
+def run_verify(args: Namespace) -> int:
+    from ui.console import print_error, print_success, print_warning
+    from utils.json_handler import iter_browser_data
+
+    failed = False
+    for browser, browser_data in iter_browser_data(args.input):
+        if args.browser and browser not in args.browser:
+            continue
+        export_path = browser_data.get("export_path")
+        profile_path = browser_data.get("profile_path")
+        if not export_path:
+            print_warning(f"{browser}: профиль не экспортировался")
+            continue
+        if not Path(export_path).is_dir():
+            print_error(f"{browser}: экспорт не найден: {export_path}")
+            failed = True
+            continue
+        if not profile_path or not Path(profile_path).is_dir():
+            print_warning(f"{browser}: профиль для сравнения не найден: {profile_path}")
+            continue
+
+        problems = verify_tree(Path(export_path), Path(profile_path))
+        if problems:
+            failed = True
+            print_error(f"{browser}: расхождений {len(problems)}")
+            for problem in problems[:20]:
+                print_error(f"  {problem}")
+        else:
+            print_success(f"{browser}: профиль совпадает с экспортом")
+
+    return EXIT_VERIFY_FAILED if failed else EXIT_OK
+
+
+COMMANDS = {
+    "export": run_export,
+    "import": run_import,
+    "plan": run_plan,
+    "verify": run_verify,
+    "send": run_send,
+    "receive": run_receive,
+    "index": run_index,
+    "search": run_search,
+    "snapshots": run_snapshots,
+}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs one command of the non-interactive CLI.
+
+    Args:
+        argv (Optional[list[str]]): Command line arguments. Default is sys.argv[1:].
+
+    Returns:
+        int: The process exit code: EXIT_OK, EXIT_ERROR or EXIT_VERIFY_FAILED.
+             Invalid arguments exit with EXIT_USAGE from argparse.
+    """
+
+    args = build_parser().parse_args(argv)
+    try:
+        return COMMANDS[args.command](args)
+    except Exception as e:
+        from ui.console import print_error
+        from utils.logger import logger
+
+        logger.error(f"Command {args.command} failed: {e}")
+        print_error(f"Ошибка: {e}")
+        return EXIT_ERROR
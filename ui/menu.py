@@ -14,7 +14,7 @@ from utils.logger import logger
 help_text = """
 [bold cyan]Помощь[/bold cyan]
 
-Приложение предназначено для переноса данных браузеров Chrome, Edge и Firefox между компьютерами.
+Приложение предназначено для переноса данных браузеров Firefox и браузеров на основе Chromium (Chrome, Chromium, Edge, Brave, Vivaldi) между компьютерами.
 
 [bold green]1. Экспорт данных[/bold green] — сохраняет:
   • текущие открытые вкладки;
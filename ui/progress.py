@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Iterable
+
+from rich.console import RenderableType
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    SpinnerColumn,
+    TaskID,
+    TextColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+)
+
+from ui.console import console
+from utils.metrics import metrics
+
+# Redraws per second. Progress is sampled from the metrics counters on every redraw, so this
+# is also the rate at which the display touches the copy and parse state.
+REFRESH_PER_SECOND = 4
+
+# Window of the moving average behind the throughput and ETA columns, in seconds.
+SPEED_ESTIMATE_PERIOD = 10.0
+
+
+class MigrationProgress(Progress):
+    """
+    Live per-browser progress of an export or import run.
+
+    Every browser the run has started on gets a bar with its current phase, files and bytes
+    done against the planned totals, a moving-average throughput and an ETA. The copy and
+    parse stages do not send anything to the display: they only bump the counters of the
+    `metrics` collector, and the display samples them right before each redraw, at most
+    REFRESH_PER_SECOND times per second.
+    """
+
+    def __init__(self, spinner: str = "dots") -> None:
+        # set first: the base class may render while it is being initialized
+        self._browser_tasks: dict[str, TaskID] = {}
+        self._created_at = datetime.now().isoformat()
+        self._syncing = False
+        super().__init__(
+            SpinnerColumn(spinner),
+            TextColumn("[bold cyan]{task.description:<8}"),
+            TextColumn("{task.fields[phase]:<12}"),
+            BarColumn(),
+            TextColumn("{task.fields[files]}"),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            console=console,
+            refresh_per_second=REFRESH_PER_SECOND,
+            speed_estimate_period=SPEED_ESTIMATE_PERIOD,
+        )
+
+    def _sync(self) -> None:
+        # counters of a run that finished before this display was opened are not shown
+        if not metrics.started_at or metrics.started_at < self._created_at:
+            return
+        for browser, state in metrics.snapshot().items():
+            if not browser:
+                continue
+            counters = state["counters"]
+            planned = state["planned"]
+            task_id = self._browser_tasks.get(browser)
+            if task_id is None:
+                task_id = self.add_task(browser, total=None, phase="", files="")
+                self._browser_tasks[browser] = task_id
+
+            files = counters.get("files", 0)
+            planned_files = planned.get("files")
+            self.update(
+                task_id,
+                completed=counters.get("bytes", 0),
+                total=planned.get("bytes"),
+                phase=state["phase"],
+                files=f"{files}/{planned_files}" if planned_files else str(files),
+            )
+
+    def get_renderables(self) -> Iterable[RenderableType]:
+        # add_task() refreshes the display itself, which would come back here
+        if not self._syncing:
+            self._syncing = True
+            try:
+                self._sync()
+            finally:
+                self._syncing = False
+        yield from super().get_renderables()
@@ -2,12 +2,16 @@ from contextlib import contextmanager
 from typing import Generator
 
 from ui.console import console
+from ui.progress import MigrationProgress
 
 
 @contextmanager
 def status_bar(message: str, spinner: str = "dots") -> Generator[None, None, None]:
     """
-    Displays a status bar with a message and spinner.
+    Displays the live progress of a run under a start message.
+
+    Per-browser bars show the current phase, files and bytes against the planned totals,
+    throughput and ETA (see ui.progress.MigrationProgress).
 
     Args:
         message (str): The message to display.
@@ -20,7 +24,7 @@ def status_bar(message: str, spinner: str = "dots") -> Generator[None, None, Non
     console.print()
     console.log(f"[green]{message} запущен...[/green]")
     try:
-        with console.status(f"[cyan]{message}...", spinner=spinner):
+        with MigrationProgress(spinner):
             yield
     except Exception as e:
         console.log(f"[red]{message} завершен с ошибкой: {e}[/red]")
@@ -0,0 +1,411 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from os.path import isdir, join
+from pathlib import Path, PurePosixPath
+from platform import system
+from typing import Optional
+
+## Browser registry
+# Everything the migration knows about a browser, in one place: where its profile root is
+# on each OS and for each Linux packaging (deb/rpm, snap, flatpak), the names of its
+# processes, where its executable is, how it opens tabs and which session layout it uses.
+# Only the standard library is imported, so that ui.cli can take the browser names from here
+# without slowing down its startup.
+
+CHROMIUM = "chromium"
+GECKO = "gecko"
+
+# Session snapshots of each engine, read by session recovery. Chromium's Tabs_* files are not
+# listed: they belong to the tab restore service and hold recently closed tabs, in another
+# command set.
+SESSION_PATTERNS = {
+    CHROMIUM: ("Session_*", "Current Session", "Last Session"),
+    GECKO: (
+        "sessionstore.jsonlz4",
+        "recovery.jsonlz4",
+        "recovery.baklz4",
+        "previous.jsonlz4",
+        "upgrade.jsonlz4-*",
+    ),
+}
+# File in the profile root that the browser rewrites on every run. When a browser has
+# several existing roots (e.g. a deb install migrated to snap), the one whose marker is the
+# newest is used.
+ROOT_MARKERS = {CHROMIUM: "Local State", GECKO: "profiles.ini"}
+
+FLATPAK_BIN = "/var/lib/flatpak/exports/bin"
+
+
+@dataclass(frozen=True)
+class BrowserSpec:
+    """
+    What the migration knows about one browser.
+
+    Attributes:
+        name (str): The name used in browser_data.json and on the command line.
+        engine (str): CHROMIUM or GECKO; decides the session layout, the profile directory
+                      names and the component files.
+        profile_roots (dict[str, tuple[str, ...]]): Profile roots relative to the home
+            directory, per OS ("Windows", "Linux"), in probe order: deb/rpm, snap, flatpak.
+        process_names (tuple[str, ...]): Process names, matched case-insensitively. Channels
+            of one browser share them, so they are closed together.
+        executables (dict[str, tuple[str, ...]]): Absolute executable paths per OS.
+        commands (tuple[str, ...]): Executable names looked up in PATH.
+        new_tab_args (tuple[str, ...]): Arguments placed before the URLs to open them as tabs.
+    """
+
+    name: str
+    engine: str
+    profile_roots: dict[str, tuple[str, ...]]
+    process_names: tuple[str, ...]
+    executables: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    commands: tuple[str, ...] = ()
+    new_tab_args: tuple[str, ...] = ()
+
+    @property
+    def session_patterns(self) -> tuple[str, ...]:
+        return SESSION_PATTERNS[self.engine]
+
+    @property
+    def root_marker(self) -> str:
+        return ROOT_MARKERS[self.engine]
+
+
+REGISTRY: dict[str, BrowserSpec] = {
+    spec.name: spec
+    for spec in (
+        BrowserSpec(
+            name="Firefox",
+            engine=GECKO,
+            profile_roots={
+                "Windows": ("AppData/Roaming/Mozilla/Firefox",),
+                "Linux": (
+                    ".mozilla/firefox",
+                    "snap/firefox/common/.mozilla/firefox",
+                    ".var/app/org.mozilla.firefox/.mozilla/firefox",
+                ),
+            },
+            process_names=("firefox.exe", "firefox", "firefox-bin"),
+            executables={
+                "Windows": (
+                    "C:/Program Files/Mozilla Firefox/firefox.exe",
+                    "C:/Program Files (x86)/Mozilla Firefox/firefox.exe",
+                ),
+                "Linux": (
+                    "/usr/bin/firefox",
+                    "/snap/bin/firefox",
+                    f"{FLATPAK_BIN}/org.mozilla.firefox",
+                ),
+            },
+            commands=("firefox", "firefox.exe"),
+            new_tab_args=("--new-tab",),
+        ),
+        BrowserSpec(
+            name="Chrome",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Google/Chrome/User Data",),
+                "Linux": (
+                    ".config/google-chrome",
+                    ".var/app/com.google.Chrome/config/google-chrome",
+                ),
+            },
+            process_names=("chrome.exe", "chrome"),
+            executables={
+                "Windows": (
+                    "C:/Program Files/Google/Chrome/Application/chrome.exe",
+                    "C:/Program Files (x86)/Google/Chrome/Application/chrome.exe",
+                ),
+                "Linux": (
+                    "/usr/bin/google-chrome",
+                    "/usr/bin/google-chrome-stable",
+                    f"{FLATPAK_BIN}/com.google.Chrome",
+                ),
+            },
+            commands=("google-chrome", "google-chrome-stable", "chrome", "chrome.exe"),
+        ),
+        BrowserSpec(
+            name="Chrome Beta",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Google/Chrome Beta/User Data",),
+                "Linux": (".config/google-chrome-beta",),
+            },
+            process_names=("chrome.exe", "chrome"),
+            executables={
+                "Windows": (
+                    "C:/Program Files/Google/Chrome Beta/Application/chrome.exe",
+                ),
+                "Linux": ("/usr/bin/google-chrome-beta",),
+            },
+            commands=("google-chrome-beta",),
+        ),
+        BrowserSpec(
+            name="Chrome Dev",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Google/Chrome Dev/User Data",),
+                "Linux": (".config/google-chrome-unstable",),
+            },
+            process_names=("chrome.exe", "chrome"),
+            executables={
+                "Windows": (
+                    "C:/Program Files/Google/Chrome Dev/Application/chrome.exe",
+                ),
+                "Linux": ("/usr/bin/google-chrome-unstable",),
+            },
+            commands=("google-chrome-unstable",),
+        ),
+        BrowserSpec(
+            name="Chrome Canary",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Google/Chrome SxS/User Data",),
+                "Linux": (".config/google-chrome-canary",),
+            },
+            process_names=("chrome.exe", "chrome"),
+            # installed per user on Windows, below the profile root
+            executables={"Linux": ("/usr/bin/google-chrome-canary",)},
+            commands=("google-chrome-canary",),
+        ),
+        BrowserSpec(
+            name="Chromium",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Chromium/User Data",),
+                "Linux": (
+                    ".config/chromium",
+                    "snap/chromium/common/chromium",
+                    ".var/app/org.chromium.Chromium/config/chromium",
+                ),
+            },
+            # the snap runs the "chrome" binary
+            process_names=("chromium", "chromium-browser", "chrome"),
+            executables={
+                "Linux": (
+                    "/usr/bin/chromium",
+                    "/usr/bin/chromium-browser",
+                    "/snap/bin/chromium",
+                    f"{FLATPAK_BIN}/org.chromium.Chromium",
+                ),
+            },
+            commands=("chromium", "chromium-browser"),
+        ),
+        BrowserSpec(
+            name="Brave",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/BraveSoftware/Brave-Browser/User Data",),
+                "Linux": (
+                    ".config/BraveSoftware/Brave-Browser",
+                    "snap/brave/current/.config/BraveSoftware/Brave-Browser",
+                    ".var/app/com.brave.Browser/config/BraveSoftware/Brave-Browser",
+                ),
+            },
+            process_names=("brave.exe", "brave"),
+            executables={
+                "Windows": (
+                    "C:/Program Files/BraveSoftware/Brave-Browser/Application/brave.exe",
+                ),
+                "Linux": (
+                    "/usr/bin/brave-browser",
+                    "/snap/bin/brave",
+                    f"{FLATPAK_BIN}/com.brave.Browser",
+                ),
+            },
+            commands=("brave-browser", "brave"),
+        ),
+        BrowserSpec(
+            name="Vivaldi",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Vivaldi/User Data",),
+                "Linux": (
+                    ".config/vivaldi",
+                    "snap/vivaldi/current/.config/vivaldi",
+                    ".var/app/com.vivaldi.Vivaldi/config/vivaldi",
+                ),
+            },
+            process_names=("vivaldi.exe", "vivaldi-bin", "vivaldi"),
+            executables={
+                "Windows": ("C:/Program Files/Vivaldi/Application/vivaldi.exe",),
+                "Linux": (
+                    "/usr/bin/vivaldi",
+                    "/usr/bin/vivaldi-stable",
+                    "/snap/bin/vivaldi",
+                    f"{FLATPAK_BIN}/com.vivaldi.Vivaldi",
+                ),
+            },
+            commands=("vivaldi", "vivaldi-stable"),
+        ),
+        BrowserSpec(
+            name="Edge",
+            engine=CHROMIUM,
+            profile_roots={
+                "Windows": ("AppData/Local/Microsoft/Edge/User Data",),
+                "Linux": (
+                    ".config/microsoft-edge",
+                    ".var/app/com.microsoft.Edge/config/microsoft-edge",
+                ),
+            },
+            process_names=("msedge.exe", "microsoftedge.exe", "msedge"),
+            executables={
+                "Windows": (
+                    "C:/Program Files/Microsoft/Edge/Application/msedge.exe",
+                    "C:/Program Files (x86)/Microsoft/Edge/Application/msedge.exe",
+                ),
+                "Linux": (
+                    "/usr/bin/microsoft-edge",
+                    "/usr/bin/msedge",
+                    f"{FLATPAK_BIN}/com.microsoft.Edge",
+                ),
+            },
+            commands=("microsoft-edge", "msedge", "msedge.exe"),
+        ),
+    )
+}
+
+BROWSER_NAMES = tuple(REGISTRY)
+
+
+def get_browser_spec(browser: str) -> BrowserSpec:
+    """
+    Returns the registry entry of a browser.
+
+    Args:
+        browser (str): The browser name.
+
+    Raises:
+        ValueError: If the browser is unknown.
+
+    Returns:
+        BrowserSpec: The entry.
+    """
+
+    spec = REGISTRY.get(browser)
+    if spec is None:
+        raise ValueError(f"Error: unknown browser {browser}")
+    return spec
+
+
+def is_gecko(browser: str) -> bool:
+    """
+    Tells whether a browser uses the Firefox profile and session layout.
+
+    Args:
+        browser (str): The browser name.
+
+    Returns:
+        bool: True for Firefox, False for Chromium-based and unknown browsers.
+    """
+
+    spec = REGISTRY.get(browser)
+    return spec is not None and spec.engine == GECKO
+
+
+@lru_cache(maxsize=None)
+def _candidate_tree(system_name: str) -> dict:
+    # The profile roots of all browsers merged into a tree of path components: roots
+    # sharing a parent (.config, snap, .var/app) share its node. A leaf holds its root
+    # under the None key.
+    tree: dict = {}
+    for spec in REGISTRY.values():
+        for candidate in spec.profile_roots.get(system_name, ()):
+            node = tree
+            for part in PurePosixPath(candidate).parts:
+                node = node.setdefault(part, {})
+            node[None] = candidate
+    return tree
+
+
+def _probe(root: Path, tree: dict) -> set[str]:
+    # Walks the candidate tree from root checking each component once. A missing directory
+    # prunes every candidate below it (e.g. no .var skips all flatpak roots), so the cost
+    # depends on what exists, not on how many candidates there are.
+    found = set()
+    stack = [(str(root), tree)]
+    while stack:
+        directory, node = stack.pop()
+        for name, child in node.items():
+            if name is None:
+                continue
+            path = join(directory, name)
+            if not isdir(path):
+                continue
+            if None in child:
+                found.add(child[None])
+            stack.append((path, child))
+    return found
+
+
+def _newest_root(user_path: Path, roots: list[str], marker: str) -> str:
+    def marker_time(root: str) -> float:
+        try:
+            return (user_path / root / marker).stat().st_mtime
+        except OSError:
+            return -1.0
+
+    # max() keeps the first of equal roots, i.e. probe order
+    return max(roots, key=marker_time) if len(roots) > 1 else roots[0]
+
+
+@lru_cache(maxsize=None)
+def _detect(user_path: Path, system_name: str) -> tuple[tuple[str, Path], ...]:
+    found = _probe(user_path, _candidate_tree(system_name))
+    detected = []
+    for name, spec in REGISTRY.items():
+        existing = [
+            root for root in spec.profile_roots.get(system_name, ()) if root in found
+        ]
+        if existing:
+            root = _newest_root(user_path, existing, REGISTRY[name].root_marker)
+            detected.append((name, user_path / root))
+    return tuple(detected)
+
+
+def detect_browsers(
+    user_path: Path, system_name: Optional[str] = None
+) -> dict[str, Path]:
+    """
+    Finds the profile root of every registered browser of a user.
+
+    All candidate roots of all browsers are probed in one pass over the file system. The
+    result is cached per user; call clear_detection_cache() after creating or removing
+    profile roots.
+
+    Args:
+        user_path (Path): The user's home directory.
+        system_name (Optional[str]): "Windows" or "Linux". Default is None (this OS).
+
+    Returns:
+        dict[str, Path]: Profile root per installed browser, in registry order.
+    """
+
+    return dict(_detect(Path(user_path), system_name or system()))
+
+
+def clear_detection_cache() -> None:
+    _detect.cache_clear()
+
+
+def browser_for_path(path: Path | str) -> Optional[str]:
+    """
+    Tells which browser a file belongs to from the profile root in its path.
+
+    Args:
+        path (Path | str): A file below a profile root, e.g. a session file.
+
+    Returns:
+        Optional[str]: The browser whose longest matching profile root is in the path,
+                       or None if no root matches.
+    """
+
+    text = "/" + Path(path).as_posix().lower() + "/"
+    best, best_length = None, 0
+    for name, spec in REGISTRY.items():
+        for roots in spec.profile_roots.values():
+            for root in roots:
+                needle = "/" + root.lower() + "/"
+                if len(needle) > best_length and needle in text:
+                    best, best_length = name, len(needle)
+    return best
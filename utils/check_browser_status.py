@@ -1,14 +1,11 @@
 from psutil import process_iter, NoSuchProcess, AccessDenied
 
 from ui.console import print_success
+from utils.browser_registry import REGISTRY
 from utils.logger import logger
 
 # Mapping of browser names to process names (may be different on different platforms)
-BROWSERS = {
-    "Firefox": ["firefox.exe", "firefox"],
-    "Chrome": ["chrome.exe", "chrome"],
-    "Edge": ["msedge.exe", "microsoftedge.exe", "msedge"],
-}
+BROWSERS = {name: list(spec.process_names) for name, spec in REGISTRY.items()}
 
 
 def is_browser_running(browser: str) -> bool:
@@ -1,23 +1,27 @@
+from logging import DEBUG
+from os import scandir, stat_result
 from platform import system
 from pathlib import Path
 from rich.prompt import IntPrompt
-from regex import compile
-from typing import Optional, Iterable
+from regex import Pattern, compile
+from typing import Callable, Optional, Iterable, Iterator
 
 
 from ui.console import (
     console,
     print_warning,
 )
-from utils.logger import logger
-
-WINDOWS_CHROME = Path("AppData/Local/Google/Chrome/User Data")
-WINDOWS_EDGE = Path("AppData/Local/Microsoft/Edge/User Data")
-WINDOWS_FIREFOX = Path("AppData/Roaming/Mozilla/Firefox/")
+from utils.browser_registry import (
+    CHROMIUM,
+    GECKO,
+    REGISTRY,
+    SESSION_PATTERNS,
+    detect_browsers,
+    is_gecko,
+)
+from utils.logger import get_logger, logger
 
-LINUX_CHROME = Path(".config/google-chrome")
-LINUX_EDGE = Path(".config/microsoft-edge")
-LINUX_FIREFOX = Path("snap/firefox/common/.mozilla/firefox")
+copy_logger = get_logger("copy")
 
 
 def get_user_profiles() -> list[Path]:
@@ -90,12 +94,14 @@ def get_browser_profile_path(user_path: Path, browser: str) -> Optional[Path]:
     """
     Get the default path for browser profiles based on the operating system and browser type.
 
-    This function determines the default path for browser profiles based on the operating system
-    and browser type (e.g., Chrome, Edge, Firefox).
+    This function determines the path for browser profiles based on the operating system
+    and browser type (e.g., Chrome, Edge, Firefox). Of the candidate roots of the browser in
+    the registry (deb, snap and flatpak installs on Linux), the detected one is returned; if
+    none exists yet, the first one (where a restore creates it).
 
     Args:
         user_path (Path): The path to the user directory.
-        browser (str): The name of the browser (e.g., "Chrome", "Edge", "Firefox").
+        browser (str): The name of the browser (see utils.browser_registry).
 
     Raises:
         NotImplementedError: If the browser is unknown or not supported on the current OS.
@@ -104,32 +110,120 @@ def get_browser_profile_path(user_path: Path, browser: str) -> Optional[Path]:
         Optional[Path]: The path to the browser profile directory, or None if the browser is not supported.
     """
 
-    match system():
-        case "Windows":
-            if browser == "Chrome":
-                return user_path / WINDOWS_CHROME
-            elif browser == "Edge":
-                return user_path / WINDOWS_EDGE
-            elif browser == "Firefox":
-                return user_path / WINDOWS_FIREFOX
-            else:
-                raise NotImplementedError(
-                    f"Error: Unknown browser {browser} for Windows"
-                )
-        case "Linux":
-            if browser == "Chrome":
-                return user_path / LINUX_CHROME
-            elif browser == "Edge":
-                return user_path / LINUX_EDGE
-            elif browser == "Firefox":
-                return user_path / LINUX_FIREFOX
-            else:
-                raise NotImplementedError(f"Error: Unknown browser {browser} for Linux")
-        case _:
-            raise NotImplementedError("Error: Unknown OS type")
+    system_name = system()
+    if system_name not in ("Windows", "Linux"):
+        raise NotImplementedError("Error: Unknown OS type")
+    spec = REGISTRY.get(browser)
+    roots = spec.profile_roots.get(system_name) if spec is not None else None
+    if not roots:
+        raise NotImplementedError(f"Error: Unknown browser {browser} for {system_name}")
+    return detect_browsers(user_path, system_name).get(browser, user_path / roots[0])
+
+
+CHROMIUM_PROFILE_PATTERN = compile(r"Default|Profile\s\d+")
+FIREFOX_PROFILE_PATTERN = compile(r"\w+\.default(-esr)?")
+
+COMPONENTS = ("tabs", "bookmarks", "passwords", "history", "extensions", "preferences")
+
+# Profile entries of each component. The "tabs" files are only read to build the tab list
+# of browser_data.json; they are never copied with the profile.
+CHROMIUM_COMPONENTS: dict[str, list[str]] = {
+    "tabs": [
+        "Sessions",
+        "Current Session",
+        "Current Tabs",
+        "Last Session",
+        "Last Tabs",
+    ],
+    "bookmarks": ["Bookmarks", "Bookmarks.bak"],
+    "passwords": ["Login Data", "Login Data-journal"],
+    "history": [
+        "History",
+        "History-journal",
+        "Shortcuts",
+        "Shortcuts-journal",
+        "Favicons",
+        "Favicons-journal",
+    ],
+    "extensions": [
+        "Extensions",
+        "Extension State",
+        "Extension Rules",
+        "Extension Scripts",
+    ],
+    "preferences": ["Preferences", "Secure Preferences"],
+}
+# Firefox keeps bookmarks and history in the same database. Its databases run in WAL mode:
+# the -wal file holds the transactions not yet checkpointed into the database.
+FIREFOX_COMPONENTS: dict[str, list[str]] = {
+    "tabs": ["sessionstore-backups", "sessionstore.jsonlz4"],
+    "bookmarks": ["places.sqlite", "places.sqlite-wal"],
+    "passwords": ["logins.json", "key4.db"],
+    "history": [
+        "places.sqlite",
+        "places.sqlite-wal",
+        "favicons.sqlite",
+        "favicons.sqlite-wal",
+    ],
+    "extensions": ["extensions", "extensions.json"],
+    "preferences": ["prefs.js", "handlers.json", "xulstore.json"],
+}
+# Entries copied whatever components are selected.
+FIREFOX_BASE_FILES = ["profiles.ini", "Profiles"]
+
+
+def component_files(
+    browser: str, components: Optional[Iterable[str]] = None
+) -> list[str]:
+    """
+    Returns the profile entries that make up the given components of a browser.
+
+    Args:
+        browser (str): The browser name.
+        components (Optional[Iterable[str]]): Component names. Default is None (all but "tabs").
+
+    Raises:
+        ValueError: If a component name is unknown.
+
+    Returns:
+        list[str]: File and directory names, without duplicates.
+    """
+
+    mapping = FIREFOX_COMPONENTS if is_gecko(browser) else CHROMIUM_COMPONENTS
+    names: list[str] = []
+    for component in components if components is not None else COMPONENTS[1:]:
+        if component not in mapping:
+            raise ValueError(f"Unknown component: {component}")
+        names.extend(n for n in mapping[component] if n not in names)
+    return names
+
+
+def profile_relative_parts(path: Path, pattern: Pattern) -> tuple[str, ...]:
+    """
+    Returns the parts of a path below the last directory that is a browser profile.
+
+    Args:
+        path (Path): A path inside (or above) a browser profile.
+        pattern (Pattern): CHROMIUM_PROFILE_PATTERN or FIREFOX_PROFILE_PATTERN.
+
+    Returns:
+        tuple[str, ...]: E.g. ("Extensions", "<id>") for ".../Default/Extensions/<id>",
+                         empty if the path is not inside a profile.
+    """
+
+    parts = path.parts
+    for index in range(len(parts) - 1, -1, -1):
+        if pattern.fullmatch(parts[index]):
+            return parts[index + 1 :]
+    return ()
 
 
-def ignore_files(src: Path | str, names: list[str], browser: str) -> list[str]:
+def ignore_files(
+    src: Path | str,
+    names: list[str],
+    browser: str,
+    allowed: Optional[Iterable[str]] = None,
+) -> list[str]:
     """
     Ignore files that are not in the allowed list or cannot be accessed.
 
@@ -139,65 +233,37 @@ def ignore_files(src: Path | str, names: list[str], browser: str) -> list[str]:
     Args:
         src (Path | str): The source directory path.
         names (list[str]): List of file names in the source directory.
+        browser (str): The browser name.
+        allowed (Optional[Iterable[str]]): Profile entries to keep, e.g. from component_files().
+                                           Default is None (every component except tabs).
 
     Returns:
         list[str]: A list of file names that could not be accessed.
     """
 
-    CHROMIUM_PROFILE_PATTERN = compile(r"Default|Profile\s\d+")
-    FIREFOX_PROFILE_PATTERN = compile(r"\w+\.default(-esr)?")
-
-    CHROMIUM_FILES = [
-        "Bookmarks",
-        "Bookmarks.bak",
-        "Login Data",
-        "Login Data-journal",
-        "Extensions",
-        "Extension State",
-        "Extension Rules",
-        "Extension Scripts",
-        "Preferences",
-        "Secure Preferences",
-        "Shortcuts",
-        "Shortcuts-journal",
-        "History",
-        "History-journal",
-    ]
-    FIREFOX_FILES = [
-        "places.sqlite",
-        "logins.json",
-        "key4.db",
-        "extensions",
-        "extensions.json",
-        "profiles.ini",
-        "Profiles",
-        "prefs.js",
-        "handlers.json",
-        "xulstore.json",
-    ]
-
-    allowed = FIREFOX_FILES if browser == "Firefox" else CHROMIUM_FILES
+    if allowed is None:
+        allowed = component_files(browser)
+    allowed = list(allowed)
+    if is_gecko(browser):
+        allowed += FIREFOX_BASE_FILES
+    pattern = FIREFOX_PROFILE_PATTERN if is_gecko(browser) else CHROMIUM_PROFILE_PATTERN
 
     ignore_list = []
     src_path = Path(src)
+    # everything below an allowed directory of a profile (Extensions, Extension State, ...)
+    # is kept; only the part of the path below the profile counts, not where it lives
+    inside_allowed = not set(allowed).isdisjoint(
+        profile_relative_parts(src_path, pattern)
+    )
 
     for name in names:
         full_path = src_path / name
-        pattern = (
-            FIREFOX_PROFILE_PATTERN
-            if browser == "Firefox"
-            else CHROMIUM_PROFILE_PATTERN
-        )
-        if (
-            name not in allowed
-            and not pattern.fullmatch(name)
-            and "extensions" not in str(full_path).lower()
-        ):
+        if name not in allowed and not pattern.fullmatch(name) and not inside_allowed:
             ignore_list.append(name)
             continue
         if full_path.is_file():
-            if name not in allowed and "extensions" not in str(full_path).lower():
-                if browser == "Firefox":
+            if name not in allowed and not inside_allowed:
+                if is_gecko(browser):
                     print(full_path)
                 ignore_list.append(name)
                 continue
@@ -207,9 +273,68 @@ def ignore_files(src: Path | str, names: list[str], browser: str) -> list[str]:
             except Exception:
                 ignore_list.append(name)
 
+    if ignore_list and copy_logger.isEnabledFor(DEBUG):
+        copy_logger.debug("%s: skipped in %s: %s", browser, src, ignore_list)
     return ignore_list
 
 
+def iter_tree(
+    root: Path, ignore: Optional[Callable[[str, list[str]], list[str]]] = None
+) -> Iterator[tuple[str, stat_result]]:
+    """
+    Walks the files a copytree of `root` with the same ignore callback would copy.
+
+    Args:
+        root (Path): The directory to walk.
+        ignore (Optional[Callable[[str, list[str]], list[str]]]): The copytree ignore callback. Default is None.
+
+    Yields:
+        tuple[str, stat_result]: The path of each file relative to `root` (with "/"
+                                 separators) and its stat result.
+    """
+
+    pending = [("", str(root))]
+    while pending:
+        relative, directory = pending.pop()
+        try:
+            with scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        ignored = set(ignore(directory, [e.name for e in entries])) if ignore else set()
+        for entry in entries:
+            if entry.name in ignored:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((f"{relative}{entry.name}/", entry.path))
+                elif entry.is_file():
+                    yield f"{relative}{entry.name}", entry.stat()
+            except OSError:
+                continue
+
+
+def tree_totals(
+    root: Path, ignore: Optional[Callable[[str, list[str]], list[str]]] = None
+) -> tuple[int, int]:
+    """
+    Counts the files and bytes a copytree of `root` with the same ignore callback would copy.
+
+    Args:
+        root (Path): The directory to measure.
+        ignore (Optional[Callable[[str, list[str]], list[str]]]): The copytree ignore callback. Default is None.
+
+    Returns:
+        tuple[int, int]: Number of files and their total size in bytes.
+    """
+
+    files = size = 0
+    for _, stat in iter_tree(root, ignore):
+        files += 1
+        size += stat.st_size
+    return files, size
+
+
 def find_latest_file_by_patterns(
     directory: Path, patterns: Iterable[str]
 ) -> Optional[Path]:
@@ -245,3 +370,44 @@ def find_latest_recovery_file(directory: Path) -> Optional[Path]:
     return find_latest_file_by_patterns(
         directory, ["recovery*.jsonlz4", "previous.jsonlz4"]
     )
+
+
+def snapshot_profile_dir(path: Path) -> Path:
+    """
+    Returns the browser profile a session snapshot belongs to.
+
+    Args:
+        path (Path): The snapshot, e.g. ".../Default/Sessions/Session_1" or
+                     ".../abcd.default/sessionstore-backups/recovery.jsonlz4".
+
+    Returns:
+        Path: The profile directory ("Default", "abcd.default").
+    """
+
+    if path.parent.name in ("Sessions", "sessionstore-backups"):
+        return path.parent.parent
+    return path.parent
+
+
+def find_session_snapshots(directory: Path, browser: str) -> list[Path]:
+    """
+    Lists every session snapshot of the profile that holds the newest one.
+
+    Args:
+        directory (Path): Profile root of the browser to search in.
+        browser (str): The browser name.
+
+    Returns:
+        list[Path]: The snapshots, newest first. Empty if none found.
+    """
+
+    if not directory.exists():
+        return []
+    patterns = SESSION_PATTERNS[GECKO if is_gecko(browser) else CHROMIUM]
+    files = {path for pattern in patterns for path in directory.rglob(pattern)}
+    mtimes = {path: path.stat().st_mtime for path in files if path.is_file()}
+    if not mtimes:
+        return []
+    snapshots = sorted(mtimes, key=mtimes.__getitem__, reverse=True)
+    profile = snapshot_profile_dir(snapshots[0])
+    return [path for path in snapshots if snapshot_profile_dir(path) == profile]
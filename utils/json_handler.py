@@ -1,16 +1,35 @@
-from json import dump, load
+from json import JSONDecodeError, JSONDecoder, dump, dumps, load
 from datetime import datetime
+from os import replace
 from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, Optional
 
+from lz4.frame import open as lz4_open  # type: ignore
 
-def create_default_json() -> dict:
+from utils.browser_registry import BROWSER_NAMES, get_browser_spec
+
+JSON_SUFFIXES = (".json", ".json.lz4")
+
+# Separators of the streaming writer: no padding inside a record, one record per line.
+COMPACT_SEPARATORS = (",", ":")
+
+
+def create_default_json(browsers: Optional[Iterable[str]] = None) -> dict:
     """
     Creates a default JSON structure for browser session data.
 
     This function initializes a JSON structure with default values for browsers,
     including their running status, tabs, profile paths, executable paths, and export paths.
+    The executable paths come from the browser registry.
     Additionally it sets minimal application configuration.
 
+    Args:
+        browsers (Optional[Iterable[str]]): The browsers to include. Default is None
+                                            (every registered browser).
+
+    Raises:
+        ValueError: If a browser is unknown.
+
     Returns:
         dict: The default JSON structure.
     """
@@ -19,54 +38,56 @@ def create_default_json() -> dict:
         "ui_language": "en",  # "en" or "ru" at the moment
         "timestamp": datetime.now().isoformat(),
         "browsers": {
-            "Firefox": {
+            spec.name: {
                 "running": False,
                 "tabs": [],
                 "profile_path": r"",
                 "executable": {
-                    "Windows": [
-                        r"C:/Program Files/Mozilla Firefox/firefox.exe",
-                        r"C:/Program Files (x86)/Mozilla Firefox/firefox.exe",
-                    ],
-                    "Linux": [r"/usr/bin/firefox"],
+                    system_name: list(paths)
+                    for system_name, paths in spec.executables.items()
                 },
                 "export_path": "",
-            },
-            "Chrome": {
-                "running": False,
-                "tabs": [],
-                "profile_path": r"",
-                "executable": {
-                    "Windows": [
-                        r"C:/Program Files/Google\Chrome/Application/chrome.exe",
-                        r"C:/Program Files (x86)/Google\Chrome/Application/chrome.exe",
-                    ],
-                    "Linux": [r"/usr/bin/google-chrome", r"/usr/bin/chromium-browser"],
-                },
-                "export_path": "",
-            },
-            "Edge": {
-                "running": False,
-                "tabs": [],
-                "profile_path": r"",
-                "executable": {
-                    "Windows": [
-                        r"C:/Program Files/Microsoft/Edge/Application/msedge.exe",
-                        r"C:/Program Files (x86)/Microsoft/Edge/Application/msedge.exe",
-                    ],
-                    "Linux": [r"/usr/bin/microsoft-edge", r"/usr/bin/msedge"],
-                },
-                "export_path": "",
-            },
+            }
+            for spec in map(
+                get_browser_spec, BROWSER_NAMES if browsers is None else browsers
+            )
         },
     }
 
 
+def _check_json_filename(filename: Path | str) -> None:
+    if not str(filename).endswith(JSON_SUFFIXES):
+        raise ValueError(f"File '{filename}' is not a JSON file.")
+
+
+def _open_json(
+    filename: Path | str, mode: str, compressed: Optional[bool] = None
+) -> IO[str]:
+    """
+    Opens a JSON file in text mode, transparently (de)compressing `.json.lz4` files.
+
+    Args:
+        filename (Path | str): The path to the file.
+        mode (str): "r" or "w".
+        compressed (Optional[bool]): Forces LZ4 on or off. By default it is chosen by suffix.
+
+    Returns:
+        IO[str]: The opened text stream.
+    """
+
+    if compressed is None:
+        compressed = str(filename).endswith(".lz4")
+    if compressed:
+        return lz4_open(filename, mode + "t", encoding="utf-8")
+    return open(filename, mode, encoding="utf-8")
+
+
 def save_to_json(data: dict, filename: Path | str) -> None:
     """
     Saves the given data to a JSON file.
 
     This function writes the provided data dictionary to a specified JSON file.
+    Files ending with `.json.lz4` are written LZ4-frame compressed.
     It raises a ValueError if the specified file is not a JSON file.
 
     Args:
@@ -77,13 +98,110 @@ def save_to_json(data: dict, filename: Path | str) -> None:
         ValueError: If the specified file is not a JSON file.
     """
 
-    if not str(filename).endswith(".json"):
-        raise ValueError(f"File '{filename}' is not a JSON file.")
+    _check_json_filename(filename)
 
-    with open(filename, "w", encoding="utf-8") as f:
+    with _open_json(filename, "w") as f:
         dump(data, f, indent=4, ensure_ascii=False)
 
 
+class BrowserDataWriter:
+    """
+    Streaming writer for browser_data.json.
+
+    The document is emitted piece by piece: the top-level fields when the writer is entered,
+    then one browser at a time with its tabs written one per line, so the whole document is
+    never held in memory. Fields put into `footer` while the writer is open are written after
+    "browsers" on exit. Output uses compact separators and is LZ4-frame compressed for
+    `.json.lz4` files. It is written to a temporary file that replaces the target only when
+    the writer exits without an error.
+
+    Attributes:
+        filename (Path): The target file.
+        header (dict): Top-level fields written before "browsers" (e.g. ui_language, timestamp).
+        footer (dict): Top-level fields written after "browsers" (e.g. export-wide summaries).
+    """
+
+    def __init__(self, filename: Path | str, header: dict) -> None:
+        _check_json_filename(filename)
+        self.filename = Path(filename)
+        self.header = header
+        self.footer: dict = {}
+        self._partial = self.filename.with_name(self.filename.name + ".part")
+        self._stream: Optional[IO[str]] = None
+        self._browsers_written = 0
+
+    def __enter__(self) -> "BrowserDataWriter":
+        self._stream = _open_json(
+            self._partial, "w", compressed=self.filename.name.endswith(".lz4")
+        )
+        self._stream.write("{")
+        for key, value in self.header.items():
+            self._stream.write(f"{self._dumps(key)}:{self._dumps(value)},\n")
+        self._stream.write('"browsers":{')
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        assert self._stream is not None
+        try:
+            if exc_type is None:
+                self._stream.write("\n}")
+                for key, value in self.footer.items():
+                    self._stream.write(f",\n{self._dumps(key)}:{self._dumps(value)}")
+                self._stream.write("}\n")
+        finally:
+            self._stream.close()
+        if exc_type is None:
+            replace(self._partial, self.filename)
+        else:
+            self._partial.unlink(missing_ok=True)
+
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        return dumps(value, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+
+    def write_browser(
+        self, browser: str, browser_data: dict, tabs: Optional[Iterable[dict]] = None
+    ) -> int:
+        """
+        Writes one browser entry.
+
+        Args:
+            browser (str): Browser name.
+            browser_data (dict): The browser's fields. Its "tabs" are used unless `tabs` is given.
+            tabs (Optional[Iterable[dict]]): Tabs to stream into the entry. Default is None.
+
+        Raises:
+            RuntimeError: If the writer has not been entered.
+
+        Returns:
+            int: The number of tabs written.
+        """
+
+        if self._stream is None:
+            raise RuntimeError("BrowserDataWriter must be used as a context manager.")
+
+        stream = self._stream
+        if tabs is None:
+            tabs = browser_data.get("tabs", [])
+
+        stream.write(",\n" if self._browsers_written else "\n")
+        stream.write(f"{self._dumps(browser)}:{{")
+        for key, value in browser_data.items():
+            if key != "tabs":
+                stream.write(f"{self._dumps(key)}:{self._dumps(value)},")
+
+        count = 0
+        stream.write('"tabs":[')
+        for tab in tabs:
+            stream.write(",\n" if count else "\n")
+            stream.write(self._dumps(tab))
+            count += 1
+        stream.write("]}")
+
+        self._browsers_written += 1
+        return count
+
+
 def load_from_json(filename: Path | str) -> dict:
     """
     Loads data from a JSON file.
@@ -106,8 +224,146 @@ def load_from_json(filename: Path | str) -> dict:
     if not Path(filename).exists():
         raise FileNotFoundError(f"File '{filename}' does not exist.")
 
-    if not str(filename).endswith(".json"):
-        raise ValueError(f"File '{filename}' is not a JSON file.")
+    _check_json_filename(filename)
 
-    with open(filename, "r", encoding="utf-8") as f:
+    with _open_json(filename, "r") as f:
         return load(f)
+
+
+class _IncrementalJsonReader:
+    """
+    Reads JSON values one at a time from a text stream without loading the whole document.
+
+    The buffer holds only the unread tail of what has been read so far. Values are decoded with
+    the json module's C scanner; when a value is cut off by the end of the buffer, more text is
+    read and the value is decoded again. The reads double in size while one value does not
+    fit, up to max_chunk_size, and are back to chunk_size once it has been decoded, so the
+    buffer stays about the size of the largest single value.
+
+    Attributes:
+        stream (IO[str]): The text stream.
+        chunk_size (int): Size of a read.
+        max_chunk_size (int): Largest read while a value does not fit in the buffer.
+    """
+
+    def __init__(
+        self, stream: IO[str], chunk_size: int = 1 << 16, max_chunk_size: int = 1 << 24
+    ) -> None:
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self._read_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self.stream.read(self._read_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\n\r":
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON data")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except JSONDecodeError:
+                if self._fill():
+                    self._read_size = min(self._read_size * 2, self.max_chunk_size)
+                    continue
+                raise
+            # a number may continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            self._read_size = self.chunk_size
+            return value
+
+    def next_member(self, closing: str) -> bool:
+        """
+        Consumes the separator after a member. Returns False once the container is closed.
+        """
+
+        char = self.peek()
+        self._pos += 1
+        if char == closing:
+            return False
+        if char != ",":
+            raise ValueError("Malformed JSON data")
+        return True
+
+
+def iter_browser_data(
+    filename: Path | str, header: Optional[dict] = None
+) -> Iterator[tuple[str, dict]]:
+    """
+    Iterates over the browsers of a browser_data.json file as they are parsed.
+
+    Each browser entry is decoded and yielded as soon as it has been read, so a consumer can
+    start working on the first browser before the rest of the file has been parsed. Files
+    ending with `.json.lz4` are decompressed on the fly.
+
+    Args:
+        filename (Path | str): The path to the JSON file.
+        header (Optional[dict]): If given, the other top-level fields (timestamp, ...) are
+                                 stored in it as they are read. Default is None.
+
+    Raises:
+        FileNotFoundError: If the specified file does not exist.
+        ValueError: If the specified file is not a JSON file or is malformed.
+
+    Yields:
+        tuple[str, dict]: Browser name and its data.
+    """
+
+    if not Path(filename).exists():
+        raise FileNotFoundError(f"File '{filename}' does not exist.")
+
+    _check_json_filename(filename)
+
+    with _open_json(filename, "r") as f:
+        reader = _IncrementalJsonReader(f)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.read_value()
+            reader.expect(":")
+            if key != "browsers":
+                value = reader.read_value()
+                if header is not None:
+                    header[key] = value
+            else:
+                reader.expect("{")
+                if reader.peek() == "}":
+                    reader.expect("}")
+                else:
+                    while True:
+                        browser = reader.read_value()
+                        reader.expect(":")
+                        yield browser, reader.read_value()
+                        if not reader.next_member("}"):
+                            break
+            if not reader.next_member("}"):
+                return
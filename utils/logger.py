@@ -1,14 +1,127 @@
-from logging import getLogger, basicConfig, FileHandler, INFO
+from atexit import register
+from logging import INFO, Formatter, Logger, getLevelName, getLogger
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from os import environ
 from pathlib import Path
+from queue import SimpleQueue
+from typing import Optional
 
 LOG_FILE = Path("browser_data_migration.log")
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 
-basicConfig(
-    level=INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
-)
+# The log file is rotated when it reaches LOG_MAX_BYTES; LOG_BACKUP_COUNT old files are kept.
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
 
-logger = getLogger("browser_data_migration")
+# Levels of the application loggers, relative to "browser_data_migration".
+# Can be overridden with BROWSER_MIGRATION_LOG, e.g. "INFO,copy=DEBUG,launch=DEBUG".
+LOG_LEVELS: dict[str, int] = {"": INFO}
+
+LOGGER_NAME = "browser_data_migration"
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    """
+    Parses a level specification such as "INFO,copy=DEBUG".
+
+    A bare level applies to the application logger, "module=LEVEL" to one of its children.
+
+    Args:
+        spec (str): The specification.
+
+    Raises:
+        ValueError: If a level name is unknown.
+
+    Returns:
+        dict[str, int]: Levels by child logger name ("" for the application logger).
+    """
+
+    levels: dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        module, _, name = item.rpartition("=")
+        level = getLevelName(name.strip().upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown log level: {name}")
+        levels[module.strip()] = level
+    return levels
+
+
+def setup_logging(
+    levels: Optional[dict[str, int]] = None, log_file: Path = LOG_FILE
+) -> None:
+    """
+    Routes all logging through a queue to a background thread that writes the log file.
+
+    Records are put on an unbounded queue by a QueueHandler on the root logger, so a
+    `logger.info` call in a worker thread never waits for the disk or a file lock. A
+    QueueListener thread formats them into a size-rotated log file. Calling the function
+    again replaces the previous configuration.
+
+    Args:
+        levels (Optional[dict[str, int]]): Levels by child logger name, "" for the application
+                                           logger. Default is LOG_LEVELS.
+        log_file (Path): The log file. Default is LOG_FILE.
+    """
+
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,
+    )
+    file_handler.setFormatter(Formatter(LOG_FORMAT))
+
+    queue: SimpleQueue = SimpleQueue()
+    root = getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(queue))
+    # third-party loggers stay at INFO; application loggers get their own levels below
+    root.setLevel(INFO)
+
+    for module, level in (levels if levels is not None else LOG_LEVELS).items():
+        getLogger(f"{LOGGER_NAME}.{module}" if module else LOGGER_NAME).setLevel(level)
+
+    _listener = QueueListener(queue, file_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Writes out the queued records and stops the background writer.
+    """
+
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(module: str) -> Logger:
+    """
+    Returns the child logger of a module, e.g. "copy" or "launch", whose level can be set
+    separately in LOG_LEVELS.
+
+    Args:
+        module (str): Child logger name.
+
+    Returns:
+        Logger: The logger.
+    """
+
+    return logger.getChild(module)
+
+
+setup_logging({**LOG_LEVELS, **parse_levels(environ.get("BROWSER_MIGRATION_LOG", ""))})
+register(shutdown_logging)
+
+logger = getLogger(LOGGER_NAME)
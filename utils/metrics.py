@@ -0,0 +1,256 @@
+from cProfile import Profile
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from json import dump
+from logging import DEBUG
+from os import stat
+from pathlib import Path
+from shutil import copy2
+from time import perf_counter
+from typing import Callable, Iterator, Optional
+
+from utils.logger import get_logger, logger
+
+copy_logger = get_logger("copy")
+
+
+class Metrics:
+    """
+    Collects timings and counters of one export or import run.
+
+    A run is split into phases (process_scan, kill, discovery, parse, copy, json_write,
+    launch, ...), each timed per browser. Counters such as bytes, files and tabs are summed
+    per browser. At the end of the run everything is written as a JSON report.
+
+    Counters are plain dictionary increments, so the hot paths never wait on a display.
+    Progress displays sample them instead (see `snapshot()`), at their own refresh rate.
+
+    Attributes:
+        run_name (str): Name of the current run ("export" or "import").
+        started_at (Optional[str]): ISO timestamp of the start of the run.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self, run_name: str = "") -> None:
+        """
+        Drops everything recorded so far and starts a new run.
+
+        Args:
+            run_name (str): Name of the new run. Default is "".
+        """
+
+        self.run_name = run_name
+        self.started_at: Optional[str] = None
+        self._start = perf_counter()
+        self._phases: dict[tuple[str, str], dict] = {}
+        self._counters: defaultdict[str, defaultdict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self._planned: defaultdict[str, dict[str, int]] = defaultdict(dict)
+        self._current: dict[str, str] = {}
+
+    @contextmanager
+    def phase(self, name: str, browser: str = "") -> Iterator[None]:
+        """
+        Times a phase. Repeated phases with the same name and browser are summed.
+
+        Args:
+            name (str): Phase name.
+            browser (str): Browser the phase works on, empty for run-wide phases. Default is "".
+        """
+
+        self._current[browser] = name
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            record = self._phases.setdefault(
+                (browser, name), {"seconds": 0.0, "calls": 0}
+            )
+            record["seconds"] += perf_counter() - start
+            record["calls"] += 1
+
+    def count(self, browser: str = "", **counters: int) -> None:
+        """
+        Adds to counters of a browser, e.g. `metrics.count("Chrome", files=1, bytes=size)`.
+
+        Args:
+            browser (str): The browser, empty for run-wide counters. Default is "".
+            **counters (int): Counter names and increments.
+        """
+
+        browser_counters = self._counters[browser]
+        for name, value in counters.items():
+            browser_counters[name] += value
+
+    def plan(self, browser: str = "", **totals: int) -> None:
+        """
+        Adds to the planned totals of a browser, e.g. the files and bytes a copy will process.
+
+        Args:
+            browser (str): The browser, empty for run-wide totals. Default is "".
+            **totals (int): Counter names and planned increments.
+        """
+
+        planned = self._planned[browser]
+        for name, value in totals.items():
+            planned[name] = planned.get(name, 0) + value
+
+    def snapshot(self) -> dict[str, dict]:
+        """
+        Returns the current state of every browser for progress displays.
+
+        Returns:
+            dict[str, dict]: Per browser, the current phase, counters and planned totals.
+        """
+
+        browsers = list(self._current.items())
+        return {
+            browser: {
+                "phase": phase,
+                "counters": dict(self._counters.get(browser, {})),
+                "planned": dict(self._planned.get(browser, {})),
+            }
+            for browser, phase in browsers
+        }
+
+    def counters(self, browser: str = "") -> dict[str, int]:
+        """
+        Returns the current counters of a browser.
+
+        Args:
+            browser (str): The browser, empty for run-wide counters. Default is "".
+
+        Returns:
+            dict[str, int]: A copy of the counters.
+        """
+
+        return dict(self._counters.get(browser, {}))
+
+    def phase_seconds(self, name: str, browser: str = "") -> float:
+        """
+        Returns the time spent in a phase so far.
+
+        Args:
+            name (str): Phase name.
+            browser (str): The browser, empty for run-wide phases. Default is "".
+
+        Returns:
+            float: Seconds, 0.0 if the phase has not run.
+        """
+
+        return self._phases.get((browser, name), {}).get("seconds", 0.0)
+
+    def copy_function(
+        self, browser: str, component: str = ""
+    ) -> Callable[[str, str], str]:
+        """
+        Returns a copy2 replacement for copytree that counts copied files and bytes.
+
+        Args:
+            browser (str): The browser the counters belong to.
+            component (str): If set, the files are also counted as "<component>_files" and
+                             "<component>_bytes". Default is "".
+
+        Returns:
+            Callable[[str, str], str]: The copy function.
+        """
+
+        counters = self._counters[browser]
+        files_key = f"{component}_files" if component else None
+        bytes_key = f"{component}_bytes" if component else None
+
+        def copy(src: str, dst: str) -> str:
+            result = copy2(src, dst)
+            size = stat(src).st_size
+            counters["files"] += 1
+            counters["bytes"] += size
+            if files_key:
+                counters[files_key] += 1
+                counters[bytes_key] += size
+            if copy_logger.isEnabledFor(DEBUG):
+                copy_logger.debug("%s: copied %s (%d bytes)", browser, src, size)
+            return result
+
+        return copy
+
+    def report(self) -> dict:
+        """
+        Builds the machine-readable report of the run.
+
+        Returns:
+            dict: Run name, start time, total duration and per-browser phases and counters.
+        """
+
+        browsers: dict[str, dict] = {}
+        for (browser, name), record in self._phases.items():
+            entry = browsers.setdefault(browser, {"phases": {}, "counters": {}})
+            entry["phases"][name] = record
+        for browser, counters in self._counters.items():
+            entry = browsers.setdefault(browser, {"phases": {}, "counters": {}})
+            entry["counters"] = dict(counters)
+        for browser, planned in self._planned.items():
+            entry = browsers.setdefault(browser, {"phases": {}, "counters": {}})
+            entry["planned"] = dict(planned)
+
+        return {
+            "run": self.run_name,
+            "started_at": self.started_at,
+            "total_seconds": perf_counter() - self._start,
+            "browsers": browsers,
+        }
+
+    def write_report(self, path: Path | str) -> None:
+        """
+        Writes the report of the run to a JSON file.
+
+        Args:
+            path (Path | str): Destination file.
+        """
+
+        with open(path, "w", encoding="utf-8") as f:
+            dump(self.report(), f, indent=4, ensure_ascii=False)
+
+    @contextmanager
+    def run(
+        self, run_name: str, output_dir: Path | str = ".", profile: bool = False
+    ) -> Iterator[None]:
+        """
+        Wraps a whole export or import run.
+
+        The metrics are reset on entry and written to "<run_name>_metrics.json" in `output_dir`
+        on exit, also when the run fails. With `profile`, the run is executed under cProfile
+        and the profile is saved as "<run_name>.prof" next to the report (open it with
+        `python -m pstats` or snakeviz).
+
+        Args:
+            run_name (str): "export" or "import".
+            output_dir (Path | str): Directory of the report. Default is the current directory.
+            profile (bool): Whether to record a cProfile profile. Default is False.
+        """
+
+        self.reset(run_name)
+        self.started_at = datetime.now().isoformat()
+        output_dir = Path(output_dir)
+        profiler = Profile() if profile else None
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(output_dir / f"{run_name}.prof")
+                logger.info(f"Profile saved to {output_dir / f'{run_name}.prof'}")
+            try:
+                self.write_report(output_dir / f"{run_name}_metrics.json")
+                logger.info(f"Metrics report saved to {output_dir}")
+            except OSError as e:
+                logger.error(f"Error writing metrics report: {e}")
+
+
+metrics = Metrics()